@@ -0,0 +1,92 @@
+import json
+import logging
+import logging.handlers
+import time
+from collections import deque
+
+from departemen_policy import int_to_ip
+
+
+class AuditLog:
+    # Audit log keamanan. Hot path packet-in hanya menaruh tuple ke antrean terbatas;
+    # format + tulis ke file dikerjakan writer di background per batch.
+    # `resolve(src_ip, dst_ip, is_reply)` -> (zona_src, zona_dst, rule_id), dipanggil saat flush.
+    # ALLOW disampling 1 dari `allow_sample` (0 = ALLOW tidak dicatat), BLOCK selalu dicatat.
+    def __init__(self, path, resolve, max_queue=10000, batch_size=1000, allow_sample=10,
+                 max_bytes=10 * 1024 * 1024, backup_count=5, clock=time.time):
+        self.resolve = resolve
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.allow_sample = allow_sample
+        self.clock = clock
+        self.queue = deque()
+        self.dropped = 0
+        self.written = 0
+        self._allow_seen = 0
+        self._dropped_reported = 0
+        self.handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes,
+                                                            backupCount=backup_count, delay=True)
+        self.handler.setFormatter(logging.Formatter('%(message)s'))
+
+    def __len__(self):
+        return len(self.queue)
+
+    def record(self, dpid, src_ip, dst_ip, proto, is_reply, allowed, rule_id=None):
+        # rule_id None = diambil dari tabel keputusan saat flush (override, mis. conntrack, diisi pemanggil)
+        if allowed:
+            if not self.allow_sample:
+                return False
+            self._allow_seen += 1
+            if self._allow_seen % self.allow_sample:
+                return False
+        if len(self.queue) >= self.max_queue:
+            self.dropped += 1
+            return False
+        self.queue.append((self.clock(), dpid, src_ip, dst_ip, proto, is_reply, allowed, rule_id))
+        return True
+
+    def flush(self):
+        # Tulis satu batch: record identik (dpid, src, dst, proto, rule, verdict) digabung jadi satu
+        # baris dengan count. Return (jumlah record dari antrean, jumlah drop baru sejak flush terakhir)
+        batch = []
+        while self.queue and len(batch) < self.batch_size:
+            batch.append(self.queue.popleft())
+
+        groups = {}
+        for ts, dpid, src_ip, dst_ip, proto, is_reply, allowed, rule_id in batch:
+            key = (dpid, src_ip, dst_ip, proto, is_reply, allowed, rule_id)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [ts, ts, 1]
+            else:
+                group[1] = ts
+                group[2] += 1
+
+        lines = []
+        for (dpid, src_ip, dst_ip, proto, is_reply, allowed, rule_id), (first, last, count) in groups.items():
+            src_zone, dst_zone, policy_rule = self.resolve(src_ip, dst_ip, is_reply)
+            lines.append(json.dumps({
+                'ts': first, 'last_ts': last, 'count': count, 'dpid': dpid,
+                'src_ip': int_to_ip(src_ip), 'dst_ip': int_to_ip(dst_ip), 'proto': proto,
+                'src_zone': src_zone, 'dst_zone': dst_zone, 'rule': rule_id or policy_rule,
+                'verdict': 'ALLOW' if allowed else 'BLOCK',
+                'sample': self.allow_sample if allowed else 1,
+            }))
+
+        new_drops = self.dropped - self._dropped_reported
+        if new_drops:
+            self._dropped_reported = self.dropped
+            lines.append(json.dumps({'ts': self.clock(), 'event': 'audit_overflow',
+                                     'dropped': new_drops, 'total_dropped': self.dropped}))
+
+        if lines:
+            # Satu LogRecord per batch: satu write + satu cek rotasi
+            self.handler.emit(logging.makeLogRecord({'msg': '\n'.join(lines)}))
+            self.written += len(batch)
+        return len(batch), new_drops
+
+    def close(self):
+        while self.queue:
+            self.flush()
+        self.flush()
+        self.handler.close()
@@ -0,0 +1,562 @@
+import argparse
+import json
+import logging
+import os
+import multiprocessing
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+from ryu.controller import ofp_event
+from ryu.lib import addrconv, pcaplib
+from ryu.lib.packet import packet, ethernet, ether_types, ipv4, icmp, tcp, udp, arp
+from ryu.ofproto import ofproto_v1_3, ofproto_v1_3_parser
+
+from departemen_controller import GedungController
+from departemen_legacy import legacy_check_security, legacy_get_zone_category
+from departemen_packet import parse_headers, parse_headers_slow
+from departemen_plan import GEDUNG_PLAN, generate_plan, port_map
+from departemen_policy import POLICY_FILE, CompiledPolicy, ip_to_int, int_to_ip, load_policy
+from departemen_routing import Topology
+from departemen_shard import ShardClient, balanced_owners
+
+
+# --- Implementasi lama (sebelum optimasi), disimpan sebagai baseline benchmark ---
+
+def legacy_parse(data):
+    # Parsing packet-in lama: objek Packet lengkap untuk semua layer
+    pkt = packet.Packet(data)
+    eth = pkt.get_protocol(ethernet.ethernet)
+    icmp_type = None
+    if eth.ethertype == ether_types.ETH_TYPE_IP:
+        ipv4_pkt = pkt.get_protocol(ipv4.ipv4)
+        if ipv4_pkt.proto == 1:
+            icmp_p = pkt.get_protocol(icmp.icmp)
+            if icmp_p:
+                icmp_type = icmp_p.type
+    return eth, icmp_type
+
+
+# --- Helper ---
+
+def sample_ips(count, seed=0):
+    # IP acak di 192.168.0.0 - 192.168.22.255 (mencakup semua zona + IP di luar zona)
+    rng = random.Random(seed)
+    return ['192.168.%d.%d' % (rng.randint(0, 22), rng.randint(0, 255)) for _ in range(count)]
+
+
+def mac(i):
+    return '00:00:00:%02x:%02x:%02x' % ((i >> 16) & 0xFF, (i >> 8) & 0xFF, i & 0xFF)
+
+
+def build_frame(kind, src_mac, dst_mac, src_ip, dst_ip, seq=0):
+    pkt = packet.Packet()
+    if kind == 'arp':
+        pkt.add_protocol(ethernet.ethernet(dst='ff:ff:ff:ff:ff:ff', src=src_mac, ethertype=ether_types.ETH_TYPE_ARP))
+        pkt.add_protocol(arp.arp(opcode=arp.ARP_REQUEST, src_mac=src_mac, src_ip=src_ip,
+                                 dst_mac='00:00:00:00:00:00', dst_ip=dst_ip))
+        pkt.serialize()
+        return bytes(pkt.data)
+
+    pkt.add_protocol(ethernet.ethernet(dst=dst_mac, src=src_mac, ethertype=ether_types.ETH_TYPE_IP))
+    if kind in ('ping', 'pong'):
+        pkt.add_protocol(ipv4.ipv4(src=src_ip, dst=dst_ip, proto=1))
+        icmp_type = icmp.ICMP_ECHO_REQUEST if kind == 'ping' else icmp.ICMP_ECHO_REPLY
+        pkt.add_protocol(icmp.icmp(type_=icmp_type, data=icmp.echo(id_=seq & 0xFFFF, seq=seq & 0xFFFF, data=b'\x00' * 56)))
+    elif kind == 'tcp':
+        pkt.add_protocol(ipv4.ipv4(src=src_ip, dst=dst_ip, proto=6))
+        pkt.add_protocol(tcp.tcp(src_port=1024 + seq % 60000, dst_port=80, bits=tcp.TCP_SYN))
+    elif kind == 'synack':
+        pkt.add_protocol(ipv4.ipv4(src=src_ip, dst=dst_ip, proto=6))
+        pkt.add_protocol(tcp.tcp(src_port=80, dst_port=1024 + seq % 60000, bits=tcp.TCP_SYN | tcp.TCP_ACK))
+    else:
+        pkt.add_protocol(ipv4.ipv4(src=src_ip, dst=dst_ip, proto=17))
+        pkt.add_protocol(udp.udp(src_port=1024 + seq % 60000, dst_port=53))
+        pkt.add_protocol(b'\x00' * 32)
+    pkt.serialize()
+    return bytes(pkt.data)
+
+
+def sample_frames(count, seed=2):
+    # Campuran frame sintetis: ping/pong, TCP SYN, UDP, ARP broadcast
+    rng = random.Random(seed)
+    ips = sample_ips(256, seed)
+    kinds = ['ping', 'pong', 'tcp', 'udp', 'arp']
+    frames = []
+    for i in range(count):
+        a, b = rng.randrange(len(ips)), rng.randrange(len(ips))
+        frames.append(build_frame(rng.choice(kinds), mac(a + 1), mac(b + 1), ips[a], ips[b], i))
+    return frames
+
+
+def load_pcap(path):
+    with open(path, 'rb') as f:
+        return [bytes(buf) for _, buf in pcaplib.Reader(f)]
+
+
+def rate(func, args_list, repeat=3):
+    # Ambil hasil terbaik dari beberapa putaran (ops/detik)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for args in args_list:
+            func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(args_list) / best
+
+
+def report(name, before, after):
+    print(f"{name:<28} before: {before:>12,.0f} ops/s   after: {after:>12,.0f} ops/s   speedup: {after / before:.1f}x")
+
+
+# --- Benchmark ---
+
+def bench_zona(args):
+    count = args.count
+    ctrl = GedungController()
+    ips = sample_ips(count)
+
+    # Pastikan hasil index identik dengan implementasi lama sebelum diukur
+    for ip in ips:
+        assert ctrl.get_zone_category(ip) == legacy_get_zone_category(ctrl.zones, ip), ip
+
+    before = rate(lambda ip: legacy_get_zone_category(ctrl.zones, ip), [(ip,) for ip in ips])
+    after = rate(ctrl.get_zone_category, [(ip,) for ip in ips])
+    report('get_zone_category', before, after)
+
+
+def check_policy_equivalence(ctrl, pairs):
+    # Cek cepat sebelum benchmark: wakil tiap kelas IP x tipe ICMP, ditambah sampel pasangan acak.
+    # Uji lengkap (grid 192.168.0-22.x, tidak bergantung kelas hasil kompilasi): test_departemen_policy.py
+    reps = [int_to_ip(ip_int) for ip_int in ctrl.policy.representatives()]
+    checked = 0
+    for icmp_type in (None, 0, 8):
+        for src_ip in reps:
+            for dst_ip in reps:
+                expected = legacy_check_security(ctrl.zones, src_ip, dst_ip, icmp_type)
+                assert ctrl.check_security(src_ip, dst_ip, icmp_type) == expected, (src_ip, dst_ip, icmp_type)
+                checked += 1
+        for src_ip, dst_ip in pairs:
+            expected = legacy_check_security(ctrl.zones, src_ip, dst_ip, icmp_type)
+            assert ctrl.check_security(src_ip, dst_ip, icmp_type) == expected, (src_ip, dst_ip, icmp_type)
+            checked += 1
+    print(f"check_security equivalence: {len(reps)} kelas IP, {checked:,} kasus OK")
+
+
+def bench_policy(args):
+    count = args.count
+    ctrl = GedungController()
+    ips = sample_ips(count * 2, seed=1)
+    pairs = list(zip(ips[::2], ips[1::2]))
+    check_policy_equivalence(ctrl, pairs)
+
+    args_list = [(src_ip, dst_ip, 8) for src_ip, dst_ip in pairs]
+    before = rate(lambda src_ip, dst_ip, icmp_type: legacy_check_security(ctrl.zones, src_ip, dst_ip, icmp_type), args_list)
+    after = rate(ctrl.check_security, args_list)
+    report('check_security', before, after)
+
+
+def bench_parser(args):
+    frames = load_pcap(args.pcap) if args.pcap else sample_frames(args.count)
+
+    # Hasil fast path harus sama dengan parser lengkap Ryu; frame yang ditolak fast path dihitung
+    fallback = 0
+    for data in frames:
+        fast = parse_headers(data)
+        if fast is None:
+            fallback += 1
+            continue
+        slow = parse_headers_slow(data)
+        assert fast == slow, (fast, slow)
+    print(f"parser equivalence: {len(frames) - fallback:,} frame OK, {fallback:,} frame lewat fallback Ryu")
+
+    def fast_path(data):
+        return parse_headers(data) or parse_headers_slow(data)
+
+    before = rate(legacy_parse, [(data,) for data in frames])
+    after = rate(fast_path, [(data,) for data in frames])
+    report('packet-in parse', before, after)
+
+
+# --- Replay packet-in dengan datapath palsu ---
+
+class StubDatapath:
+    # Datapath palsu: ofproto/parser OF1.3 asli, send_msg hanya menghitung pesan
+    # (serialisasi opsional supaya biaya encode OpenFlow ikut terukur)
+    def __init__(self, dpid, ports, serialize=False):
+        self.id = dpid
+        self.ofproto = ofproto_v1_3
+        self.ofproto_parser = ofproto_v1_3_parser
+        self.ports = dict.fromkeys(ports)
+        self.serialize = serialize
+        self.counts = Counter()
+        self.flows = None   # set entri flow terpasang, diisi kalau penghitungan tabel aktif
+
+    def send_msg(self, msg):
+        self.counts[msg.__class__.__name__] += 1
+        if self.serialize:
+            msg.serialize()
+        if self.flows is not None and isinstance(msg, ofproto_v1_3_parser.OFPFlowMod):
+            # Entri tabel = (table, priority, match); DELETE non-strict (host pindah) diabaikan
+            key = (msg.table_id, msg.priority, tuple(sorted(msg.match.items())))
+            if msg.command == ofproto_v1_3.OFPFC_ADD:
+                self.flows.add(key)
+            elif msg.command == ofproto_v1_3.OFPFC_DELETE_STRICT:
+                self.flows.discard(key)
+
+
+def flow_kind(priority, match):
+    # Jenis entri tabel untuk rincian hasil replay (mana yang tidak bisa diagregasi)
+    fields = dict(match)
+    if priority == GedungController.DROP_PRIORITY:
+        return 'drop'
+    if priority == GedungController.CONNTRACK_PRIORITY or 'ip_proto' in fields:
+        return '5-tuple'
+    if set(fields) == {'in_port', 'eth_dst'}:
+        return 'agregat'
+    if 'eth_src' in fields:
+        return 'pasangan'
+    return 'lain'
+
+
+def scaled_hosts(plan, total_hosts, policy=None):
+    # Perbanyak host per segmen (bergiliran) sampai total_hosts. Host tambahan berbagi port akses
+    # dengan host asli (seperti di belakang AP) dan memakai IP unik dari seluruh range kelas zona
+    # host itu; segmen yang kelasnya sama berbagi satu pool. Kalau pool semua segmen habis -> ValueError.
+    ctrl_policy = policy or CompiledPolicy(*load_policy(POLICY_FILE))
+    links, hosts = port_map(plan)
+    segment_list = [seg_hosts for _, _, _, seg_defs in plan for _, _, seg_hosts in seg_defs]
+    base = {host: (dpid, port) for host, ip, dpid, port in hosts}
+
+    used = {ip_to_int(ip) for seg_hosts in segment_list for _, ip in seg_hosts}
+    pools = {}
+    for start, end, class_id in ctrl_policy.class_index.segments():
+        pools.setdefault(class_id, []).extend(
+            ip_int for ip_int in range(start, end + 1) if ip_int & 0xFF not in (0, 255) and ip_int not in used)
+    for pool in pools.values():
+        pool.reverse()
+
+    allocated = [[] for _ in segment_list]
+    full = set()
+    count = 0
+    while count < max(total_hosts, 1):
+        progress = False
+        for seg, seg_hosts in enumerate(segment_list):
+            if count >= max(total_hosts, 1):
+                break
+            if seg in full:
+                continue
+            i = len(allocated[seg])
+            name, ip = seg_hosts[i % len(seg_hosts)]
+            if i >= len(seg_hosts):
+                pool = pools.get(ctrl_policy.class_index.lookup(ip_to_int(ip)))
+                if not pool:
+                    full.add(seg)
+                    continue
+                name, ip = f'{name}_{i}', int_to_ip(pool.pop())
+            allocated[seg].append((name, ip) + base[seg_hosts[i % len(seg_hosts)][0]])
+            count += 1
+            progress = True
+        if not progress:
+            raise ValueError(f'Alamat zona hanya cukup untuk {count} host unik (diminta {total_hosts})')
+    return links, [host for seg_hosts in allocated for host in seg_hosts]
+
+
+def replay_messages(hosts, seed=3, fan_in=0):
+    # Untuk setiap host: ARP request, ping + balasan, TCP SYN + SYN-ACK ke host acak.
+    # fan_in > 0: tujuan hanya fan_in host (banyak sumber ke sedikit server, seperti akses ke
+    # server fakultas), jadi flow ke satu tujuan dari banyak sumber melewati link yang sama
+    rng = random.Random(seed)
+    macs = {host[0]: mac(i + 1) for i, host in enumerate(hosts)}
+    peers = rng.sample(hosts, min(fan_in, len(hosts))) if fan_in else hosts
+    messages = []
+    for seq, (name, ip, dpid, port) in enumerate(hosts):
+        peer_name, peer_ip, peer_dpid, peer_port = peers[rng.randrange(len(peers))]
+        src_mac, dst_mac = macs[name], macs[peer_name]
+        messages.append((dpid, port, build_frame('arp', src_mac, dst_mac, ip, peer_ip)))
+        messages.append((dpid, port, build_frame('ping', src_mac, dst_mac, ip, peer_ip, seq)))
+        messages.append((peer_dpid, peer_port, build_frame('pong', dst_mac, src_mac, peer_ip, ip, seq)))
+        messages.append((dpid, port, build_frame('tcp', src_mac, dst_mac, ip, peer_ip, seq)))
+        messages.append((peer_dpid, peer_port, build_frame('synack', dst_mac, src_mac, peer_ip, ip, seq)))
+    return messages
+
+
+def transit_messages(links, messages):
+    # Mode reactive memasang flow hanya di switch ingress: paket yang diteruskan juga memicu
+    # packet-in di setiap switch berikutnya (port masuk = port antar-switch). Broadcast sampai ke
+    # semua switch lain lewat port menuju switch pengirim.
+    topology = Topology()
+    for dpid_a, port_a, dpid_b, port_b in links:
+        topology.add_link(dpid_a, port_a, dpid_b)
+        topology.add_link(dpid_b, port_b, dpid_a)
+    for dpid, port, data in messages:
+        topology.learn_host(addrconv.mac.bin_to_text(data[6:12]), dpid, port)
+    expanded = []
+    for dpid, port, data in messages:
+        expanded.append((dpid, port, data))
+        dst = addrconv.mac.bin_to_text(data[:6])
+        if dst == 'ff:ff:ff:ff:ff:ff':
+            for other in topology.links:
+                hops = topology.path(other, dpid) if other != dpid else None
+                if hops:
+                    expanded.append((other, hops[0][1], data))
+            continue
+        route = topology.route(dpid, dst) or []
+        for i in range(1, len(route)):
+            hop_dpid = route[i][0]
+            expanded.append((hop_dpid, topology.links[hop_dpid][route[i - 1][0]], data))
+    return expanded
+
+
+def setup_controller(args, links, hosts, workers=None, worker=0, owners=None):
+    ctrl = GedungController()
+    ctrl.PROACTIVE_MODE = args.mode == 'proactive'
+    ctrl.PATH_MODE = args.mode == 'path'
+    ctrl.AGGREGATE_TRANSIT = args.aggregate
+    ctrl.RECONCILE_ENABLED = False
+    # Replay mengirim ribuan packet-in dari sedikit host: kuota packet-in akan memotong pengukuran
+    ctrl.PACKET_IN_SOURCE_RATE = 0
+    ctrl.PACKET_IN_DPID_RATE = 0
+    ctrl.logger.setLevel(logging.INFO)
+    if workers is not None:
+        # Worker shard tanpa koordinator: daftar worker tetap, update state hanya ditampung di outbox
+        ctrl.SHARD_WORKER = worker
+        ctrl.shard = ShardClient(None, worker, ctrl.apply_shard_update)
+        ctrl.shard_workers = list(range(workers))
+        ctrl.shard_owners = owners or {}
+        ctrl.shard_generation = 1
+
+    switch_ports = {}
+    for dpid_a, port_a, dpid_b, port_b in links:
+        switch_ports.setdefault(dpid_a, set()).add(port_a)
+        switch_ports.setdefault(dpid_b, set()).add(port_b)
+    for _, _, dpid, port in hosts:
+        switch_ports.setdefault(dpid, set()).add(port)
+
+    datapaths = {dpid: StubDatapath(dpid, ports, args.serialize) for dpid, ports in switch_ports.items()}
+    ctrl.datapaths.update(datapaths)
+    for dpid_a, port_a, dpid_b, port_b in links:
+        ctrl.topology.add_link(dpid_a, port_a, dpid_b)
+        ctrl.topology.add_link(dpid_b, port_b, dpid_a)
+    for datapath in datapaths.values():
+        features = ofproto_v1_3_parser.OFPSwitchFeatures(datapath)
+        ctrl.switch_features_handler(ofp_event.EventOFPSwitchFeatures(features))
+        datapath.counts.clear()
+    return ctrl, datapaths
+
+
+def packet_in_events(datapaths, messages):
+    events = []
+    for dpid, port, data in messages:
+        datapath = datapaths[dpid]
+        msg = ofproto_v1_3_parser.OFPPacketIn(
+            datapath, buffer_id=ofproto_v1_3.OFP_NO_BUFFER, total_len=len(data),
+            reason=ofproto_v1_3.OFPR_NO_MATCH, table_id=0, cookie=0,
+            match=ofproto_v1_3_parser.OFPMatch(in_port=port), data=data)
+        events.append(ofp_event.EventOFPPacketIn(msg))
+    return events
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def replay_shard(args, links, hosts, messages, worker, owners, barrier, results):
+    # Satu proses worker: hanya packet-in dari dpid miliknya, mulai serentak dengan worker lain
+    ctrl, datapaths = setup_controller(args, links, hosts, args.workers, worker, owners)
+    events = packet_in_events(datapaths, [message for message in messages if ctrl.owns(message[0])])
+    handler = ctrl._packet_in_handler
+    barrier.wait()
+    start = time.monotonic()
+    for ev in events:
+        handler(ev)
+    results.put((worker, len(events), start, time.monotonic(), len(ctrl.shard.outbox)))
+
+
+def bench_replay_sharded(args, links, hosts, messages):
+    # Throughput gabungan N proses worker (sharding per dpid seperti departemen_shard.py). Pembagian
+    # dpid = kondisi stabil koordinator: beban packet-in per dpid sudah dilaporkan worker
+    owners = None
+    if not args.round_robin:
+        owners = balanced_owners(Counter(message[0] for message in messages), range(args.workers))
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(args.workers)
+    results = context.Queue()
+    procs = [context.Process(target=replay_shard, args=(args, links, hosts, messages, worker, owners, barrier, results))
+             for worker in range(args.workers)]
+    for proc in procs:
+        proc.start()
+    rows = sorted(results.get() for _ in procs)
+    for proc in procs:
+        proc.join()
+
+    elapsed = max(row[3] for row in rows) - min(row[2] for row in rows)
+    total = sum(row[1] for row in rows)
+    print(f"replay [{args.mode}] {len(hosts):,} host, {total:,} packet-in, {args.workers} worker "
+          f"({os.cpu_count()} CPU)")
+    for worker, count, start, end, shared in rows:
+        print(f"  worker {worker:<3} {count:>8,} packet-in  {count / (end - start):>10,.0f}/s  "
+              f"{shared:,} update state bersama")
+    print(f"  throughput gabungan {total / elapsed:>12,.0f} packet-in/s")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'mode': args.mode, 'workers': args.workers, 'packet_ins': total,
+                       'packet_ins_per_sec': total / elapsed,
+                       'per_worker': [{'worker': row[0], 'packet_ins': row[1]} for row in rows]}, f, indent=2)
+
+
+def bench_replay(args):
+    logging.getLogger().addHandler(logging.NullHandler())
+    plan = GEDUNG_PLAN
+    policy = CompiledPolicy(*load_policy(POLICY_FILE))
+    try:
+        if args.buildings:
+            plan = generate_plan(policy, args.buildings, args.floors, args.segment_hosts)
+        links, hosts = scaled_hosts(plan, args.hosts, policy)
+    except ValueError as e:
+        sys.exit(f'replay: {e}')
+    messages = replay_messages(hosts, fan_in=args.fan_in)
+    if args.transit:
+        messages = transit_messages(links, messages)
+    if args.workers:
+        bench_replay_sharded(args, links, hosts, messages)
+        return
+
+    # Putaran 1: throughput + latency per packet-in
+    ctrl, datapaths = setup_controller(args, links, hosts)
+    events = packet_in_events(datapaths, messages)
+    handler = ctrl._packet_in_handler
+    latencies = []
+    clock = time.perf_counter_ns
+    start = time.perf_counter()
+    for ev in events:
+        t0 = clock()
+        handler(ev)
+        latencies.append(clock() - t0)
+    elapsed = time.perf_counter() - start
+    counts = Counter()
+    for datapath in datapaths.values():
+        counts.update(datapath.counts)
+
+    # Putaran 2 (controller baru): alokasi memori per packet-in via tracemalloc
+    ctrl, datapaths = setup_controller(args, links, hosts)
+    events = packet_in_events(datapaths, messages)[:args.alloc_sample]
+    handler = ctrl._packet_in_handler
+    tracemalloc.start()
+    peak_total = 0
+    blocks_before = sys.getallocatedblocks()
+    for ev in events:
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        handler(ev)
+        peak_total += tracemalloc.get_traced_memory()[1] - current
+    blocks_after = sys.getallocatedblocks()
+    tracemalloc.stop()
+
+    # Putaran 3 (controller baru, tidak diukur waktunya): jumlah entri flow per switch
+    ctrl, datapaths = setup_controller(args, links, hosts)
+    for datapath in datapaths.values():
+        datapath.flows = set()
+    handler = ctrl._packet_in_handler
+    for ev in packet_in_events(datapaths, messages):
+        handler(ev)
+    table_sizes = [len(datapath.flows) for datapath in datapaths.values()]
+    table_kinds = Counter(flow_kind(priority, match) for datapath in datapaths.values()
+                          for _, priority, match in datapath.flows)
+
+    latencies.sort()
+    results = {
+        'mode': args.mode,
+        'hosts': len(hosts),
+        'packet_ins': len(messages),
+        'packet_ins_per_sec': len(messages) / elapsed,
+        'latency_us': {name: percentile(latencies, pct) / 1000.0
+                       for name, pct in (('p50', 50), ('p90', 90), ('p99', 99), ('max', 100))},
+        'alloc_peak_bytes_per_packet_in': peak_total / max(len(events), 1),
+        'retained_blocks_per_packet_in': (blocks_after - blocks_before) / max(len(events), 1),
+        'flow_mods': counts['OFPFlowMod'],
+        'packet_outs': counts['OFPPacketOut'],
+        'flow_mods_per_packet_in': counts['OFPFlowMod'] / len(messages),
+        'aggregate': args.aggregate,
+        'fan_in': args.fan_in,
+        'table_entries_max': max(table_sizes),
+        'table_entries_total': sum(table_sizes),
+        'table_entries_by_kind': dict(table_kinds),
+    }
+
+    lat = results['latency_us']
+    print(f"replay [{args.mode}] {results['hosts']:,} host, {results['packet_ins']:,} packet-in")
+    print(f"  throughput      {results['packet_ins_per_sec']:>12,.0f} packet-in/s")
+    print(f"  latency (us)    p50 {lat['p50']:.1f}  p90 {lat['p90']:.1f}  p99 {lat['p99']:.1f}  max {lat['max']:.1f}")
+    print(f"  alokasi         {results['alloc_peak_bytes_per_packet_in']:,.0f} byte peak/packet-in, "
+          f"{results['retained_blocks_per_packet_in']:.2f} blok tertahan/packet-in")
+    print(f"  pesan keluar    {results['flow_mods']:,} flow-mod ({results['flow_mods_per_packet_in']:.2f}/packet-in), "
+          f"{results['packet_outs']:,} packet-out")
+    print(f"  tabel flow      max {results['table_entries_max']:,} entri/switch, "
+          f"total {results['table_entries_total']:,} entri ({len(table_sizes)} switch)")
+    print('                  ' + ', '.join(f'{kind} {count:,}' for kind, count in table_kinds.most_common()))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print('  vs baseline:')
+        for key in ('packet_ins_per_sec', 'alloc_peak_bytes_per_packet_in', 'flow_mods',
+                    'table_entries_max', 'table_entries_total'):
+            if baseline.get(key):
+                print(f"    {key:<32} {baseline[key]:>12,.1f} -> {results[key]:>12,.1f} "
+                      f"({(results[key] - baseline[key]) / baseline[key] * 100:+.1f}%)")
+        for key in ('p50', 'p99'):
+            if baseline.get('latency_us', {}).get(key):
+                old = baseline['latency_us'][key]
+                print(f"    latency {key:<24} {old:>12,.1f} -> {lat[key]:>12,.1f} ({(lat[key] - old) / old * 100:+.1f}%)")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+BENCHMARKS = {
+    'zona': bench_zona,
+    'policy': bench_policy,
+    'parser': bench_parser,
+    'replay': bench_replay,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark GedungController')
+    parser.add_argument('bench', nargs='*', help='benchmark yang dijalankan: %s (default: semua)' % ', '.join(sorted(BENCHMARKS)))
+    parser.add_argument('-n', '--count', type=int, default=50000, help='jumlah sampel per benchmark')
+    parser.add_argument('--pcap', help='file pcap berisi frame hasil capture untuk benchmark parser')
+    parser.add_argument('--hosts', type=int, default=2000, help='jumlah host sintetis untuk replay')
+    parser.add_argument('--buildings', type=int, help='replay: pakai topologi hasil generate_plan dengan N gedung')
+    parser.add_argument('--floors', type=int, default=3, help='replay: jumlah lantai per gedung (dengan --buildings)')
+    parser.add_argument('--segment-hosts', type=int, default=2, help='replay: host per segmen (dengan --buildings)')
+    parser.add_argument('--mode', choices=['reactive', 'proactive', 'path'], default='reactive',
+                        help='mode forwarding controller untuk replay')
+    parser.add_argument('--serialize', action='store_true', help='replay: ikut serialisasi pesan OpenFlow')
+    parser.add_argument('--alloc-sample', type=int, default=2000, help='replay: jumlah packet-in untuk ukur alokasi')
+    parser.add_argument('--json', help='replay: simpan hasil ke file JSON (untuk baseline)')
+    parser.add_argument('--baseline', help='replay: bandingkan dengan hasil JSON sebelumnya')
+    parser.add_argument('--workers', type=int, default=0, help='replay: jalankan N proses worker shard (per dpid)')
+    parser.add_argument('--round-robin', action='store_true',
+                        help='replay: dpid dibagi round-robin ke worker (tanpa data beban packet-in)')
+    parser.add_argument('--aggregate', action='store_true',
+                        help='replay: flow agregat (port masuk, MAC tujuan) di switch transit')
+    parser.add_argument('--fan-in', type=int, default=0, metavar='N',
+                        help='replay: semua host mengirim ke N host tujuan saja (banyak sumber ke satu tujuan)')
+    parser.add_argument('--transit', action='store_true',
+                        help='replay: tambah packet-in di switch transit sepanjang jalur (mode reactive)')
+    args = parser.parse_args()
+    for name in args.bench:
+        if name not in BENCHMARKS:
+            parser.error('benchmark tidak dikenal: %s' % name)
+
+    for name in args.bench or sorted(BENCHMARKS):
+        BENCHMARKS[name](args)
+
+
+if __name__ == '__main__':
+    main()
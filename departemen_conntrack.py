@@ -0,0 +1,104 @@
+import time
+from collections import OrderedDict
+
+
+class ConnTrack:
+    # Tabel koneksi di controller untuk flow keluar yang diizinkan.
+    # Key 5-tuple: (proto, src_ip, dst_ip, src_port, dst_port); untuk ICMP echo, port = (id, 0)
+    # untuk request dan (0, id) untuk reply supaya reply adalah kebalikan persis dari request.
+    # Ukuran dibatasi (LRU) dan entri kedaluwarsa setelah `timeout` detik tanpa aktivitas.
+    # Entri yang masih punya flow 5-tuple di switch (pin) tidak kedaluwarsa: paket sesi itu
+    # tidak lagi lewat controller, jadi aktivitasnya hanya terlihat dari flow yang belum dihapus.
+    def __init__(self, max_entries=65536, timeout=60, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._pins = {}     # key -> set pemilik flow (dpid, priority) yang masih terpasang
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        ts = self._entries.get(key)
+        return ts is not None and (key in self._pins or self.clock() - ts <= self.timeout)
+
+    def add(self, key):
+        now = self.clock()
+        self._entries[key] = now
+        self._entries.move_to_end(key)
+        self.expire(now)
+        while len(self._entries) > self.max_entries:
+            self._pins.pop(self._entries.popitem(last=False)[0], None)
+
+    def is_reply(self, key):
+        # True kalau `key` adalah arah balik dari koneksi yang tercatat (entri ikut di-refresh)
+        proto, src_ip, dst_ip, src_port, dst_port = key
+        reverse = (proto, dst_ip, src_ip, dst_port, src_port)
+        ts = self._entries.get(reverse)
+        if ts is None:
+            return False
+        now = self.clock()
+        if now - ts > self.timeout and reverse not in self._pins:
+            del self._entries[reverse]
+            return False
+        self._entries[reverse] = now
+        self._entries.move_to_end(reverse)
+        return True
+
+    def pin(self, key, owner):
+        # Flow milik koneksi `key` terpasang di switch (owner = (dpid, priority))
+        if key in self._entries:
+            self._pins.setdefault(key, set()).add(owner)
+
+    def unpin(self, key, owner):
+        # Flow dihapus switch (flow-removed); timeout entri mulai dihitung setelah flow terakhir hilang
+        owners = self._pins.get(key)
+        if owners is None:
+            return
+        owners.discard(owner)
+        if not owners:
+            del self._pins[key]
+            if key in self._entries:
+                self._entries[key] = self.clock()
+                self._entries.move_to_end(key)
+
+    def unpin_dpid(self, dpid):
+        # Switch putus: flow di switch itu tidak lagi menahan entri
+        for key in [key for key, owners in self._pins.items() if any(owner[0] == dpid for owner in owners)]:
+            for owner in [owner for owner in self._pins[key] if owner[0] == dpid]:
+                self.unpin(key, owner)
+
+    def snapshot(self):
+        # List (key, umur detik), untuk disimpan ke file (warm restart)
+        now = self.clock()
+        return [(key, now - ts) for key, ts in self._entries.items()]
+
+    def restore(self, entries):
+        now = self.clock()
+        for key, age in sorted(entries, key=lambda entry: -entry[1]):
+            if age <= self.timeout:
+                self._entries[tuple(key)] = now - age
+                self._entries.move_to_end(tuple(key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def remove_if(self, predicate):
+        # Buang entri yang key-nya memenuhi predicate (mis. pasangan yang diblok policy baru)
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+            self._pins.pop(key, None)
+
+    def expire(self, now=None):
+        # Entri urut berdasarkan waktu terakhir dilihat, jadi cukup buang dari depan
+        # (entri yang di-pin dianggap baru dilihat dan dipindah ke belakang)
+        now = self.clock() if now is None else now
+        while self._entries:
+            key, ts = next(iter(self._entries.items()))
+            if now - ts <= self.timeout:
+                break
+            if key in self._pins:
+                self._entries[key] = now
+                self._entries.move_to_end(key)
+                continue
+            del self._entries[key]
@@ -1,299 +1,1437 @@
 from ryu.base import app_manager
 from ryu.controller import ofp_event
-from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER
+from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER, DEAD_DISPATCHER
 from ryu.controller.handler import set_ev_cls
 from ryu.ofproto import ofproto_v1_3
-from ryu.lib.packet import packet, ethernet, ether_types, ipv4, icmp
+from ryu.lib import hub
+from ryu.app.wsgi import WSGIApplication
+from ryu.lib.packet import packet, ethernet, ether_types, arp, icmp, tcp
+from ryu.topology import event as topo_event
+
+import json
+import os
+import time
+from collections import Counter, OrderedDict
+
+from departemen_policy import ip_to_int, int_to_ip, prefix_mask, CompiledPolicy, load_policy
+from departemen_policy import POLICY_FILE as DEFAULT_POLICY_FILE
+from departemen_conntrack import ConnTrack
+from departemen_packet import parse_headers, parse_headers_slow
+from departemen_routing import Topology
+from departemen_mactable import MacTable, ArpTable
+from departemen_audit import AuditLog
+from departemen_metrics import Metrics, GedungMetricsController
+from departemen_ratelimit import TokenBuckets
+from departemen_shard import ShardClient, shard_owner, LOAD_INTERVAL
+
+VERDICT_LABELS = {True: (('verdict', 'ALLOW'),), False: (('verdict', 'BLOCK'),)}
+THROTTLE_LABELS = {'source': (('reason', 'source'),), 'dpid': (('reason', 'dpid'),)}
+FULL_MASKS = ('255.255.255.255', 'ff:ff:ff:ff:ff:ff')
+
+# Topology discovery (LLDP) Ryu untuk event switch/link di atas (mode path, agregasi transit)
+app_manager.require_app('ryu.topology.switches')
+
+
+def match_key(fields):
+    # Field match sebagai tuple terurut yang bisa di-hash; mask penuh dibuang supaya entri yang
+    # dipasang sama dengan yang dilaporkan switch (switch menormalkan /32 jadi tanpa mask)
+    return tuple(sorted((name, value[0] if isinstance(value, tuple) and value[1] in FULL_MASKS else value)
+                        for name, value in fields.items()))
+
 
 class GedungController(app_manager.RyuApp):
     OFP_VERSIONS = [ofproto_v1_3.OFP_VERSION]
+    _CONTEXTS = {'wsgi': WSGIApplication}
+
+    # Mode proaktif: policy zona dipasang ke switch saat connect (pipeline multi-table),
+    # packet-in hanya untuk MAC learning
+    PROACTIVE_MODE = False
+    TABLE_CLASSIFY = 0   # klasifikasi IP sumber -> metadata kelas zona
+    TABLE_POLICY = 1     # matriks allow/deny (metadata kelas src x prefix IP tujuan)
+    TABLE_L2 = 2         # forwarding L2 berdasarkan eth_dst
+    METADATA_MASK = 0xFFFF
+
+    # Drop flow sementara untuk traffic yang diblok (supaya paket berikutnya tidak ke controller)
+    DROP_FLOW_ENABLED = True
+    DROP_PRIORITY = 100
+    DROP_IDLE_TIMEOUT = 10
+    DROP_HARD_TIMEOUT = 30          # hard timeout awal, digandakan untuk pelanggar berulang
+    DROP_HARD_TIMEOUT_MAX = 600
+    DROP_BACKOFF_RESET = 300        # strike di-reset kalau tidak ada pelanggaran selama ini (detik)
+    DROP_TRACK_MAX = 10000          # batas jumlah IP sumber yang dilacak (LRU)
+
+    # Batas packet-in: meter OpenFlow per switch di table-miss (kalau switch mendukung meter)
+    # membatasi paket ke controller di datapath. Di controller, kuota per MAC sumber memasang drop
+    # flow sementara untuk host yang membanjiri controller, dan jatah per switch menjaga supaya
+    # flood di satu gedung tidak menghabiskan waktu proses packet-in switch lain.
+    PACKET_IN_METER_ID = 1
+    PACKET_IN_METER_RATE = 1000     # paket/detik per switch, 0 = meter tidak dipasang
+    PACKET_IN_METER_BURST = 200
+    PACKET_IN_SOURCE_RATE = 50      # packet-in/detik per MAC sumber, 0 = tanpa kuota
+    PACKET_IN_SOURCE_BURST = 100
+    PACKET_IN_DPID_RATE = 500       # packet-in/detik per switch yang diproses, 0 = tanpa batas
+    PACKET_IN_DPID_BURST = 1000
+    QUOTA_DROP_PRIORITY = 300       # di atas CONNTRACK_PRIORITY: host dikarantina sepenuhnya
+    QUOTA_DROP_TIMEOUT = 10
+
+    # Cookie flow: bit 63-56 jenis flow, bit 48 = flow di-tag pasangan kelas zona, bit 47-40 tag
+    # app (semua flow dari add_flow), bit 31-16 kelas src, bit 15-0 kelas dst (id kelas stabil
+    # antar reload policy dan antar restart lewat snapshot)
+    COOKIE_DROP = 0xD0
+    COOKIE_PIPELINE = 0xB0
+    COOKIE_QUOTA = 0xC0
+    COOKIE_AGGREGATE = 0xA0
+    COOKIE_APP = 0x6E << 40
+    COOKIE_APP_MASK = 0xFF << 40
+    COOKIE_PAIR = 1 << 48
+    COOKIE_PAIR_MASK = COOKIE_APP_MASK | COOKIE_PAIR | 0xFFFFFFFF
+
+    # File policy (zona + rule, JSON/YAML). Kalau berubah, policy dikompilasi ulang di background
+    # dan hanya flow pasangan kelas yang terdampak yang dihapus/diganti. Tanpa file -> policy bawaan.
+    POLICY_FILE = DEFAULT_POLICY_FILE
+    POLICY_RELOAD_INTERVAL = 2      # detik, 0 = hot reload mati
+
+    # Warm restart: tabel MAC, lokasi host, ARP, conntrack, offender dan id kelas zona disimpan
+    # berkala ke SNAPSHOT_FILE dan dipulihkan saat start. Saat switch connect, flow bertag
+    # COOKIE_APP yang sudah ada di-query: yang masih konsisten dipakai ulang, yang basi dihapus.
+    SNAPSHOT_FILE = 'gedung_state.json'
+    SNAPSHOT_INTERVAL = 30          # detik, 0 = snapshot mati
+    RECONCILE_ENABLED = True
+    RECONCILE_TIMEOUT = 5           # detik menunggu flow stats sebelum pipeline dipasang penuh
+
+    # Connection tracking: return traffic dari flow yang diizinkan dipasang sebagai flow 5-tuple
+    CONNTRACK_ENABLED = True
+    CONNTRACK_TIMEOUT = 60          # idle timeout entri conntrack = idle timeout flow arah balik
+    CONNTRACK_MAX = 65536
+    CONNTRACK_PRIORITY = 200        # di atas DROP_PRIORITY: sesi yang sah menang atas drop flow lama
+                                    # (install_return_flow dipasang bersama flow keluar)
+
+    # Mode path: policy dicek sekali di switch ingress lalu seluruh jalur (shortest path dari
+    # topology discovery Ryu, jalankan ryu-manager dengan --observe-links) dipasang sekaligus
+    PATH_MODE = False
+
+    # Agregasi transit: paket yang masuk dari port antar-switch sudah lolos policy di switch edge,
+    # jadi kalau verdict-nya allow penuh (bukan reply-only / conntrack) switch transit cukup diberi
+    # satu flow (port masuk, MAC tujuan) untuk semua sumber, bukan satu flow per pasangan host.
+    AGGREGATE_TRANSIT = False
+    TABLE_UTILIZATION_WARN = 0.8    # peringatan kalau entri tabel melewati fraksi kapasitas ini
+
+    # ARP proxy: controller menjawab ARP request dari binding IP->MAC yang sudah dipelajari.
+    # Broadcast sisanya hanya dikirim ke port akses switch yang menampung zona yang boleh
+    # dijangkau pengirim, bukan di-flood ke semua switch (mode reaktif: flood per switch tanpa
+    # port akses yang semua hostnya di zona lain).
+    ARP_PROXY_ENABLED = True
+    BROADCAST_SCOPING = True
+
+    # Tabel MAC: kapasitas per switch (LRU) dan aging; flow L2 hasil learning pakai idle timeout
+    # supaya isi TCAM mengikuti host yang aktif saja. Tabel ARP (binding IP-MAC) ikut aging yang sama
+    MAC_TABLE_CAPACITY = 4096
+    MAC_AGING_TIME = 300
+    ARP_TABLE_CAPACITY = 65536
+    FLOW_IDLE_TIMEOUT = 60
+
+    # Audit log keamanan: verdict firewall dicatat lewat antrean + writer background (bukan
+    # logger sinkron per packet-in). ALLOW disampling 1 dari AUDIT_ALLOW_SAMPLE (0 = tidak dicatat)
+    AUDIT_ENABLED = True
+    AUDIT_LOG_PATH = 'audit_keamanan.log'
+    AUDIT_QUEUE_MAX = 10000
+    AUDIT_BATCH_SIZE = 1000
+    AUDIT_FLUSH_INTERVAL = 1.0
+    AUDIT_ALLOW_SAMPLE = 10
+    AUDIT_MAX_BYTES = 10 * 1024 * 1024
+    AUDIT_BACKUP_COUNT = 5
+
+    # Instrumentasi: histogram latency handler + polling statistik flow/port/table per switch,
+    # diekspos format Prometheus di /metrics (WSGI Ryu dan server lokal METRICS_LISTEN)
+    STATS_POLL_INTERVAL = 10        # detik, 0 = polling mati
+    METRICS_LISTEN = ('127.0.0.1', 9100)
+
+    # Sharding multi-proses (departemen_shard.py mengisi atribut ini per worker): semua switch
+    # terhubung ke semua worker, worker pemilik dpid (shard_owner atas worker yang hidup) jadi
+    # MASTER, sisanya SLAVE. Lokasi host, tabel MAC, ARP dan link dibagi lewat store Unix socket;
+    # koneksi conntrack baru dan strike drop flow diteruskan ke worker lain.
+    SHARD_SOCKET = None             # None = satu proses tanpa sharding
+    SHARD_WORKER = 0
 
     def __init__(self, *args, **kwargs):
         super(GedungController, self).__init__(*args, **kwargs)
-        self.mac_to_port = {}
+        self.mac_to_port = MacTable(self.MAC_TABLE_CAPACITY, self.MAC_AGING_TIME)
                 
-        self.zones = {
-            # Mahasiswa: Semua IP Nirkabel (subnet ranges)
-            'MAHASISWA': [
-                # G9 WiFi ranges
-                {'network': '192.168.1.0', 'mask': 16,   # 192.168.1.0/16 (192.168.1.1 - 192.168.4.254)
-                 'start': '192.168.1.1', 'end': '192.168.4.254'},
-                {'network': '192.168.5.0', 'mask': 16,   # 192.168.5.0/16
-                 'start': '192.168.5.1', 'end': '192.168.5.254'},
-                {'network': '192.168.6.0', 'mask': 16,   # 192.168.6.0/16 (192.168.6.1 - 192.168.9.254)
-                 'start': '192.168.6.1', 'end': '192.168.9.254'},
-                # G10 WiFi ranges
-                {'network': '192.168.20.0', 'mask': 16,  # 192.168.20.0/16
-                 'start': '192.168.20.1', 'end': '192.168.20.62'},
-                {'network': '192.168.20.64', 'mask': 16, # 192.168.20.64/16
-                 'start': '192.168.20.65', 'end': '192.168.20.190'},
-                {'network': '192.168.20.192', 'mask': 16, # 192.168.20.192/16
-                 'start': '192.168.20.193', 'end': '192.168.20.254'},
-                # Aula (Gedung G10 Lantai 2)
-                {'network': '192.168.21.16', 'mask': 16,  # 192.168.21.16/16
-                 'start': '192.168.21.19', 'end': '192.168.21.20'}
-            ],
-
-            # Lab Komputer: Student Network (subnet ranges)
-            'LAB': [
-                {'network': '192.168.10.96', 'mask': 16, # 192.168.10.96/16
-                 'start': '192.168.10.97', 'end': '192.168.10.126'},
-            ],
-
-            # Secure: Admin, Pimpinan, Keuangan (subnet ranges) - Ujian dipisah
-            'SECURE': [
-                # G9 Secure ranges
-                {'network': '192.168.10.32', 'mask': 16, # Admin/Keuangan 192.168.10.32/16
-                 'start': '192.168.10.33', 'end': '192.168.10.38'},
-                # G10 Secure ranges
-                {'network': '192.168.21.0', 'mask': 16,   # Administrasi 192.168.21.0/16
-                 'start': '192.168.21.1', 'end': '192.168.21.14'},
-            ],
-
-            # Ujian: Dipisah dari Secure zone
-            'UJIAN': [
-                # G9 Ujian ranges - terpisah dari secure
-                {'network': '192.168.10.32', 'mask': 16, # Ujian 192.168.10.32/16
-                 'start': '192.168.10.39', 'end': '192.168.10.40'}
-            ],
-
-            # Dosen: Semua IP Kabel Dosen (subnet ranges)
-            'DOSEN': [
-                # G9 Dosen
-                {'network': '192.168.10.32', 'mask': 16, # 192.168.10.32/16 (bagian dosen)
-                 'start': '192.168.10.37', 'end': '192.168.10.38'},
-                {'network': '192.168.21.16', 'mask': 16,  # 192.168.21.16/16
-                 'start': '192.168.21.17', 'end': '192.168.21.18'},
-                {'network': '192.168.21.16', 'mask': 16,  # 192.168.21.16/16
-                 'start': '192.168.21.21', 'end': '192.168.21.22'},
-                {'network': '192.168.21.32', 'mask': 16,  # 192.168.21.32/16
-                 'start': '192.168.21.33', 'end': '192.168.21.62'},
-            ],
-
-            # Sub-group khusus untuk rule spesifik - KEUANGAN dan UJIAN sudah dipindah ke atas
-            'DEKAN': [
-                {'network': '192.168.10.32', 'mask': 16,
-                 'start': '192.168.10.35', 'end': '192.168.10.36'}
-            ]
-        }
+        # Zona dan rule chain dikompilasi saat startup (dan saat file policy berubah):
+        # index interval integer (lookup pakai bisect) + tabel keputusan per pasangan kelas zona.
+        # Satu sumber zona: POLICY_FILE; kalau tidak ada, file policy bawaan departemen_policy.json
+        policy_file = self.POLICY_FILE
+        self.policy_mtime = None
+        if policy_file and os.path.exists(policy_file):
+            self.policy_mtime = os.path.getmtime(policy_file)
+        else:
+            if policy_file:
+                self.logger.warning(f"File policy {policy_file} tidak ada, pakai policy bawaan {DEFAULT_POLICY_FILE}")
+            policy_file = DEFAULT_POLICY_FILE
+        self.zones, rules, building_octets = load_policy(policy_file)
+        self.policy = CompiledPolicy(self.zones, rules, building_octets)
+        self.zone_index = self.policy.zone_index
+
+        # src_ip -> [strike, waktu drop flow terakhir dipasang], urut LRU. Per sumber (bukan per
+        # tujuan) supaya scanner yang mencoba tujuan baru setiap kali tetap kena backoff
+        self.drop_offenders = OrderedDict()
+        # src_ip -> jumlah paket yang di-drop switch (dari statistik flow-removed), urut LRU dengan
+        # batas DROP_TRACK_MAX seperti drop_offenders; total global ada di metrik drop_flow_packets_total
+        self.suppressed_packets = OrderedDict()
+
+        self.conntrack = ConnTrack(self.CONNTRACK_MAX, self.CONNTRACK_TIMEOUT)
+
+        # Kuota packet-in (PACKET_IN_*); quota_blocked: mac -> waktu drop flow kuota habis
+        self.meter_dpids = set()
+        self.source_quota = TokenBuckets(self.PACKET_IN_SOURCE_RATE, self.PACKET_IN_SOURCE_BURST)
+        self.dpid_quota = TokenBuckets(self.PACKET_IN_DPID_RATE, self.PACKET_IN_DPID_BURST)
+        self.quota_blocked = {}
+
+        self.datapaths = {}
+        self.topology = Topology()
+
+        self.arp_table = ArpTable(self.ARP_TABLE_CAPACITY, self.MAC_AGING_TIME)    # ip (int) <-> mac
+        self.switch_classes = {}    # dpid -> set kelas zona host di port akses switch itu
+        self.aggregate_flows = {}   # dpid -> {(port masuk, MAC tujuan): port keluar} flow agregat terpasang
+        self.table_capacity = {}    # (dpid, table_id) -> max_entries dari table features switch
+        self.table_full = set()     # (dpid, table_id) yang sudah diperingatkan melewati TABLE_UTILIZATION_WARN
+
+        self.audit = None
+        self.audit_thread = None
+        if self.AUDIT_ENABLED:
+            self.audit = AuditLog(self.AUDIT_LOG_PATH, self.audit_fields, self.AUDIT_QUEUE_MAX,
+                                  self.AUDIT_BATCH_SIZE, self.AUDIT_ALLOW_SAMPLE,
+                                  self.AUDIT_MAX_BYTES, self.AUDIT_BACKUP_COUNT)
+
+        # Metrik: fungsi hot path dibungkus timer (perf_counter_ns + 1 bisect per panggilan).
+        # Lookup kelas zona src/dst terjadi di dalam check_security, jadi ikut terukur di sana
+        self.metrics = Metrics()
+        self.metrics.collectors.append(self.collect_metrics)
+        self.packet_in_hist = self.metrics.histogram('packet_in', 'Latency _packet_in_handler')
+        self.check_security = self.metrics.timed('check_security', self.check_security, 'Latency check_security')
+        self.add_flow = self.metrics.timed('add_flow', self.add_flow, 'Latency add_flow (jumlah = flow-mod terkirim)')
+        self.flow_stats_partial = {}    # dpid -> {table_id: [flow, paket, byte]} selama reply multipart
+        self.reconcile_pending = {}     # dpid -> (xid flow stats request, list flow stats)
+
+        # shard_workers None = tanpa sharding (semua dpid milik proses ini); [] = belum ada daftar
+        # worker dari koordinator (semua dpid SLAVE sampai daftar datang)
+        self.shard = None
+        self.shard_workers = None
+        self.shard_generation = 0
+        self.shard_owned = {}       # dpid -> bool (cache shard_owner)
+        self.shard_owners = {}      # dpid -> worker, pembagian menurut beban dari koordinator
+        self.shard_load = Counter() # dpid -> packet-in sejak laporan beban terakhir
+        self.shard_roles = {}       # dpid -> role OpenFlow yang terakhir diminta
+        if self.SHARD_SOCKET:
+            self.shard = ShardClient(self.SHARD_SOCKET, self.SHARD_WORKER, self.apply_shard_update)
+            self.shard_workers = []
+        wsgi = kwargs.get('wsgi')
+        if wsgi is not None:
+            wsgi.register(GedungMetricsController, {'metrics': self.metrics})
+
+    def start(self):
+        thread = super(GedungController, self).start()
+        self.restore_snapshot()
+        if self.audit is not None:
+            self.audit_thread = hub.spawn(self._audit_loop)
+        if self.shard is not None:
+            self.shard_thread = self.shard.start()
+            self.shard_load_thread = hub.spawn(self._shard_load_loop)
+        if self.SNAPSHOT_INTERVAL and self.SNAPSHOT_FILE:
+            self.snapshot_thread = hub.spawn(self._snapshot_loop)
+        if self.POLICY_RELOAD_INTERVAL and self.POLICY_FILE:
+            self.policy_thread = hub.spawn(self._policy_loop)
+        if self.STATS_POLL_INTERVAL:
+            self.stats_thread = hub.spawn(self._stats_loop)
+        if self.METRICS_LISTEN:
+            server = hub.WSGIServer(self.METRICS_LISTEN, self.metrics.wsgi_app)
+            self.metrics_thread = hub.spawn(server.serve_forever)
+            self.logger.info(f"Endpoint metrik: http://{self.METRICS_LISTEN[0]}:{self.METRICS_LISTEN[1]}/metrics")
+        return thread
+
+    def stop(self):
+        if self.SNAPSHOT_FILE:
+            self.save_snapshot()
+        super(GedungController, self).stop()
+        # Thread audit dihentikan dulu, lalu sisa antrean ditulis dan file ditutup
+        if self.audit is not None:
+            if self.audit_thread is not None:
+                hub.kill(self.audit_thread)
+            self.audit.close()
+
+    @set_ev_cls(ofp_event.EventOFPStateChange, [MAIN_DISPATCHER, DEAD_DISPATCHER])
+    def _state_change_handler(self, ev):
+        datapath = ev.datapath
+        if ev.state == MAIN_DISPATCHER:
+            self.datapaths[datapath.id] = datapath
+        elif ev.state == DEAD_DISPATCHER:
+            self.datapaths.pop(datapath.id, None)
+            self.topology.remove_switch(datapath.id)
+            self.mac_to_port.remove_dpid(datapath.id)
+            self.metrics.remove_labels(('dpid', datapath.id))
+            self.flow_stats_partial.pop(datapath.id, None)
+            self.reconcile_pending.pop(datapath.id, None)
+            self.meter_dpids.discard(datapath.id)
+            self.dpid_quota.remove(datapath.id)
+            self.shard_roles.pop(datapath.id, None)
+            self.aggregate_flows.pop(datapath.id, None)
+            self.conntrack.unpin_dpid(datapath.id)
+            self.table_capacity = {key: value for key, value in self.table_capacity.items() if key[0] != datapath.id}
+            self.table_full = {key for key in self.table_full if key[0] != datapath.id}
+
+    @set_ev_cls(topo_event.EventSwitchEnter)
+    def _switch_enter_handler(self, ev):
+        self.topology.add_switch(ev.switch.dp.id)
+
+    @set_ev_cls(topo_event.EventSwitchLeave)
+    def _switch_leave_handler(self, ev):
+        self.topology.remove_switch(ev.switch.dp.id)
+
+    @set_ev_cls(topo_event.EventLinkAdd)
+    def _link_add_handler(self, ev):
+        link = ev.link
+        self.topology.add_link(link.src.dpid, link.src.port_no, link.dst.dpid)
+        if self.shard is not None:
+            self.shard.publish({'op': 'link', 'src': link.src.dpid, 'port': link.src.port_no, 'dst': link.dst.dpid})
+
+    @set_ev_cls(topo_event.EventLinkDelete)
+    def _link_delete_handler(self, ev):
+        link = ev.link
+        self.topology.remove_link(link.src.dpid, link.dst.dpid)
+        if self.shard is not None:
+            self.shard.publish({'op': 'unlink', 'src': link.src.dpid, 'dst': link.dst.dpid})
 
     @set_ev_cls(ofp_event.EventOFPSwitchFeatures, CONFIG_DISPATCHER)
     def switch_features_handler(self, ev):
         datapath = ev.msg.datapath
+        if self.shard_workers is not None:
+            # Mode sharding: flow hanya dipasang worker pemilik dpid (set_shard_role -> take_datapath)
+            self.shard_roles.pop(datapath.id, None)
+            self.set_shard_role(datapath)
+            return
+        self.take_datapath(datapath)
+
+    def take_datapath(self, datapath):
+        parser = datapath.ofproto_parser
+        # Kapasitas tabel (max_entries) untuk metrik utilisasi tabel per switch
+        datapath.send_msg(parser.OFPTableFeaturesStatsRequest(datapath, 0))
+        if self.PACKET_IN_METER_RATE:
+            # Meter dipasang setelah switch melaporkan dukungan meter (_meter_features_reply_handler)
+            datapath.send_msg(parser.OFPMeterFeaturesStatsRequest(datapath, 0))
+        if self.RECONCILE_ENABLED:
+            # Flow lama di switch dicek dulu (reconcile_flows); pipeline proaktif yang masih
+            # sesuai tidak dipasang ulang
+            self.request_reconcile(datapath)
+            if self.PROACTIVE_MODE:
+                return
+        elif self.PROACTIVE_MODE:
+            self.install_proactive_pipeline(datapath)
+            return
+        self.install_table_miss(datapath)
+
+    def install_table_miss(self, datapath):
+        # Table-miss ke controller (table L2 di mode proaktif); lewat meter packet-in kalau switch mendukung
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
-        match = parser.OFPMatch()
         actions = [parser.OFPActionOutput(ofproto.OFPP_CONTROLLER, ofproto.OFPCML_NO_BUFFER)]
-        self.add_flow(datapath, 0, match, actions)
+        meter_id = self.PACKET_IN_METER_ID if datapath.id in self.meter_dpids else None
+        self.add_flow(datapath, 0, parser.OFPMatch(), actions, table_id=self.TABLE_L2 if self.PROACTIVE_MODE else 0,
+                      meter_id=meter_id)
 
-    def add_flow(self, datapath, priority, match, actions, buffer_id=None):
+    @set_ev_cls(ofp_event.EventOFPMeterFeaturesStatsReply, [CONFIG_DISPATCHER, MAIN_DISPATCHER])
+    def _meter_features_reply_handler(self, ev):
+        datapath = ev.msg.datapath
+        ofproto = datapath.ofproto
+        for stat in ev.msg.body:
+            if (stat.max_meter and stat.band_types & (1 << ofproto.OFPMBT_DROP)
+                    and stat.capabilities & ofproto.OFPMF_PKTPS):
+                self.meter_dpids.add(datapath.id)
+                self.install_packet_in_meter(datapath)
+                self.install_table_miss(datapath)
+                return
+        self.logger.info(f"dpid {datapath.id} tidak mendukung meter, packet-in hanya dibatasi di controller")
+
+    def install_packet_in_meter(self, datapath):
+        # ADD lalu MODIFY: meter sisa proses sebelumnya (ADD ditolak METER_EXISTS) tetap ikut rate terbaru
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        bands = [parser.OFPMeterBandDrop(rate=self.PACKET_IN_METER_RATE, burst_size=self.PACKET_IN_METER_BURST)]
+        for command in (ofproto.OFPMC_ADD, ofproto.OFPMC_MODIFY):
+            datapath.send_msg(parser.OFPMeterMod(datapath, command, ofproto.OFPMF_PKTPS | ofproto.OFPMF_BURST,
+                                                 self.PACKET_IN_METER_ID, bands))
+
+    def add_flow(self, datapath, priority, match, actions, buffer_id=None, table_id=0, goto_table=None, metadata=None,
+                 idle_timeout=0, hard_timeout=0, cookie=0, flags=0, meter_id=None):
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
-        inst = [parser.OFPInstructionActions(ofproto.OFPIT_APPLY_ACTIONS, actions)]
+        inst = []
+        if meter_id is not None:
+            inst.append(parser.OFPInstructionMeter(meter_id, ofproto.OFPIT_METER))
+        if actions:
+            inst.append(parser.OFPInstructionActions(ofproto.OFPIT_APPLY_ACTIONS, actions))
+        if metadata is not None:
+            inst.append(parser.OFPInstructionWriteMetadata(metadata, self.METADATA_MASK))
+        if goto_table is not None:
+            inst.append(parser.OFPInstructionGotoTable(goto_table))
+        # inst kosong = drop
+        kwargs = dict(datapath=datapath, table_id=table_id, priority=priority, match=match, instructions=inst,
+                      idle_timeout=idle_timeout, hard_timeout=hard_timeout, cookie=cookie | self.COOKIE_APP, flags=flags)
         if buffer_id:
-            mod = parser.OFPFlowMod(datapath=datapath, buffer_id=buffer_id, priority=priority, match=match, instructions=inst)
+            mod = parser.OFPFlowMod(buffer_id=buffer_id, **kwargs)
         else:
-            mod = parser.OFPFlowMod(datapath=datapath, priority=priority, match=match, instructions=inst)
+            mod = parser.OFPFlowMod(**kwargs)
         datapath.send_msg(mod)
 
-    def get_zone_category(self, ip_addr):
-        # Helper function untuk convert IP to integer
-        def ip_to_int(ip):
-            try:
-                parts = ip.split('.')
-                return (int(parts[0]) << 24) + (int(parts[1]) << 16) + (int(parts[2]) << 8) + int(parts[3])
-            except:
-                return 0
-
-        # Helper function untuk cek IP dalam range
-        def ip_in_range(ip_addr, range_info):
-            if 'start' in range_info and 'end' in range_info:
-                ip_int = ip_to_int(ip_addr)
-                start_int = ip_to_int(range_info['start'])
-                end_int = ip_to_int(range_info['end'])
-                return start_int <= ip_int <= end_int
-            return False
+    def install_drop_flow(self, datapath, src_ip, dst_ip, proto, icmp_type=None):
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        now = time.monotonic()
+        key = ip_to_int(src_ip)
+
+        # Exponential backoff: setiap pelanggaran baru dari sumber yang sama (tujuan apa pun) menggandakan
+        # hard timeout (packet-in yang masih di jalan < 1 detik setelah strike terakhir tidak dihitung)
+        entry = self.drop_offenders.get(key)
+        if entry is None or now - entry[1] >= 1.0:
+            entry = [0 if entry is None or now - entry[1] >= self.DROP_BACKOFF_RESET else entry[0] + 1, now]
+            if self.shard is not None:
+                self.shard.publish({'op': 'offender', 'ip': key, 'strike': entry[0]})
+        self.remember_offender(key, entry)
+        hard_timeout = min(self.DROP_HARD_TIMEOUT << entry[0], self.DROP_HARD_TIMEOUT_MAX)
+
+        fields = {'eth_type': ether_types.ETH_TYPE_IP, 'ipv4_src': int_to_ip(ip_to_int(src_ip)),
+                  'ipv4_dst': int_to_ip(ip_to_int(dst_ip)), 'ip_proto': proto}
+        # ICMP dikunci per tipe supaya echo reply (return traffic) yang diizinkan tidak ikut ter-drop
+        if proto == 1 and icmp_type is not None:
+            fields['icmpv4_type'] = icmp_type
+        idle_timeout = min(self.DROP_IDLE_TIMEOUT, hard_timeout)
+        cookie = (self.COOKIE_DROP << 56) | self.pair_cookie(src_ip, dst_ip)
+        self.add_flow(datapath, self.DROP_PRIORITY, parser.OFPMatch(**fields), [],
+                      idle_timeout=idle_timeout, hard_timeout=hard_timeout,
+                      cookie=cookie, flags=ofproto.OFPFF_SEND_FLOW_REM)
+        return hard_timeout
 
-        def ip_in_zone(ip_addr, zone_name):
-            for range_info in self.zones[zone_name]:
-                if ip_in_range(ip_addr, range_info):
-                    return True
+    def remember_offender(self, src_ip, entry):
+        # Entri terbaru di akhir; sumber yang paling lama tidak melanggar dibuang duluan (LRU)
+        self.drop_offenders.pop(src_ip, None)
+        self.drop_offenders[src_ip] = entry
+        while len(self.drop_offenders) > self.DROP_TRACK_MAX:
+            self.drop_offenders.popitem(last=False)
+
+    def packet_in_permitted(self, datapath, src, in_port):
+        # Kuota MAC sumber dulu (sumber yang dikarantina tidak memakan jatah switch), lalu jatah switch.
+        # Kuota sumber hanya dihitung di port akses: paket yang sama memicu packet-in lagi di setiap
+        # switch transit, dan drop flow kuota di port antar-switch memutus host lain di belakangnya
+        if self.PACKET_IN_SOURCE_RATE and not self.topology.is_switch_port(datapath.id, in_port):
+            now = time.monotonic()
+            until = self.quota_blocked.get(src)
+            if until is not None:
+                if now < until:
+                    # Paket yang sudah di jalan sebelum drop flow kuota terpasang
+                    self.metrics.inc('packet_in_throttled_total', labels=THROTTLE_LABELS['source'])
+                    return False
+                del self.quota_blocked[src]
+            if not self.source_quota.allow(src):
+                self.install_quota_drop(datapath, src, in_port, now)
+                self.metrics.inc('packet_in_throttled_total', labels=THROTTLE_LABELS['source'])
+                return False
+        if self.PACKET_IN_DPID_RATE and not self.dpid_quota.allow(datapath.id):
+            self.metrics.inc('packet_in_throttled_total', labels=THROTTLE_LABELS['dpid'])
             return False
+        return True
+
+    def install_quota_drop(self, datapath, src, in_port, now):
+        # Drop flow sementara di port akses host: in_port (bukan port antar-switch), atau lokasi host
+        # dari topologi kalau diketahui (mode path)
+        location = self.topology.hosts.get(src)
+        if location is not None and location[0] in self.datapaths and self.owns(location[0]):
+            datapath, in_port = self.datapaths[location[0]], location[1]
+        if len(self.quota_blocked) >= self.DROP_TRACK_MAX:
+            self.quota_blocked = {mac: until for mac, until in self.quota_blocked.items() if until > now}
+        self.quota_blocked[src] = now + self.QUOTA_DROP_TIMEOUT
+        self.add_flow(datapath, self.QUOTA_DROP_PRIORITY, datapath.ofproto_parser.OFPMatch(in_port=in_port, eth_src=src),
+                      [], hard_timeout=self.QUOTA_DROP_TIMEOUT, cookie=self.COOKIE_QUOTA << 56)
+        self.metrics.inc('quota_drop_flows_total')
+        self.logger.warning(f"Kuota packet-in terlampaui: {src} (dpid {datapath.id} port {in_port}) "
+                            f"di-drop {self.QUOTA_DROP_TIMEOUT}s")
+
+    def audit_fields(self, src_ip, dst_ip, is_reply):
+        # Dipanggil writer audit saat flush (di luar hot path packet-in)
+        return (self.zone_index.lookup(src_ip), self.zone_index.lookup(dst_ip),
+                self.policy.rule_id(src_ip, dst_ip, is_reply))
+
+    def _audit_loop(self):
+        while True:
+            hub.sleep(self.AUDIT_FLUSH_INTERVAL)
+            # Kuras antrean per batch, beri giliran ke event lain di antara batch
+            while True:
+                count, dropped = self.audit.flush()
+                if dropped:
+                    self.logger.warning(f"Audit log penuh: {dropped} record dibuang (total {self.audit.dropped})")
+                if count < self.AUDIT_BATCH_SIZE:
+                    break
+                hub.sleep(0)
+
+    def collect_metrics(self, metrics):
+        # Gauge dari state controller, dihitung saat /metrics di-scrape
+        metrics.set('datapaths', len(self.datapaths))
+        metrics.set('mac_table_entries', len(self.mac_to_port))
+        metrics.set('conntrack_entries', len(self.conntrack))
+        metrics.set('drop_offenders', len(self.drop_offenders))
+        metrics.set('quota_blocked_sources', len(self.quota_blocked))
+        metrics.set('aggregate_flows', sum(len(installed) for installed in self.aggregate_flows.values()))
+        if self.audit is not None:
+            metrics.set('audit_queue', len(self.audit))
+            metrics.set('audit_dropped', self.audit.dropped)
+
+    def _stats_loop(self):
+        while True:
+            for datapath in list(self.datapaths.values()):
+                if self.owns(datapath.id):
+                    self.request_stats(datapath)
+            hub.sleep(self.STATS_POLL_INTERVAL)
+
+    def request_stats(self, datapath):
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        datapath.send_msg(parser.OFPFlowStatsRequest(datapath))
+        datapath.send_msg(parser.OFPPortStatsRequest(datapath, 0, ofproto.OFPP_ANY))
+        datapath.send_msg(parser.OFPTableStatsRequest(datapath, 0))
+        if datapath.id in self.meter_dpids:
+            datapath.send_msg(parser.OFPMeterStatsRequest(datapath, 0, self.PACKET_IN_METER_ID))
+
+    @set_ev_cls(ofp_event.EventOFPFlowStatsReply, MAIN_DISPATCHER)
+    def _flow_stats_reply_handler(self, ev):
+        # Reply bisa terpecah jadi beberapa multipart (flag REPLY_MORE): dijumlah dulu per tabel
+        msg = ev.msg
+        dpid = msg.datapath.id
+        pending = self.reconcile_pending.get(dpid)
+        if pending is not None and msg.xid == pending[0]:
+            pending[1].extend(msg.body)
+            if not msg.flags & msg.datapath.ofproto.OFPMPF_REPLY_MORE:
+                del self.reconcile_pending[dpid]
+                self.reconcile_flows(msg.datapath, pending[1])
+            return
+        partial = self.flow_stats_partial.setdefault(dpid, {})
+        for stat in msg.body:
+            entry = partial.setdefault(stat.table_id, [0, 0, 0])
+            entry[0] += 1
+            entry[1] += stat.packet_count
+            entry[2] += stat.byte_count
+        if msg.flags & msg.datapath.ofproto.OFPMPF_REPLY_MORE:
+            return
+        del self.flow_stats_partial[dpid]
+        for key in [key for key in self.metrics.gauges if key[0].startswith('flow_') and ('dpid', dpid) in key[1]]:
+            del self.metrics.gauges[key]
+        for table_id, (flows, packets, byte_count) in partial.items():
+            labels = (('dpid', dpid), ('table', table_id))
+            self.metrics.set('flow_entries', flows, labels)
+            self.metrics.set('flow_packets', packets, labels)
+            self.metrics.set('flow_bytes', byte_count, labels)
 
-        # Cek IP masuk kategori mana dengan subnet ranges
-        for zone_name, zone_ranges in self.zones.items():
-            if zone_name in ['DEKAN']:
+    @set_ev_cls(ofp_event.EventOFPPortStatsReply, MAIN_DISPATCHER)
+    def _port_stats_reply_handler(self, ev):
+        dpid = ev.msg.datapath.id
+        for stat in ev.msg.body:
+            labels = (('dpid', dpid), ('port', stat.port_no))
+            self.metrics.set('port_rx_packets', stat.rx_packets, labels)
+            self.metrics.set('port_tx_packets', stat.tx_packets, labels)
+            self.metrics.set('port_rx_bytes', stat.rx_bytes, labels)
+            self.metrics.set('port_tx_bytes', stat.tx_bytes, labels)
+            self.metrics.set('port_rx_dropped', stat.rx_dropped, labels)
+            self.metrics.set('port_tx_dropped', stat.tx_dropped, labels)
+            self.metrics.set('port_errors', stat.rx_errors + stat.tx_errors, labels)
+
+    @set_ev_cls(ofp_event.EventOFPTableStatsReply, MAIN_DISPATCHER)
+    def _table_stats_reply_handler(self, ev):
+        # Hanya tabel yang terpakai (switch melaporkan semua 254 tabel)
+        dpid = ev.msg.datapath.id
+        for stat in ev.msg.body:
+            if not stat.active_count and not stat.lookup_count:
                 continue
-            if zone_name == 'LAB':
-                # Lab diperlakukan sebagai Mahasiswa
-                for range_info in zone_ranges:
-                    if ip_in_range(ip_addr, range_info):
-                        return 'MAHASISWA'
-            else:
-                for range_info in zone_ranges:
-                    if ip_in_range(ip_addr, range_info):
-                        return zone_name
+            labels = (('dpid', dpid), ('table', stat.table_id))
+            self.metrics.set('table_active', stat.active_count, labels)
+            self.metrics.set('table_lookups', stat.lookup_count, labels)
+            self.metrics.set('table_matched', stat.matched_count, labels)
+            capacity = self.table_capacity.get((dpid, stat.table_id))
+            if capacity:
+                utilization = stat.active_count / capacity
+                self.metrics.set('table_utilization', utilization, labels)
+                key = (dpid, stat.table_id)
+                if utilization >= self.TABLE_UTILIZATION_WARN and key not in self.table_full:
+                    self.table_full.add(key)
+                    self.logger.warning(f"Tabel {stat.table_id} dpid {dpid} terisi {utilization:.0%} "
+                                        f"({stat.active_count}/{capacity} entri)")
+                elif utilization < self.TABLE_UTILIZATION_WARN:
+                    self.table_full.discard(key)
 
-        return 'UNKNOWN'
+    @set_ev_cls(ofp_event.EventOFPTableFeaturesStatsReply, [CONFIG_DISPATCHER, MAIN_DISPATCHER])
+    def _table_features_reply_handler(self, ev):
+        # Reply bisa multipart; setiap bagian berisi sebagian tabel
+        dpid = ev.msg.datapath.id
+        for stat in ev.msg.body:
+            self.table_capacity[(dpid, stat.table_id)] = stat.max_entries
 
-    def check_security(self, src_ip, dst_ip, icmp_type=None):
-        src_cat = self.get_zone_category(src_ip)
-        dst_cat = self.get_zone_category(dst_ip)
+    @set_ev_cls(ofp_event.EventOFPMeterStatsReply, MAIN_DISPATCHER)
+    def _meter_stats_reply_handler(self, ev):
+        dpid = ev.msg.datapath.id
+        for stat in ev.msg.body:
+            if stat.meter_id == self.PACKET_IN_METER_ID:
+                labels = (('dpid', dpid),)
+                self.metrics.set('packet_in_meter_packets', stat.packet_in_count, labels)
+                self.metrics.set('packet_in_meter_dropped', sum(band.packet_band_count for band in stat.band_stats), labels)
+
+    @set_ev_cls(ofp_event.EventOFPFlowRemoved, MAIN_DISPATCHER)
+    def _flow_removed_handler(self, ev):
+        msg = ev.msg
+        if msg.cookie >> 56 == self.COOKIE_AGGREGATE:
+            installed = self.aggregate_flows.get(msg.datapath.id)
+            if installed is not None:
+                installed.pop((msg.match.get('in_port'), msg.match.get('eth_dst')), None)
+            return
+        if msg.cookie >> 56 == 0 and msg.cookie & self.COOKIE_PAIR:
+            # Flow 5-tuple koneksi conntrack habis (idle / dihapus): entri tidak lagi ditahan
+            key = self.connection_key(msg.match, msg.priority)
+            if key is not None:
+                self.conntrack.unpin(key, (msg.datapath.id, msg.priority))
+            return
+        if msg.cookie >> 56 != self.COOKIE_DROP:
+            return
+        src_ip = msg.match.get('ipv4_src')
+        dst_ip = msg.match.get('ipv4_dst')
+        # Paket yang di-drop di switch tetap tercatat per sumber (audit)
+        total = self.suppressed_packets.pop(src_ip, 0) + msg.packet_count
+        self.suppressed_packets[src_ip] = total
+        while len(self.suppressed_packets) > self.DROP_TRACK_MAX:
+            self.suppressed_packets.popitem(last=False)
+        self.metrics.inc('drop_flow_packets_total', msg.packet_count)
+        if msg.packet_count:
+            self.logger.warning(f"DROP flow selesai: {msg.packet_count} paket diblok di switch | "
+                                f"{src_ip} -> {dst_ip} (total dari {src_ip}: {total})")
+
+    def proactive_entries(self, policy):
+        # Entri table klasifikasi + policy untuk sebuah policy terkompilasi:
+        # (table_id, priority, field match) -> (metadata, goto_table). Dipakai untuk install awal
+        # dan untuk diff saat reload (id kelas stabil, jadi metadata lama tetap bermakna)
+        entries = {}
+        class_prefixes = policy.class_prefixes()
+
+        def prefix(net, prefix_len):
+            return (int_to_ip(net), int_to_ip(prefix_mask(prefix_len)))
+
+        def entry(table_id, priority, fields, metadata=None, goto_table=None):
+            entries[(table_id, priority, match_key(fields))] = (metadata, goto_table)
+
+        # Table 0: IP sumber -> metadata kelas zona (prefix dari self.zones), non-IP langsung ke L2
+        for class_id, prefixes in class_prefixes.items():
+            for net, prefix_len in prefixes:
+                entry(self.TABLE_CLASSIFY, 10, {'eth_type': ether_types.ETH_TYPE_IP, 'ipv4_src': prefix(net, prefix_len)},
+                      class_id, self.TABLE_POLICY)
+        entry(self.TABLE_CLASSIFY, 1, {'eth_type': ether_types.ETH_TYPE_IP}, 0, self.TABLE_POLICY)
+        entry(self.TABLE_CLASSIFY, 0, {}, None, self.TABLE_L2)
+
+        # Table 1: matriks allow/deny. Allow -> lanjut ke L2, block -> tanpa instruksi (drop).
+        # OF1.3 hanya bisa bawa satu hasil lookup per table, jadi IP tujuan dicocokkan langsung
+        # pakai prefix di sini (hanya untuk kelas tujuan yang keputusannya beda dari default).
+        for src_class, dst_class, reply_only, allowed in policy.matrix_entries():
+            fields = {'eth_type': ether_types.ETH_TYPE_IP, 'metadata': (src_class, self.METADATA_MASK)}
+            if reply_only:
+                fields.update(ip_proto=1, icmpv4_type=icmp.ICMP_ECHO_REPLY)
+            goto_table = self.TABLE_L2 if allowed else None
+            if dst_class is None:
+                entry(self.TABLE_POLICY, 2 if reply_only else 1, fields, None, goto_table)
+                continue
+            for net, prefix_len in class_prefixes.get(dst_class, []):
+                entry(self.TABLE_POLICY, 20 if reply_only else 10, dict(fields, ipv4_dst=prefix(net, prefix_len)),
+                      None, goto_table)
+        return entries
 
-        # Helper functions
-        def ip_to_int(ip):
+    def install_pipeline_entry(self, datapath, key, value):
+        table_id, priority, fields = key
+        metadata, goto_table = value
+        self.add_flow(datapath, priority, datapath.ofproto_parser.OFPMatch(**dict(fields)), [],
+                      table_id=table_id, goto_table=goto_table, metadata=metadata,
+                      cookie=self.COOKIE_PIPELINE << 56)
+
+    def install_proactive_pipeline(self, datapath):
+        for key, value in self.proactive_entries(self.policy).items():
+            self.install_pipeline_entry(datapath, key, value)
+
+        # Table 2: table-miss ke controller (MAC learning), entri eth_dst dipasang dari packet-in
+        self.install_table_miss(datapath)
+
+    def update_proactive_pipeline(self, datapath, old_entries, new_entries):
+        # Make-before-break: entri baru/berubah dipasang dulu (table policy lalu klasifikasi;
+        # ADD dengan match + priority sama menimpa entri lama di tempat), barrier, baru entri
+        # yang sudah tidak ada dihapus dengan DELETE_STRICT. Entri yang sama tidak disentuh.
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        changed = [key for key, value in new_entries.items() if old_entries.get(key) != value]
+        for key in sorted(changed, key=lambda key: -key[0]):
+            self.install_pipeline_entry(datapath, key, new_entries[key])
+        datapath.send_msg(parser.OFPBarrierRequest(datapath))
+        stale = [key for key in old_entries if key not in new_entries]
+        for table_id, priority, fields in stale:
+            mod = parser.OFPFlowMod(datapath=datapath, command=ofproto.OFPFC_DELETE_STRICT, table_id=table_id,
+                                    priority=priority, out_port=ofproto.OFPP_ANY, out_group=ofproto.OFPG_ANY,
+                                    match=parser.OFPMatch(**dict(fields)))
+            datapath.send_msg(mod)
+        return len(changed), len(stale)
+
+    def pair_cookie(self, src_ip, dst_ip):
+        lookup = self.policy.class_index.lookup
+        return self.COOKIE_PAIR | (lookup(src_ip) << 16) | lookup(dst_ip)
+
+    def _policy_loop(self):
+        while True:
+            hub.sleep(self.POLICY_RELOAD_INTERVAL)
             try:
-                parts = ip.split('.')
-                return (int(parts[0]) << 24) + (int(parts[1]) << 16) + (int(parts[2]) << 8) + int(parts[3])
-            except:
-                return 0
-
-        def ip_in_range(ip_addr, range_info):
-            if 'start' in range_info and 'end' in range_info:
-                ip_int = ip_to_int(ip_addr)
-                start_int = ip_to_int(range_info['start'])
-                end_int = ip_to_int(range_info['end'])
-                return start_int <= ip_int <= end_int
+                mtime = os.path.getmtime(self.POLICY_FILE)
+            except OSError:
+                continue
+            if mtime != self.policy_mtime:
+                self.policy_mtime = mtime
+                self.reload_policy()
+
+    def reload_policy(self):
+        # Kompilasi policy baru (~1 ms), ganti referensi self.policy sekaligus (packet-in berikutnya
+        # langsung pakai policy baru), lalu bersihkan hanya flow/state yang terdampak perubahan
+        try:
+            zones, rules, building_octets = load_policy(self.POLICY_FILE)
+            new = CompiledPolicy(zones, rules, building_octets, known_classes=self.policy.classes)
+        except Exception as e:
+            self.logger.error(f"Policy baru ditolak, policy lama tetap dipakai: {e}")
             return False
+        old = self.policy
+        affected = old.affected_pairs(new)
+        old_entries = self.proactive_entries(old) if self.PROACTIVE_MODE else None
+
+        self.zones = zones
+        self.policy = new
+        self.zone_index = new.zone_index
+
+        # State controller yang diturunkan dari policy lama
+        self.conntrack.remove_if(lambda key: not new.decide(key[1], key[2], False)[0])
+        # Sumber yang di policy baru tidak diblok ke kelas mana pun tidak perlu backoff lagi
+        for src_ip in [src_ip for src_ip in self.drop_offenders
+                       if all(new.allowed(new.class_index.lookup(src_ip), dst_class, False)
+                              for dst_class in range(len(new.classes)))]:
+            del self.drop_offenders[src_ip]
+        if self.PATH_MODE:
+            self.rebuild_switch_classes()
 
-        def ip_in_zone(ip_addr, zone_name):
-            for range_info in self.zones[zone_name]:
-                if ip_in_range(ip_addr, range_info):
-                    return True
+        new_entries = self.proactive_entries(new) if self.PROACTIVE_MODE else None
+        flow_mods = 0
+        for datapath in [datapath for datapath in list(self.datapaths.values()) if self.owns(datapath.id)]:
+            if self.PROACTIVE_MODE:
+                flow_mods += sum(self.update_proactive_pipeline(datapath, old_entries, new_entries))
+            else:
+                # Flow reaktif (L2, conntrack, drop, jalur) di-tag pasangan kelas: hapus per cookie
+                parser = datapath.ofproto_parser
+                for src_class, dst_class in affected:
+                    self.delete_flows(datapath, parser.OFPMatch(),
+                                      cookie=self.COOKIE_APP | self.COOKIE_PAIR | (src_class << 16) | dst_class,
+                                      cookie_mask=self.COOKIE_PAIR_MASK)
+                flow_mods += len(affected)
+            hub.sleep(0)
+        self.logger.info(f"Policy di-reload dari {self.POLICY_FILE}: {len(affected)} pasangan kelas terdampak, "
+                         f"{flow_mods} flow-mod ke {len(self.datapaths)} switch")
+        return True
+
+    def rebuild_switch_classes(self):
+        self.switch_classes = {}
+        for mac, (dpid, _) in self.topology.hosts.items():
+            ip_addr = self.arp_table.ip_of(mac)
+            if ip_addr is not None:
+                self.switch_classes.setdefault(dpid, set()).add(self.policy.class_index.lookup(ip_addr))
+
+    # --- Warm restart: snapshot state + rekonsiliasi flow ---
+
+    def _snapshot_loop(self):
+        while True:
+            hub.sleep(self.SNAPSHOT_INTERVAL)
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        # Umur entri disimpan relatif (clock monotonic tidak berlaku antar proses) + waktu simpan
+        now = time.monotonic()
+        state = {
+            'saved_at': time.time(),
+            'classes': [list(ip_class) for ip_class in self.policy.classes],
+            'mac_table': self.mac_to_port.snapshot(),
+            'hosts': [[mac, dpid, port] for mac, (dpid, port) in self.topology.hosts.items()],
+            'arp_table': self.arp_table.snapshot(),
+            'conntrack': [[list(key), age] for key, age in self.conntrack.snapshot()],
+            'drop_offenders': [[src_ip, strike, now - ts] for src_ip, (strike, ts) in self.drop_offenders.items()],
+        }
+        tmp_path = self.SNAPSHOT_FILE + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.SNAPSHOT_FILE)
+        except OSError as e:
+            self.logger.error(f"Snapshot gagal disimpan ke {self.SNAPSHOT_FILE}: {e}")
             return False
+        return True
+
+    def restore_snapshot(self):
+        if not self.SNAPSHOT_FILE or not os.path.exists(self.SNAPSHOT_FILE):
+            return False
+        try:
+            with open(self.SNAPSHOT_FILE) as f:
+                state = json.load(f)
+            downtime = max(0.0, time.time() - state['saved_at'])
+            # Id kelas lama dipakai lagi supaya cookie pasangan kelas di flow yang masih ada tetap bermakna
+            policy = self.policy
+            self.policy = CompiledPolicy(self.zones, policy.rules, policy.building_octets,
+                                         known_classes=[tuple(ip_class) for ip_class in state['classes']])
+            self.zone_index = self.policy.zone_index
+            self.mac_to_port.restore([(dpid, mac, port, age + downtime) for dpid, mac, port, age in state['mac_table']])
+            for mac, dpid, port in state['hosts']:
+                self.topology.hosts[mac] = (dpid, port)
+            self.arp_table.restore([(ip_addr, mac, age + downtime) for ip_addr, mac, age in state['arp_table']])
+            self.conntrack.restore([(tuple(key), age + downtime) for key, age in state['conntrack']])
+            now = time.monotonic()
+            for src_ip, strike, age in sorted(state['drop_offenders'], key=lambda entry: -entry[2]):
+                if age + downtime < self.DROP_BACKOFF_RESET:
+                    self.drop_offenders[src_ip] = [strike, now - age - downtime]
+            self.rebuild_switch_classes()
+        except Exception as e:
+            self.logger.error(f"Snapshot {self.SNAPSHOT_FILE} tidak bisa dipulihkan: {e}")
+            return False
+        self.logger.info(f"State dipulihkan dari {self.SNAPSHOT_FILE} (downtime {downtime:.0f}s): "
+                         f"{len(self.mac_to_port)} MAC, {len(self.arp_table)} ARP, {len(self.conntrack)} conntrack")
+        return True
+
+    def request_reconcile(self, datapath):
+        # Query hanya flow bertag app ini (cookie mask), hasilnya ke reconcile_flows
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        req = parser.OFPFlowStatsRequest(datapath, 0, ofproto.OFPTT_ALL, ofproto.OFPP_ANY, ofproto.OFPG_ANY,
+                                         self.COOKIE_APP, self.COOKIE_APP_MASK, parser.OFPMatch())
+        datapath.send_msg(req)
+        self.reconcile_pending[datapath.id] = (req.xid, [])
+        hub.spawn_after(self.RECONCILE_TIMEOUT, self.reconcile_timeout, datapath, req.xid)
 
-        # RULE 1: Keuangan (bagian dari SECURE) ke Dekan -> BLOCK (Keuangan tidak bisa akses Dekan)
-        if src_cat == 'SECURE' and ip_in_zone(dst_ip, 'DEKAN'):
-            if icmp_type == icmp.ICMP_ECHO_REPLY:
-                return True, "ALLOW: Ping Reply (Return Traffic)", False
-            return False, "BLOCK: Mencoba akses Dekan", False
+    def reconcile_timeout(self, datapath, xid):
+        pending = self.reconcile_pending.get(datapath.id)
+        if pending is None or pending[0] != xid:
+            return
+        del self.reconcile_pending[datapath.id]
+        self.logger.warning(f"Flow stats dpid {datapath.id} tidak dijawab, flow dipasang ulang penuh")
+        if self.PROACTIVE_MODE:
+            self.install_proactive_pipeline(datapath)
 
-        # RULE 1a: Dekan bisa mengakses semua zona (Mahasiswa, Lab, Dosen, Keuangan) -> ALLOW
-        if ip_in_zone(src_ip, 'DEKAN'):
-            return True, "ALLOW: Dekan mengakses jaringan", True
+    def reconcile_flows(self, datapath, flows):
+        # Flow sisa proses controller sebelumnya: pipeline proaktif di-diff terhadap policy sekarang,
+        # flow lain dipakai ulang kalau masih konsisten (flow_consistent), sisanya DELETE_STRICT
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        pipeline, pipeline_stats, stale = {}, [], []
+        for stat in flows:
+            if stat.cookie >> 56 == self.COOKIE_PIPELINE:
+                metadata, goto_table = None, None
+                for inst in stat.instructions:
+                    if isinstance(inst, parser.OFPInstructionWriteMetadata):
+                        metadata = inst.metadata
+                    elif isinstance(inst, parser.OFPInstructionGotoTable):
+                        goto_table = inst.table_id
+                pipeline[(stat.table_id, stat.priority, match_key(dict(stat.match.items())))] = (metadata, goto_table)
+                pipeline_stats.append(stat)
+            elif not self.flow_consistent(datapath.id, stat):
+                stale.append(stat)
+            elif stat.cookie & self.COOKIE_PAIR:
+                key = self.connection_key(stat.match, stat.priority)
+                if key is not None:
+                    self.conntrack.pin(key, (datapath.id, stat.priority))
 
-        # RULE 2: Mahasiswa/Lab -> Ujian (BLOCK)
-        if src_cat == 'MAHASISWA' and dst_cat == 'UJIAN':
-            if icmp_type == icmp.ICMP_ECHO_REPLY:
-                return True, "ALLOW: Ping Reply (Return Traffic)", False
-            return False, "BLOCK: Mahasiswa/Lab mencoba akses Ujian", False
+        if self.PROACTIVE_MODE:
+            changed, removed = self.update_proactive_pipeline(datapath, pipeline, self.proactive_entries(self.policy))
+            self.install_table_miss(datapath)
+        else:
+            changed, removed = 0, 0
+            stale.extend(pipeline_stats)
+        for stat in stale:
+            mod = parser.OFPFlowMod(datapath=datapath, cookie=stat.cookie, cookie_mask=0xFFFFFFFFFFFFFFFF,
+                                    command=ofproto.OFPFC_DELETE_STRICT, table_id=stat.table_id,
+                                    priority=stat.priority, out_port=ofproto.OFPP_ANY, out_group=ofproto.OFPG_ANY,
+                                    match=stat.match)
+            datapath.send_msg(mod)
+        adopted = len(flows) - len(stale) - len(pipeline_stats) + (len(pipeline) - removed if self.PROACTIVE_MODE else 0)
+        self.logger.info(f"Rekonsiliasi dpid {datapath.id}: {adopted} flow dipakai ulang, "
+                         f"{len(stale) + removed} dihapus, {changed} entri pipeline dipasang")
 
-        # RULE 3: Mahasiswa/Lab -> Secure (BLOCK)
-        if src_cat == 'MAHASISWA' and dst_cat == 'SECURE':
-            if icmp_type == icmp.ICMP_ECHO_REPLY:
-                return True, "ALLOW: Ping Reply (Return Traffic)", False
+    def flow_consistent(self, dpid, stat):
+        # Flow bertag pasangan kelas: verdict policy sekarang harus sama dengan saat flow dipasang.
+        # Flow forwarding: port keluar harus sama dengan tabel MAC (MAC yang belum dikenal dipelajari dari flow)
+        policy = self.policy
+        cookie = stat.cookie
+        if cookie & self.COOKIE_PAIR:
+            src_class, dst_class = (cookie >> 16) & 0xFFFF, cookie & 0xFFFF
+            if src_class >= len(policy.classes) or dst_class >= len(policy.classes):
+                return False
+            if cookie >> 56 == self.COOKIE_DROP:
+                is_reply = stat.match.get('icmpv4_type') == icmp.ICMP_ECHO_REPLY
+                return not policy.allowed(src_class, dst_class, is_reply)
+            if stat.priority == self.CONNTRACK_PRIORITY:
+                # Flow arah balik: arah asli (dst -> src) harus masih diizinkan
+                return policy.allowed(dst_class, src_class, False)
+            n = len(policy.classes)
+            allowed, _, install = policy.decisions[(src_class * n + dst_class) * 2]
+            if not (allowed and install):
+                return False
+        elif cookie >> 56 == self.COOKIE_AGGREGATE and not self.AGGREGATE_TRANSIT:
+            return False
 
-            return False, "BLOCK: Mahasiswa/Lab mencoba akses Zona Aman", False
+        eth_dst = stat.match.get('eth_dst')
+        out_port = None
+        for inst in stat.instructions:
+            for action in getattr(inst, 'actions', []):
+                if hasattr(action, 'port'):
+                    out_port = action.port
+        if eth_dst is not None and out_port is not None and out_port < ofproto_v1_3.OFPP_MAX:
+            known_port = self.mac_to_port.get(dpid, eth_dst)
+            if known_port is None:
+                self.mac_to_port.learn(dpid, eth_dst, out_port)
+            elif known_port != out_port:
+                return False
+            if cookie >> 56 == self.COOKIE_AGGREGATE:
+                self.aggregate_flows.setdefault(dpid, {})[(stat.match.get('in_port'), eth_dst)] = out_port
+        return True
 
-        # RULE 4: Mahasiswa/Lab -> Dosen (BLOCK)
-        if src_cat == 'MAHASISWA' and dst_cat == 'DOSEN':
-            if icmp_type == icmp.ICMP_ECHO_REPLY:
-                return True, "ALLOW: Ping Reply (Return Traffic)", False
+    # --- Sharding multi-proses ---
 
-            return False, "BLOCK: Mahasiswa/Lab mencoba akses Dosen", False
+    def owns(self, dpid):
+        owned = self.shard_owned.get(dpid)
+        if owned is None:
+            owned = (self.shard_workers is None
+                     or shard_owner(dpid, self.shard_workers, self.shard_owners) == self.SHARD_WORKER)
+            self.shard_owned[dpid] = owned
+        return owned
 
-        # RULE 6: Dosen -> Secure (BLOCK)
-        if src_cat == 'DOSEN' and dst_cat == 'SECURE':
-            if icmp_type == icmp.ICMP_ECHO_REPLY:
-                return True, "ALLOW: Ping Reply (Return Traffic)", False
+    def set_shard_role(self, datapath):
+        # MASTER untuk dpid milik worker ini (switch otomatis menurunkan master lama jadi SLAVE),
+        # SLAVE untuk sisanya. Dpid yang baru diambil alih dipasang seperti switch baru connect
+        # (rekonsiliasi memakai ulang flow yang dipasang worker sebelumnya)
+        ofproto = datapath.ofproto
+        if not self.shard_generation:
+            # Daftar worker belum datang; role dikirim saat pesan 'members' pertama
+            return
+        role = ofproto.OFPCR_ROLE_MASTER if self.owns(datapath.id) else ofproto.OFPCR_ROLE_SLAVE
+        if self.shard_roles.get(datapath.id) == role:
+            return
+        self.shard_roles[datapath.id] = role
+        datapath.send_msg(datapath.ofproto_parser.OFPRoleRequest(datapath, role, self.shard_generation))
+        if role == ofproto.OFPCR_ROLE_MASTER:
+            self.take_datapath(datapath)
 
-            return False, "BLOCK: Dosen mencoba akses Zona Aman", False
-        
-        
-        def get_building(ip_addr):
-            try:
-                octets = ip_addr.split('.')
-                if octets[0] == '192' and octets[1] == '168':
-                    if octets[2] in ['1', '5', '6', '10']:
-                        return 'G9'
-                elif octets[0] == '192' and octets[1] == '168':
-                    if octets[2] in ['20', '21']:
-                        return 'G10'
-            except:
-                pass
-            return 'UNKNOWN'
-
-        src_building = get_building(src_ip)
-        dst_building = get_building(dst_ip)
-
-        # RULE 8a: Antar lantai di gedung yang sama - ALLOW untuk semua kategori kecuali mahasiswa ke secure/dosen/ujian
-        if src_building == dst_building and src_building != 'UNKNOWN':
-            if src_cat == 'MAHASISWA' and dst_cat in ['SECURE', 'DOSEN', 'UJIAN']:
-                if icmp_type == icmp.ICMP_ECHO_REPLY:
-                    return True, "ALLOW: Ping Reply (Return Traffic)", False
-                return False, f"BLOCK: Mahasiswa lantai lain akses {dst_cat} di {src_building}", False
+    def _shard_load_loop(self):
+        # Jumlah packet-in per dpid milik worker ini, dasar pembagian dpid di koordinator
+        while True:
+            hub.sleep(LOAD_INTERVAL)
+            load, self.shard_load = self.shard_load, Counter()
+            if load:
+                self.shard.publish({'op': 'load', 'interval': LOAD_INTERVAL, 'dpids': dict(load)})
+
+    def share_location(self, dpid, mac, port):
+        # Lokasi baru/berubah saja yang dikirim (bukan setiap packet-in)
+        if self.mac_to_port.get(dpid, mac) != port:
+            self.shard.publish({'op': 'mac', 'dpid': dpid, 'mac': mac, 'port': port})
+        if (self.PATH_MODE and self.topology.hosts.get(mac) != (dpid, port)
+                and not self.topology.is_switch_port(dpid, port)):
+            self.shard.publish({'op': 'host', 'mac': mac, 'dpid': dpid, 'port': port})
+
+    def apply_shard_update(self, msg):
+        # Pesan dari store: daftar worker hidup atau state yang dipelajari worker lain
+        op = msg['op']
+        if op == 'members':
+            old_workers = self.shard_workers
+            self.shard_workers = msg['workers']
+            self.shard_generation = msg['generation']
+            self.shard_owners = {int(dpid): worker for dpid, worker in msg.get('owners', {}).items()}
+            self.shard_owned = {}
+            owned = [dpid for dpid in self.datapaths if self.owns(dpid)]
+            self.logger.info(f"Worker shard {self.shard_workers} (sebelumnya {old_workers}): "
+                             f"worker {self.SHARD_WORKER} memegang {len(owned)} dari {len(self.datapaths)} switch")
+            for datapath in list(self.datapaths.values()):
+                self.set_shard_role(datapath)
+        elif op == 'mac':
+            if not self.owns(msg['dpid']):
+                self.mac_to_port.learn(msg['dpid'], msg['mac'], msg['port'])
+        elif op == 'host':
+            self.topology.hosts[msg['mac']] = (msg['dpid'], msg['port'])
+        elif op == 'arp':
+            # Diisi dulu supaya learn_ip tidak mengirim balik binding ini ke store
+            self.arp_table.learn(msg['ip'], msg['mac'])
+            self.learn_ip(msg['dpid'], msg['mac'], msg['ip'], msg['transit'])
+        elif op == 'broadcast':
+            self.broadcast_access_ports(bytes.fromhex(msg['data']), msg['ip'], msg['dpid'], None)
+        elif op == 'unroute':
+            self.unroute_host(msg['mac'], msg['dpid'])
+        elif op == 'conn':
+            # Balasan bisa masuk di switch milik worker ini walaupun koneksi dicatat worker lain
+            self.conntrack.add(tuple(msg['key']))
+        elif op == 'offender':
+            entry = self.drop_offenders.get(msg['ip'])
+            strike = msg['strike'] if entry is None else max(entry[0], msg['strike'])
+            self.remember_offender(msg['ip'], [strike, time.monotonic()])
+        elif op == 'link':
+            self.topology.add_link(msg['src'], msg['port'], msg['dst'])
+        elif op == 'unlink':
+            self.topology.remove_link(msg['src'], msg['dst'])
+
+    def get_zone_category(self, ip_addr):
+        # Cek IP masuk kategori mana lewat index yang sudah dikompilasi
+        return self.zone_index.lookup(ip_to_int(ip_addr))
+
+    def check_security(self, src_ip, dst_ip, icmp_type=None):
+        # Rule chain (RULE 1 - RULE 9) ada di departemen_policy.RULES dan sudah dikompilasi
+        # jadi tabel keputusan; di sini cukup lookup kelas src/dst + index tabel
+        return self.policy.decide(ip_to_int(src_ip), ip_to_int(dst_ip), icmp_type == icmp.ICMP_ECHO_REPLY)
+
+    def flow_key(self, hdr):
+        # Key 5-tuple untuk conntrack (None kalau protokol tidak dilacak)
+        proto = hdr.ip_proto
+        if proto in (6, 17):
+            if hdr.src_port is None:
+                return None
+            return (proto, hdr.ip_src, hdr.ip_dst, hdr.src_port, hdr.dst_port)
+        if proto == 1 and hdr.icmp_id is not None:
+            if hdr.icmp_type == icmp.ICMP_ECHO_REQUEST:
+                return (proto, hdr.ip_src, hdr.ip_dst, hdr.icmp_id, 0)
+            if hdr.icmp_type == icmp.ICMP_ECHO_REPLY:
+                return (proto, hdr.ip_src, hdr.ip_dst, 0, hdr.icmp_id)
+        return None
+
+    def is_return_traffic(self, hdr, key):
+        if key[0] == 6:
+            # SYN tanpa ACK adalah koneksi baru, bukan balasan
+            if hdr.tcp_flags & tcp.TCP_SYN and not hdr.tcp_flags & tcp.TCP_ACK:
+                return False
+        return self.conntrack.is_reply(key)
+
+    def flow_key_match(self, parser, key, **extra):
+        # Match OpenFlow untuk satu arah flow 5-tuple (ICMP: hanya echo reply, id tidak bisa di-match)
+        proto, src_ip, dst_ip, src_port, dst_port = key
+        fields = {'eth_type': ether_types.ETH_TYPE_IP, 'ip_proto': proto,
+                  'ipv4_src': int_to_ip(src_ip), 'ipv4_dst': int_to_ip(dst_ip)}
+        if proto == 6:
+            fields.update(tcp_src=src_port, tcp_dst=dst_port)
+        elif proto == 17:
+            fields.update(udp_src=src_port, udp_dst=dst_port)
+        elif proto == 1:
+            fields.update(icmpv4_type=icmp.ICMP_ECHO_REPLY)
+        fields.update(extra)
+        return parser.OFPMatch(**fields)
+
+    def connection_key(self, match, priority):
+        # Key conntrack koneksi dari match flow 5-tuple TCP/UDP (flow arah balik -> key arah asli)
+        proto = match.get('ip_proto')
+        if proto not in (6, 17):
+            return None
+        prefix = 'tcp' if proto == 6 else 'udp'
+        src_port, dst_port = match.get(prefix + '_src'), match.get(prefix + '_dst')
+        if src_port is None or dst_port is None:
+            return None
+        src_ip, dst_ip = ip_to_int(match['ipv4_src']), ip_to_int(match['ipv4_dst'])
+        if priority == self.CONNTRACK_PRIORITY:
+            return (proto, dst_ip, src_ip, dst_port, src_port)
+        return (proto, src_ip, dst_ip, src_port, dst_port)
+
+    def install_connection_flow(self, datapath, priority, match, actions, conn_key, **kwargs):
+        # Flow 5-tuple milik koneksi conntrack: entri ditahan selama flow ada di switch (FLOW_REM)
+        self.add_flow(datapath, priority, match, actions, flags=datapath.ofproto.OFPFF_SEND_FLOW_REM, **kwargs)
+        self.conntrack.pin(conn_key, (datapath.id, priority))
+
+    def install_return_flow(self, datapath, conn_key, out_port):
+        # Arah balik koneksi yang diblok policy dipasang bersama flow keluar. Kalau menunggu balasan
+        # pertama lewat controller, drop flow lama arah itu (dari percobaan yang diblok) membuang
+        # balasan di switch dan sesi gagal sampai drop flow habis
+        proto, src_ip, dst_ip, src_port, dst_port = conn_key
+        parser = datapath.ofproto_parser
+        match = self.flow_key_match(parser, (proto, dst_ip, src_ip, dst_port, src_port))
+        self.install_connection_flow(datapath, self.CONNTRACK_PRIORITY, match, [parser.OFPActionOutput(out_port)],
+                                     conn_key, idle_timeout=self.CONNTRACK_TIMEOUT,
+                                     cookie=self.pair_cookie(dst_ip, src_ip))
+
+    def delete_flows(self, datapath, match, out_port=None, cookie=0, cookie_mask=0):
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        mod = parser.OFPFlowMod(datapath=datapath, cookie=cookie, cookie_mask=cookie_mask,
+                                command=ofproto.OFPFC_DELETE, table_id=ofproto.OFPTT_ALL,
+                                out_port=ofproto.OFPP_ANY if out_port is None else out_port,
+                                out_group=ofproto.OFPG_ANY, match=match)
+        datapath.send_msg(mod)
+
+    def handle_host_move(self, datapath, mac, old_port, new_port):
+        # MAC pindah port: hapus flow lama yang masih mengarah ke / berasal dari port lama
+        parser = datapath.ofproto_parser
+        self.logger.info(f"Host pindah: {mac} dpid {datapath.id} port {old_port} -> {new_port}")
+        self.delete_flows(datapath, parser.OFPMatch(eth_dst=mac), out_port=old_port)
+        self.delete_flows(datapath, parser.OFPMatch(in_port=old_port, eth_src=mac))
+        if self.PATH_MODE:
+            # Jalur ke host ini di switch lain juga sudah basi (switch worker lain dihapus pemiliknya)
+            self.unroute_host(mac, datapath.id)
+            if self.shard is not None:
+                self.shard.publish({'op': 'unroute', 'mac': mac, 'dpid': datapath.id})
+
+    def unroute_host(self, mac, skip_dpid):
+        for other in self.datapaths.values():
+            if other.id != skip_dpid and self.owns(other.id):
+                self.delete_flows(other, other.ofproto_parser.OFPMatch(eth_dst=mac))
+
+    def install_aggregate(self, datapath, in_port, dst, out_port):
+        # Satu flow (port masuk, MAC tujuan) untuk semua sumber. Flow yang masih terpasang tidak
+        # dikirim ulang; entri dilepas dari aggregate_flows saat flow-removed (idle / host pindah)
+        installed = self.aggregate_flows.setdefault(datapath.id, {})
+        if installed.get((in_port, dst)) == out_port:
+            return False
+        installed[(in_port, dst)] = out_port
+        parser = datapath.ofproto_parser
+        self.add_flow(datapath, 1, parser.OFPMatch(in_port=in_port, eth_dst=dst), [parser.OFPActionOutput(out_port)],
+                      idle_timeout=self.FLOW_IDLE_TIMEOUT, cookie=self.COOKIE_AGGREGATE << 56,
+                      flags=datapath.ofproto.OFPFF_SEND_FLOW_REM)
+        return True
+
+    def learn_ip(self, dpid, mac, ip_addr, transit):
+        if self.shard is not None and self.arp_table.get(ip_addr) != mac:
+            self.shard.publish({'op': 'arp', 'ip': ip_addr, 'mac': mac, 'dpid': dpid, 'transit': transit})
+        self.arp_table.learn(ip_addr, mac)
+        if self.PATH_MODE and not transit:
+            self.switch_classes.setdefault(dpid, set()).add(self.policy.class_index.lookup(ip_addr))
+
+    def is_broadcast(self, mac):
+        # Broadcast / multicast: bit I/G di oktet pertama
+        return int(mac[0:2], 16) & 0x01 == 1
+
+    def arp_permitted(self, src_ip, dst_ip):
+        # ARP dijawab/diteruskan kalau salah satu arah komunikasi diizinkan policy
+        # (arah sebaliknya tetap perlu resolusi untuk return traffic)
+        policy = self.policy
+        src_class = policy.class_index.lookup(src_ip)
+        return policy.class_index.lookup(dst_ip) in policy.reachable_classes(src_class)
+
+    def handle_arp(self, msg, hdr, in_port):
+        # Return True kalau ARP sudah ditangani controller (dijawab atau dibuang)
+        if hdr.arp_op != arp.ARP_REQUEST or hdr.arp_spa == hdr.arp_tpa:
+            return False
+        if hdr.arp_spa and not self.arp_permitted(hdr.arp_spa, hdr.arp_tpa):
+            self.logger.debug(f"ARP dibuang (zona tidak diizinkan) | {int_to_ip(hdr.arp_spa)} -> {int_to_ip(hdr.arp_tpa)}")
+            return True
+        target_mac = self.arp_table.get(hdr.arp_tpa)
+        if target_mac is None:
+            return False
+
+        datapath = msg.datapath
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        pkt = packet.Packet()
+        pkt.add_protocol(ethernet.ethernet(dst=hdr.eth_src, src=target_mac, ethertype=ether_types.ETH_TYPE_ARP))
+        pkt.add_protocol(arp.arp(opcode=arp.ARP_REPLY, src_mac=target_mac, src_ip=int_to_ip(hdr.arp_tpa),
+                                 dst_mac=hdr.arp_sha, dst_ip=int_to_ip(hdr.arp_spa)))
+        pkt.serialize()
+        actions = [parser.OFPActionOutput(in_port)]
+        out = parser.OFPPacketOut(datapath=datapath, buffer_id=ofproto.OFP_NO_BUFFER,
+                                  in_port=ofproto.OFPP_CONTROLLER, actions=actions, data=pkt.data)
+        datapath.send_msg(out)
+        return True
+
+    def scoped_broadcast(self, msg, hdr, in_port, sender_ip):
+        # Kirim broadcast langsung ke port akses switch yang relevan (tanpa lewat link antar-switch,
+        # jadi switch lain tidak packet-in). Switch yang belum punya host terdaftar tetap dikirimi.
+        # Mode sharding: switch milik worker lain dikirimi worker pemiliknya (lewat store)
+        ingress = msg.datapath
+        sender_ip = sender_ip or self.arp_table.ip_of(hdr.eth_src) or 0
+        self.broadcast_access_ports(msg.data, sender_ip, ingress.id, in_port, ingress)
+        if self.shard is not None and not all(self.owns(dpid) for dpid in self.datapaths):
+            self.shard.publish({'op': 'broadcast', 'data': bytes(msg.data).hex(), 'ip': sender_ip, 'dpid': ingress.id})
+
+    def broadcast_access_ports(self, data, sender_ip, ingress_id, in_port, ingress=None):
+        reachable = self.policy.reachable_classes(self.policy.class_index.lookup(sender_ip))
+        datapaths = {dpid: datapath for dpid, datapath in self.datapaths.items() if self.owns(dpid)}
+        if ingress is not None:
+            datapaths.setdefault(ingress_id, ingress)
+        for dpid, datapath in datapaths.items():
+            classes = self.switch_classes.get(dpid)
+            if classes and dpid != ingress_id and not classes & reachable:
+                continue
+            ofproto = datapath.ofproto
+            parser = datapath.ofproto_parser
+            ports = [port_no for port_no in datapath.ports
+                     if port_no <= ofproto.OFPP_MAX and not self.topology.is_switch_port(dpid, port_no)
+                     and not (dpid == ingress_id and port_no == in_port)]
+            if not ports:
+                continue
+            actions = [parser.OFPActionOutput(port_no) for port_no in ports]
+            out = parser.OFPPacketOut(datapath=datapath, buffer_id=ofproto.OFP_NO_BUFFER,
+                                      in_port=ofproto.OFPP_CONTROLLER, actions=actions, data=data)
+            datapath.send_msg(out)
+
+    def scoped_flood(self, msg, hdr, in_port, sender_ip):
+        # Mode reaktif: broadcast tetap diteruskan hop-by-hop, tapi port akses yang semua host
+        # terpelajarinya (mac_to_port + tabel ARP) ada di zona yang tidak boleh dijangkau pengirim
+        # dilewati. Port antar-switch dan port tanpa host yang dikenal tetap dikirimi
+        datapath = msg.datapath
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        policy = self.policy
+        sender_ip = sender_ip or self.arp_table.ip_of(hdr.eth_src) or 0
+        reachable = policy.reachable_classes(policy.class_index.lookup(sender_ip))
+        open_ports, closed_ports = set(), set()
+        for mac, port_no in self.mac_to_port.ports(datapath.id).items():
+            ip_addr = self.arp_table.ip_of(mac)
+            if ip_addr is None or policy.class_index.lookup(ip_addr) in reachable:
+                open_ports.add(port_no)
             else:
-                return True, f"ALLOW: Komunikasi antar lantai di {src_building}", True
+                closed_ports.add(port_no)
+        closed_ports = {port_no for port_no in closed_ports - open_ports
+                        if not self.topology.is_switch_port(datapath.id, port_no)}
+        if closed_ports and datapath.ports:
+            actions = [parser.OFPActionOutput(port_no) for port_no in datapath.ports
+                       if port_no <= ofproto.OFPP_MAX and port_no != in_port and port_no not in closed_ports]
+        else:
+            actions = [parser.OFPActionOutput(ofproto.OFPP_FLOOD)]
+        data = msg.data if msg.buffer_id == ofproto.OFP_NO_BUFFER else None
+        out = parser.OFPPacketOut(datapath=datapath, buffer_id=msg.buffer_id, in_port=in_port,
+                                  actions=actions, data=data)
+        datapath.send_msg(out)
 
-        # RULE 9: Antar gedung (G9 <-> G10) - ALLOW untuk Dosen, Secure, dan Ujian, BLOCK untuk Mahasiswa
-        if src_building != dst_building and src_building != 'UNKNOWN' and dst_building != 'UNKNOWN':
-            if src_cat in ['DOSEN', 'SECURE', 'UJIAN']:
-                return True, f"ALLOW: {src_cat} akses antar gedung", True
-            elif src_cat == 'MAHASISWA':
-                if icmp_type == icmp.ICMP_ECHO_REPLY:
-                    return True, "ALLOW: Ping Reply (Return Traffic)", False
-                return False, "BLOCK: Mahasiswa akses antar gedung", False
+    def forward_on_route(self, msg, hdr, route, should_install_flow, reverse_match, cookie=0, aggregate=False,
+                         conn_key=None):
+        # Pasang flow di semua switch pada jalur (dari hilir ke hulu supaya paket tidak
+        # mendahului flow), lalu kirim paket keluar dari switch ingress. Dengan AGGREGATE_TRANSIT
+        # hop setelah ingress (dan ingress kalau paket ini sendiri transit) memakai flow agregat
+        datapath = msg.datapath
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        if should_install_flow or reverse_match is not None:
+            for i in reversed(range(len(route))):
+                hop_dpid, out_port = route[i]
+                if not self.owns(hop_dpid):
+                    # Switch milik worker lain: paket memicu packet-in (transit) di worker pemiliknya
+                    continue
+                hop = datapath if hop_dpid == datapath.id else self.datapaths[hop_dpid]
+                actions = [hop.ofproto_parser.OFPActionOutput(out_port)]
+                if conn_key is not None and reverse_match is None:
+                    back_port = msg.match['in_port'] if i == 0 else self.topology.links[hop_dpid].get(route[i - 1][0])
+                    if back_port is not None:
+                        self.install_return_flow(hop, conn_key, back_port)
+                if reverse_match is not None and conn_key is not None:
+                    self.install_connection_flow(hop, self.CONNTRACK_PRIORITY, reverse_match, actions, conn_key,
+                                                 idle_timeout=self.CONNTRACK_TIMEOUT, cookie=cookie)
+                elif reverse_match is not None:
+                    self.add_flow(hop, self.CONNTRACK_PRIORITY, reverse_match, actions,
+                                  idle_timeout=self.CONNTRACK_TIMEOUT, cookie=cookie)
+                elif self.PROACTIVE_MODE:
+                    self.add_flow(hop, 1, hop.ofproto_parser.OFPMatch(eth_dst=hdr.eth_dst), actions,
+                                  table_id=self.TABLE_L2, idle_timeout=self.FLOW_IDLE_TIMEOUT)
+                elif aggregate if i == 0 else (self.AGGREGATE_TRANSIT and reverse_match is None
+                                               and route[i - 1][0] in self.topology.links.get(hop_dpid, {})):
+                    in_port = msg.match['in_port'] if i == 0 else self.topology.links[hop_dpid][route[i - 1][0]]
+                    self.install_aggregate(hop, in_port, hdr.eth_dst, out_port)
+                elif conn_key is not None:
+                    match = self.flow_key_match(hop.ofproto_parser, conn_key, eth_dst=hdr.eth_dst, eth_src=hdr.eth_src)
+                    self.install_connection_flow(hop, 1, match, actions, conn_key,
+                                                 idle_timeout=self.FLOW_IDLE_TIMEOUT, cookie=cookie)
+                else:
+                    match = hop.ofproto_parser.OFPMatch(eth_dst=hdr.eth_dst, eth_src=hdr.eth_src, eth_type=hdr.eth_type)
+                    self.add_flow(hop, 1, match, actions, idle_timeout=self.FLOW_IDLE_TIMEOUT, cookie=cookie)
+        elif msg.buffer_id == ofproto.OFP_NO_BUFFER and self.owns(route[-1][0]):
+            # Verdict tanpa flow (reply-only): paket dikirim langsung dari switch terakhir ke port host,
+            # supaya switch di tengah jalur tidak packet-in dan memasang flow pasangan sebagai transit
+            egress_dpid, egress_port = route[-1]
+            egress = datapath if egress_dpid == datapath.id else self.datapaths[egress_dpid]
+            egress_parser = egress.ofproto_parser
+            egress.send_msg(egress_parser.OFPPacketOut(
+                datapath=egress, buffer_id=ofproto.OFP_NO_BUFFER, in_port=ofproto.OFPP_CONTROLLER,
+                actions=[egress_parser.OFPActionOutput(egress_port)], data=msg.data))
+            return
 
-        return True, "ALLOW: Akses Diizinkan", True
+        data = None
+        if msg.buffer_id == ofproto.OFP_NO_BUFFER: data = msg.data
+        actions = [parser.OFPActionOutput(route[0][1])]
+        out = parser.OFPPacketOut(datapath=datapath, buffer_id=msg.buffer_id, in_port=msg.match['in_port'],
+                                  actions=actions, data=data)
+        datapath.send_msg(out)
 
     @set_ev_cls(ofp_event.EventOFPPacketIn, MAIN_DISPATCHER)
     def _packet_in_handler(self, ev):
+        # Latency seluruh pemrosesan packet-in (count histogram = jumlah packet-in)
+        start = time.perf_counter_ns()
+        try:
+            self.handle_packet_in(ev)
+        finally:
+            self.packet_in_hist.observe(time.perf_counter_ns() - start)
+
+    def handle_packet_in(self, ev):
         msg = ev.msg
         datapath = msg.datapath
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
         in_port = msg.match['in_port']
+        if self.shard_workers is not None:
+            if not self.owns(datapath.id):
+                # Role belum SLAVE (switch baru connect): packet-in diproses worker pemilik
+                return
+            self.shard_load[datapath.id] += 1
 
-        pkt = packet.Packet(msg.data)
-        eth = pkt.get_protocol(ethernet.ethernet)
-        
-        if eth.ethertype == ether_types.ETH_TYPE_LLDP: return
+        # Fast path (struct di atas buffer); parser lengkap Ryu hanya untuk frame tidak biasa
+        hdr = parse_headers(msg.data)
+        if hdr is None:
+            hdr = parse_headers_slow(msg.data)
+
+        if hdr.eth_type == ether_types.ETH_TYPE_LLDP: return
 
-        dst = eth.dst
-        src = eth.src
+        if not self.packet_in_permitted(datapath, hdr.eth_src, in_port):
+            return
+
+        dst = hdr.eth_dst
+        src = hdr.eth_src
         dpid = datapath.id
-        self.mac_to_port.setdefault(dpid, {})
-        self.mac_to_port[dpid][src] = in_port
+        if self.shard is not None:
+            self.share_location(dpid, src, in_port)
+        old_port = self.mac_to_port.learn(dpid, src, in_port)
+        if old_port is not None:
+            self.handle_host_move(datapath, src, old_port, in_port)
+
+        # Mode path: paket yang masuk dari port antar-switch sudah dicek di switch ingress
+        transit = False
+        if self.PATH_MODE:
+            transit = not self.topology.learn_host(src, dpid, in_port)
+
+        # Pelajari binding IP->MAC dan zona host per switch
+        sender_ip = hdr.arp_spa if hdr.eth_type == ether_types.ETH_TYPE_ARP else hdr.ip_src
+        if sender_ip:
+            self.learn_ip(dpid, src, sender_ip, transit)
+
+        if hdr.arp_op is not None and not transit and self.ARP_PROXY_ENABLED:
+            if self.handle_arp(msg, hdr, in_port):
+                return
 
         # Variabel kontrol flow
         should_install_flow = True
+        reverse_match = None
+        conn_key = None     # koneksi conntrack yang flow 5-tuple-nya dipasang untuk paket ini
+        cookie = 0
 
         # --- LOGIKA FIREWALL ---
-        if eth.ethertype == ether_types.ETH_TYPE_IP:
-            ipv4_pkt = pkt.get_protocol(ipv4.ipv4)
-            src_ip = ipv4_pkt.src
-            dst_ip = ipv4_pkt.dst
-            
-            icmp_type = None
-            if ipv4_pkt.proto == 1:
-                icmp_p = pkt.get_protocol(icmp.icmp)
-                if icmp_p:
-                    icmp_type = icmp_p.type
-
-            allowed, reason, should_install_flow = self.check_security(src_ip, dst_ip, icmp_type)
-            
+        # Mode proaktif: policy sudah dijalankan di table 0/1 switch, packet-in ini lolos policy
+        if hdr.eth_type == ether_types.ETH_TYPE_IP and not self.PROACTIVE_MODE and not transit:
+            src_ip = hdr.ip_src
+            dst_ip = hdr.ip_dst
+            icmp_type = hdr.icmp_type
+
+            allowed, _, should_install_flow = self.check_security(src_ip, dst_ip, icmp_type)
+
+            # Conntrack: catat flow keluar yang diizinkan; paket arah balik dari flow tercatat
+            # diizinkan dan dipasang sebagai flow 5-tuple supaya sesi berjalan di datapath
+            if self.CONNTRACK_ENABLED:
+                key = self.flow_key(hdr)
+                if key is not None:
+                    if allowed and should_install_flow:
+                        if self.shard is not None and key not in self.conntrack:
+                            self.shard.publish({'op': 'conn', 'key': key})
+                        self.conntrack.add(key)
+                        # Arah balik diblok policy: flow pasangan MAC akan membawa koneksi berikutnya
+                        # tanpa lewat controller (tidak tercatat), jadi flow dipasang per 5-tuple.
+                        # ICMP tidak dipasang (id echo tidak bisa di-match), setiap request ke controller
+                        if not self.policy.decide(dst_ip, src_ip, key[0] == 1)[0]:
+                            if key[0] == 1:
+                                should_install_flow = False
+                            else:
+                                conn_key = key
+                    elif self.is_return_traffic(hdr, key):
+                        allowed, should_install_flow = True, False
+                        reverse_match = self.flow_key_match(parser, key)
+                        if key[0] != 1:
+                            conn_key = (key[0], key[2], key[1], key[4], key[3])
+
+            self.metrics.inc('verdict_total', labels=VERDICT_LABELS[allowed])
+            if self.audit is not None:
+                self.audit.record(dpid, src_ip, dst_ip, hdr.ip_proto, icmp_type == icmp.ICMP_ECHO_REPLY,
+                                  allowed, 'CONNTRACK' if reverse_match is not None else None)
+
+            # Verdict BLOCK sudah tercatat di audit log (tanpa log sinkron per paket)
             if not allowed:
-                self.logger.warning(f"{reason} | {src_ip} -> {dst_ip}")
-                return 
+                if self.DROP_FLOW_ENABLED:
+                    self.install_drop_flow(datapath, src_ip, dst_ip, hdr.ip_proto, icmp_type)
+                return
+            # Flow yang dipasang untuk paket ini di-tag pasangan kelas zona (untuk reload policy)
+            if should_install_flow or reverse_match is not None:
+                cookie = self.pair_cookie(src_ip, dst_ip)
+        elif transit and hdr.eth_type == ether_types.ETH_TYPE_IP and not self.PROACTIVE_MODE:
+            # Transit (mode path, switch milik worker lain di jalur atau paket yang dikirim lewat
+            # ingress): sudah lolos cek di switch ingress, tapi flow di switch ini mengikuti cakupan
+            # keputusan ingress (cookie pasangan kelas, reply-only tanpa flow, 5-tuple kalau arah
+            # balik diblok) supaya tidak ada flow pasangan yang tidak terlihat reload/rekonsiliasi
+            src_ip = hdr.ip_src
+            dst_ip = hdr.ip_dst
+            allowed, _, should_install_flow = self.check_security(src_ip, dst_ip, hdr.icmp_type)
+            should_install_flow = allowed and should_install_flow
+            if should_install_flow and self.CONNTRACK_ENABLED:
+                key = self.flow_key(hdr)
+                if key is not None and not self.policy.decide(dst_ip, src_ip, key[0] == 1)[0]:
+                    if key[0] == 1:
+                        should_install_flow = False
+                    else:
+                        conn_key = key
+            if should_install_flow:
+                cookie = self.pair_cookie(src_ip, dst_ip)
+
+        # Paket dari port antar-switch dengan verdict allow penuh -> flow agregat (install_aggregate)
+        aggregate = (self.AGGREGATE_TRANSIT and should_install_flow and reverse_match is None
+                     and (transit or self.topology.is_switch_port(dpid, in_port)))
+
+        if self.PATH_MODE:
+            route = self.topology.route(dpid, dst)
+            if route is not None and all(hop_dpid == dpid or hop_dpid in self.datapaths for hop_dpid, _ in route):
+                self.forward_on_route(msg, hdr, route, should_install_flow, reverse_match, cookie, aggregate, conn_key)
+                return
+
+        if self.BROADCAST_SCOPING and not transit and self.is_broadcast(dst):
+            if self.PATH_MODE:
+                self.scoped_broadcast(msg, hdr, in_port, sender_ip)
             else:
-                self.logger.info(f"{reason} | {src_ip} -> {dst_ip}")
+                self.scoped_flood(msg, hdr, in_port, sender_ip)
+            return
 
         out_port = ofproto.OFPP_FLOOD
-        if dst in self.mac_to_port[dpid]:
-            out_port = self.mac_to_port[dpid][dst]
+        known_port = self.mac_to_port.get(dpid, dst)
+        if known_port is not None:
+            out_port = known_port
 
         actions = [parser.OFPActionOutput(out_port)]
 
         if out_port != ofproto.OFPP_FLOOD:
-            match = parser.OFPMatch(in_port=in_port, eth_dst=dst, eth_src=src, eth_type=eth.ethertype)
-            
+            table_id = 0
+            match = parser.OFPMatch(in_port=in_port, eth_dst=dst, eth_src=src, eth_type=hdr.eth_type)
+            if self.PROACTIVE_MODE:
+                # Cukup satu entri per MAC tujuan: O(host), bukan O(pasangan host)
+                table_id = self.TABLE_L2
+                match = parser.OFPMatch(eth_dst=dst)
+
             if should_install_flow:
-                if msg.buffer_id != ofproto.OFP_NO_BUFFER:
-                    self.add_flow(datapath, 1, match, actions, msg.buffer_id)
+                if conn_key is not None:
+                    self.install_return_flow(datapath, conn_key, in_port)
+                if aggregate and not self.PROACTIVE_MODE:
+                    self.install_aggregate(datapath, in_port, dst, out_port)
+                elif conn_key is not None:
+                    match = self.flow_key_match(parser, conn_key, in_port=in_port, eth_dst=dst, eth_src=src)
+                    self.install_connection_flow(datapath, 1, match, actions, conn_key,
+                                                 idle_timeout=self.FLOW_IDLE_TIMEOUT, cookie=cookie)
+                elif msg.buffer_id != ofproto.OFP_NO_BUFFER:
+                    self.add_flow(datapath, 1, match, actions, msg.buffer_id, table_id=table_id,
+                                  idle_timeout=self.FLOW_IDLE_TIMEOUT, cookie=cookie)
                     return
                 else:
-                    self.add_flow(datapath, 1, match, actions)
+                    self.add_flow(datapath, 1, match, actions, table_id=table_id,
+                                  idle_timeout=self.FLOW_IDLE_TIMEOUT, cookie=cookie)
             else:
+                if reverse_match is not None and conn_key is not None:
+                    self.install_connection_flow(datapath, self.CONNTRACK_PRIORITY, reverse_match, actions, conn_key,
+                                                 idle_timeout=self.CONNTRACK_TIMEOUT, cookie=cookie)
+                elif reverse_match is not None:
+                    self.add_flow(datapath, self.CONNTRACK_PRIORITY, reverse_match, actions,
+                                  idle_timeout=self.CONNTRACK_TIMEOUT, cookie=cookie)
                 data = None
                 if msg.buffer_id == ofproto.OFP_NO_BUFFER: data = msg.data
                 out = parser.OFPPacketOut(datapath=datapath, buffer_id=msg.buffer_id, 
@@ -0,0 +1,121 @@
+# Implementasi lama (sebelum optimasi), disimpan sebagai baseline benchmark dan referensi
+# kesetaraan CompiledPolicy; sengaja tanpa dependensi ryu
+
+def legacy_get_zone_category(zones, ip_addr):
+    def ip_to_int(ip):
+        try:
+            parts = ip.split('.')
+            return (int(parts[0]) << 24) + (int(parts[1]) << 16) + (int(parts[2]) << 8) + int(parts[3])
+        except:
+            return 0
+
+    def ip_in_range(ip_addr, range_info):
+        if 'start' in range_info and 'end' in range_info:
+            ip_int = ip_to_int(ip_addr)
+            start_int = ip_to_int(range_info['start'])
+            end_int = ip_to_int(range_info['end'])
+            return start_int <= ip_int <= end_int
+        return False
+
+    for zone_name, zone_ranges in zones.items():
+        if zone_name in ['DEKAN']:
+            continue
+        if zone_name == 'LAB':
+            for range_info in zone_ranges:
+                if ip_in_range(ip_addr, range_info):
+                    return 'MAHASISWA'
+        else:
+            for range_info in zone_ranges:
+                if ip_in_range(ip_addr, range_info):
+                    return zone_name
+
+    return 'UNKNOWN'
+
+
+def legacy_check_security(zones, src_ip, dst_ip, icmp_type=None):
+    ICMP_ECHO_REPLY = 0
+    src_cat = legacy_get_zone_category(zones, src_ip)
+    dst_cat = legacy_get_zone_category(zones, dst_ip)
+
+    def ip_to_int(ip):
+        try:
+            parts = ip.split('.')
+            return (int(parts[0]) << 24) + (int(parts[1]) << 16) + (int(parts[2]) << 8) + int(parts[3])
+        except:
+            return 0
+
+    def ip_in_range(ip_addr, range_info):
+        if 'start' in range_info and 'end' in range_info:
+            ip_int = ip_to_int(ip_addr)
+            start_int = ip_to_int(range_info['start'])
+            end_int = ip_to_int(range_info['end'])
+            return start_int <= ip_int <= end_int
+        return False
+
+    def ip_in_zone(ip_addr, zone_name):
+        for range_info in zones[zone_name]:
+            if ip_in_range(ip_addr, range_info):
+                return True
+        return False
+
+    if src_cat == 'SECURE' and ip_in_zone(dst_ip, 'DEKAN'):
+        if icmp_type == ICMP_ECHO_REPLY:
+            return True, "ALLOW: Ping Reply (Return Traffic)", False
+        return False, "BLOCK: Mencoba akses Dekan", False
+
+    if ip_in_zone(src_ip, 'DEKAN'):
+        return True, "ALLOW: Dekan mengakses jaringan", True
+
+    if src_cat == 'MAHASISWA' and dst_cat == 'UJIAN':
+        if icmp_type == ICMP_ECHO_REPLY:
+            return True, "ALLOW: Ping Reply (Return Traffic)", False
+        return False, "BLOCK: Mahasiswa/Lab mencoba akses Ujian", False
+
+    if src_cat == 'MAHASISWA' and dst_cat == 'SECURE':
+        if icmp_type == ICMP_ECHO_REPLY:
+            return True, "ALLOW: Ping Reply (Return Traffic)", False
+        return False, "BLOCK: Mahasiswa/Lab mencoba akses Zona Aman", False
+
+    if src_cat == 'MAHASISWA' and dst_cat == 'DOSEN':
+        if icmp_type == ICMP_ECHO_REPLY:
+            return True, "ALLOW: Ping Reply (Return Traffic)", False
+        return False, "BLOCK: Mahasiswa/Lab mencoba akses Dosen", False
+
+    if src_cat == 'DOSEN' and dst_cat == 'SECURE':
+        if icmp_type == ICMP_ECHO_REPLY:
+            return True, "ALLOW: Ping Reply (Return Traffic)", False
+        return False, "BLOCK: Dosen mencoba akses Zona Aman", False
+
+    def get_building(ip_addr):
+        try:
+            octets = ip_addr.split('.')
+            if octets[0] == '192' and octets[1] == '168':
+                if octets[2] in ['1', '5', '6', '10']:
+                    return 'G9'
+            elif octets[0] == '192' and octets[1] == '168':
+                if octets[2] in ['20', '21']:
+                    return 'G10'
+        except:
+            pass
+        return 'UNKNOWN'
+
+    src_building = get_building(src_ip)
+    dst_building = get_building(dst_ip)
+
+    if src_building == dst_building and src_building != 'UNKNOWN':
+        if src_cat == 'MAHASISWA' and dst_cat in ['SECURE', 'DOSEN', 'UJIAN']:
+            if icmp_type == ICMP_ECHO_REPLY:
+                return True, "ALLOW: Ping Reply (Return Traffic)", False
+            return False, f"BLOCK: Mahasiswa lantai lain akses {dst_cat} di {src_building}", False
+        else:
+            return True, f"ALLOW: Komunikasi antar lantai di {src_building}", True
+
+    if src_building != dst_building and src_building != 'UNKNOWN' and dst_building != 'UNKNOWN':
+        if src_cat in ['DOSEN', 'SECURE', 'UJIAN']:
+            return True, f"ALLOW: {src_cat} akses antar gedung", True
+        elif src_cat == 'MAHASISWA':
+            if icmp_type == ICMP_ECHO_REPLY:
+                return True, "ALLOW: Ping Reply (Return Traffic)", False
+            return False, "BLOCK: Mahasiswa akses antar gedung", False
+
+    return True, "ALLOW: Akses Diizinkan", True
@@ -0,0 +1,151 @@
+import time
+from collections import OrderedDict
+
+
+class MacTable:
+    # Tabel MAC per switch: mac -> (port, waktu terakhir dilihat).
+    # Kapasitas per switch dibatasi (LRU), entri yang tidak dilihat selama `aging_time`
+    # detik dianggap kedaluwarsa. OrderedDict per dpid diurutkan dari yang paling lama dilihat.
+    def __init__(self, capacity=4096, aging_time=300, clock=time.monotonic):
+        self.capacity = capacity
+        self.aging_time = aging_time
+        self.clock = clock
+        self._tables = {}
+
+    def __len__(self):
+        return sum(len(table) for table in self._tables.values())
+
+    def learn(self, dpid, mac, port):
+        # Return port lama kalau MAC pindah port (host move), selain itu None
+        now = self.clock()
+        table = self._tables.setdefault(dpid, OrderedDict())
+        old = table.pop(mac, None)
+        table[mac] = (port, now)
+        self._expire(table, now)
+        while len(table) > self.capacity:
+            table.popitem(last=False)
+        if old is not None and old[0] != port and now - old[1] <= self.aging_time:
+            return old[0]
+        return None
+
+    def get(self, dpid, mac):
+        entry = self._tables.get(dpid, {}).get(mac)
+        if entry is None:
+            return None
+        if self.clock() - entry[1] > self.aging_time:
+            del self._tables[dpid][mac]
+            return None
+        return entry[0]
+
+    def remove(self, dpid, mac):
+        self._tables.get(dpid, {}).pop(mac, None)
+
+    def remove_dpid(self, dpid):
+        self._tables.pop(dpid, None)
+
+    def ports(self, dpid):
+        # Snapshot mac -> port untuk satu switch (hanya entri yang belum kedaluwarsa)
+        table = self._tables.get(dpid, {})
+        self._expire(table, self.clock())
+        return {mac: entry[0] for mac, entry in table.items()}
+
+    def dpids(self):
+        return list(self._tables)
+
+    def snapshot(self):
+        # List (dpid, mac, port, umur detik), untuk disimpan ke file (warm restart)
+        now = self.clock()
+        return [(dpid, mac, port, now - ts) for dpid, table in self._tables.items()
+                for mac, (port, ts) in table.items()]
+
+    def restore(self, entries):
+        # Kebalikan snapshot; entri yang sudah lewat aging dilewati, urutan LRU dipertahankan
+        now = self.clock()
+        for dpid, mac, port, age in sorted(entries, key=lambda entry: -entry[3]):
+            if age <= self.aging_time:
+                table = self._tables.setdefault(dpid, OrderedDict())
+                table.pop(mac, None)
+                table[mac] = (port, now - age)
+                while len(table) > self.capacity:
+                    table.popitem(last=False)
+
+    def expire(self):
+        now = self.clock()
+        for table in self._tables.values():
+            self._expire(table, now)
+
+    def _expire(self, table, now):
+        while table:
+            mac, entry = next(iter(table.items()))
+            if now - entry[1] <= self.aging_time:
+                break
+            del table[mac]
+
+
+class ArpTable:
+    # Binding IP -> MAC (ARP proxy) dan MAC -> IP (kelas zona pengirim broadcast non-IP).
+    # Kapasitas (LRU) dan aging sama seperti MacTable: host yang sudah lama tidak terlihat tidak
+    # dijawab lagi oleh proxy, jadi ARP gagal normal alih-alih traffic dikirim ke MAC mati.
+    def __init__(self, capacity=65536, aging_time=300, clock=time.monotonic):
+        self.capacity = capacity
+        self.aging_time = aging_time
+        self.clock = clock
+        self._ips = OrderedDict()   # ip -> (mac, waktu terakhir dilihat), urut dari yang paling lama
+        self._macs = {}             # mac -> ip
+
+    def __len__(self):
+        return len(self._ips)
+
+    def learn(self, ip_addr, mac):
+        now = self.clock()
+        old = self._ips.pop(ip_addr, None)
+        if old is not None and old[0] != mac:
+            self._unlink(old[0], ip_addr)
+        self._ips[ip_addr] = (mac, now)
+        self._macs[mac] = ip_addr
+        self._expire(now)
+        while len(self._ips) > self.capacity:
+            self._remove_oldest()
+
+    def get(self, ip_addr):
+        entry = self._ips.get(ip_addr)
+        if entry is None:
+            return None
+        if self.clock() - entry[1] > self.aging_time:
+            del self._ips[ip_addr]
+            self._unlink(entry[0], ip_addr)
+            return None
+        return entry[0]
+
+    def ip_of(self, mac):
+        ip_addr = self._macs.get(mac)
+        if ip_addr is None or self.get(ip_addr) != mac:
+            return None
+        return ip_addr
+
+    def snapshot(self):
+        # List (ip, mac, umur detik), untuk disimpan ke file (warm restart)
+        now = self.clock()
+        return [(ip_addr, mac, now - ts) for ip_addr, (mac, ts) in self._ips.items()]
+
+    def restore(self, entries):
+        now = self.clock()
+        for ip_addr, mac, age in sorted(entries, key=lambda entry: -entry[2]):
+            if age <= self.aging_time:
+                self.learn(ip_addr, mac)
+                self._ips[ip_addr] = (mac, now - age)
+
+    def _unlink(self, mac, ip_addr):
+        if self._macs.get(mac) == ip_addr:
+            del self._macs[mac]
+
+    def _remove_oldest(self):
+        ip_addr, (mac, _) = self._ips.popitem(last=False)
+        self._unlink(mac, ip_addr)
+
+    def _expire(self, now):
+        while self._ips:
+            _, (_, ts) = next(iter(self._ips.items()))
+            if now - ts <= self.aging_time:
+                break
+            self._remove_oldest()
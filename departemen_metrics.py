@@ -0,0 +1,126 @@
+import bisect
+import time
+
+from ryu.app.wsgi import ControllerBase, Response, route
+
+# Batas bucket histogram latency (nanodetik); dirender ke Prometheus dalam detik
+LATENCY_BUCKETS_NS = (1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 500000,
+                      1000000, 2500000, 10000000, 50000000)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    # Histogram bucket tetap: observe = 1 bisect + 3 increment
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds=LATENCY_BUCKETS_NS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Metrics:
+    # Registry metrik sederhana (counter, gauge, histogram) + render format teks Prometheus.
+    # Label disimpan sebagai tuple pasangan (nama, nilai). `collectors` dipanggil saat render
+    # untuk gauge yang dihitung dari state controller (ukuran tabel, antrean, dll).
+    def __init__(self, prefix='gedung'):
+        self.prefix = prefix
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.help = {}
+        self.collectors = []
+
+    def inc(self, name, value=1, labels=()):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, labels=()):
+        self.gauges[(name, labels)] = value
+
+    def remove_labels(self, label):
+        # Hapus gauge yang punya pasangan label ini (mis. ('dpid', 5) saat switch putus)
+        for key in [key for key in self.gauges if label in key[1]]:
+            del self.gauges[key]
+
+    def histogram(self, name, help_text=''):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = Histogram()
+            self.help[name] = help_text
+        return hist
+
+    def timed(self, name, func, help_text=''):
+        # Bungkus fungsi dengan pengukuran latency (perf_counter_ns) ke histogram `name`
+        hist = self.histogram(name, help_text)
+        clock = time.perf_counter_ns
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                hist.observe(clock() - start)
+        wrapper.__name__ = getattr(func, '__name__', name)
+        return wrapper
+
+    def render(self):
+        for collect in self.collectors:
+            collect(self)
+        lines = []
+        for kind, values in (('counter', self.counters), ('gauge', self.gauges)):
+            seen = set()
+            for (name, labels), value in sorted(values.items()):
+                full = f'{self.prefix}_{name}'
+                if name not in seen:
+                    seen.add(name)
+                    if name in self.help:
+                        lines.append(f'# HELP {full} {self.help[name]}')
+                    lines.append(f'# TYPE {full} {kind}')
+                lines.append(f'{full}{format_labels(labels)} {value}')
+        for name, hist in sorted(self.histograms.items()):
+            full = f'{self.prefix}_{name}_seconds'
+            if self.help.get(name):
+                lines.append(f'# HELP {full} {self.help[name]}')
+            lines.append(f'# TYPE {full} histogram')
+            cumulative = 0
+            for bound, count in zip(hist.bounds, hist.counts):
+                cumulative += count
+                lines.append(f'{full}_bucket{{le="{bound / 1e9:g}"}} {cumulative}')
+            lines.append(f'{full}_bucket{{le="+Inf"}} {hist.count}')
+            lines.append(f'{full}_sum {hist.total / 1e9:.9f}')
+            lines.append(f'{full}_count {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+    def wsgi_app(self, environ, start_response):
+        # App WSGI mandiri (dipakai hub.WSGIServer di port lokal)
+        if environ.get('PATH_INFO') not in ('/metrics', '/'):
+            start_response('404 Not Found', [('Content-Type', 'text/plain')])
+            return [b'not found\n']
+        body = self.render().encode()
+        start_response('200 OK', [('Content-Type', CONTENT_TYPE), ('Content-Length', str(len(body)))])
+        return [body]
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+class GedungMetricsController(ControllerBase):
+    # Endpoint /metrics lewat WSGI Ryu (port REST ryu-manager)
+    def __init__(self, req, link, data, **config):
+        super(GedungMetricsController, self).__init__(req, link, data, **config)
+        self.metrics = data['metrics']
+
+    @route('gedung_metrics', '/metrics', methods=['GET'])
+    def get_metrics(self, req, **kwargs):
+        return Response(content_type='text/plain', charset='utf-8', body=self.metrics.render().encode())
@@ -0,0 +1,136 @@
+import struct
+
+from ryu.lib.packet import packet, ethernet, ether_types, ipv4, icmp, tcp, udp, arp
+
+from departemen_policy import ip_to_int
+
+_ETH = struct.Struct('!6s6sH')
+_IPV4 = struct.Struct('!BBHHHBBH4s4s')
+_PORTS = struct.Struct('!HH')
+_ARP = struct.Struct('!HHBBH6s4s6s4s')
+
+ETH_TYPE_IP = ether_types.ETH_TYPE_IP
+ETH_TYPE_ARP = ether_types.ETH_TYPE_ARP
+
+
+class PacketHeaders:
+    # Field header yang dipakai packet-in handler. IP disimpan sebagai integer supaya
+    # bisa langsung dipakai lookup zona; field yang tidak ada bernilai None.
+    __slots__ = ('eth_dst', 'eth_src', 'eth_type', 'ip_src', 'ip_dst', 'ip_proto',
+                 'icmp_type', 'icmp_id', 'src_port', 'dst_port', 'tcp_flags',
+                 'arp_op', 'arp_sha', 'arp_spa', 'arp_tpa')
+
+    def __init__(self, eth_dst, eth_src, eth_type):
+        self.eth_dst = eth_dst
+        self.eth_src = eth_src
+        self.eth_type = eth_type
+        self.ip_src = None
+        self.ip_dst = None
+        self.ip_proto = None
+        self.icmp_type = None
+        self.icmp_id = None
+        self.src_port = None
+        self.dst_port = None
+        self.tcp_flags = None
+        self.arp_op = None
+        self.arp_sha = None
+        self.arp_spa = None
+        self.arp_tpa = None
+
+    def __eq__(self, other):
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return 'PacketHeaders(%s)' % ', '.join('%s=%r' % (name, getattr(self, name)) for name in self.__slots__)
+
+
+def parse_headers(data):
+    # Fast path: baca header langsung dari buffer (memoryview + struct, tanpa objek per layer).
+    # Return None untuk frame yang tidak biasa (VLAN, IP options, fragmen, terpotong);
+    # pemanggil lalu memakai parse_headers_slow.
+    buf = memoryview(data)
+    if len(buf) < 14:
+        return None
+    dst, src, eth_type = _ETH.unpack_from(buf)
+    hdr = PacketHeaders(dst.hex(':'), src.hex(':'), eth_type)
+    if eth_type == ETH_TYPE_ARP:
+        if len(buf) < 42:
+            return None
+        hwtype, proto, hlen, plen, opcode, sha, spa, _, tpa = _ARP.unpack_from(buf, 14)
+        if hwtype != 1 or proto != ETH_TYPE_IP or hlen != 6 or plen != 4:
+            return None
+        hdr.arp_op = opcode
+        hdr.arp_sha = sha.hex(':')
+        hdr.arp_spa = int.from_bytes(spa, 'big')
+        hdr.arp_tpa = int.from_bytes(tpa, 'big')
+        return hdr
+    if eth_type != ETH_TYPE_IP:
+        if eth_type in (ether_types.ETH_TYPE_8021Q, ether_types.ETH_TYPE_8021AD):
+            return None
+        return hdr
+
+    if len(buf) < 34:
+        return None
+    ver_ihl, _, total_length, _, frag, _, proto, _, ip_src, ip_dst = _IPV4.unpack_from(buf, 14)
+    if ver_ihl != 0x45 or frag & 0x1FFF or total_length < 20 or len(buf) < 14 + total_length:
+        return None
+    hdr.ip_src = int.from_bytes(ip_src, 'big')
+    hdr.ip_dst = int.from_bytes(ip_dst, 'big')
+    hdr.ip_proto = proto
+
+    l4 = 34
+    l4_len = total_length - 20
+    if proto == 1:
+        if l4_len >= 4:
+            hdr.icmp_type = buf[l4]
+            if hdr.icmp_type in (icmp.ICMP_ECHO_REQUEST, icmp.ICMP_ECHO_REPLY) and l4_len >= 8:
+                hdr.icmp_id = _PORTS.unpack_from(buf, l4 + 4)[0]
+    elif proto == 6:
+        if l4_len < 20:
+            return None
+        hdr.src_port, hdr.dst_port = _PORTS.unpack_from(buf, l4)
+        hdr.tcp_flags = ((buf[l4 + 12] & 0x01) << 8) | buf[l4 + 13]
+    elif proto == 17:
+        if l4_len < 8:
+            return None
+        hdr.src_port, hdr.dst_port = _PORTS.unpack_from(buf, l4)
+    return hdr
+
+
+def parse_headers_slow(data):
+    # Fallback: parser lengkap Ryu, hasilnya dikonversi ke PacketHeaders yang sama
+    pkt = packet.Packet(data)
+    eth = pkt.get_protocol(ethernet.ethernet)
+    hdr = PacketHeaders(eth.dst, eth.src, eth.ethertype)
+    if eth.ethertype == ETH_TYPE_ARP:
+        arp_pkt = pkt.get_protocol(arp.arp)
+        if arp_pkt is not None and arp_pkt.proto == ETH_TYPE_IP:
+            hdr.arp_op = arp_pkt.opcode
+            hdr.arp_sha = arp_pkt.src_mac
+            hdr.arp_spa = ip_to_int(arp_pkt.src_ip)
+            hdr.arp_tpa = ip_to_int(arp_pkt.dst_ip)
+        return hdr
+    if eth.ethertype != ETH_TYPE_IP:
+        return hdr
+
+    ipv4_pkt = pkt.get_protocol(ipv4.ipv4)
+    if ipv4_pkt is None:
+        return hdr
+    hdr.ip_src = ip_to_int(ipv4_pkt.src)
+    hdr.ip_dst = ip_to_int(ipv4_pkt.dst)
+    hdr.ip_proto = ipv4_pkt.proto
+    if ipv4_pkt.proto == 1:
+        icmp_p = pkt.get_protocol(icmp.icmp)
+        if icmp_p:
+            hdr.icmp_type = icmp_p.type
+            if isinstance(icmp_p.data, icmp.echo):
+                hdr.icmp_id = icmp_p.data.id
+    elif ipv4_pkt.proto == 6:
+        tcp_pkt = pkt.get_protocol(tcp.tcp)
+        if tcp_pkt:
+            hdr.src_port, hdr.dst_port, hdr.tcp_flags = tcp_pkt.src_port, tcp_pkt.dst_port, tcp_pkt.bits
+    elif ipv4_pkt.proto == 17:
+        udp_pkt = pkt.get_protocol(udp.udp)
+        if udp_pkt:
+            hdr.src_port, hdr.dst_port = udp_pkt.src_port, udp_pkt.dst_port
+    return hdr
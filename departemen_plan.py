@@ -0,0 +1,182 @@
+from departemen_policy import int_to_ip, zone_ranges
+
+# Rencana switch/host/IP jaringan gedung, dipakai GedungTopo (Mininet) dan harness benchmark
+# (tanpa Mininet). Urutan entri = urutan addSwitch/addLink, jadi nomor port sama dengan Mininet.
+#
+# Entri: (switch, switch_induk, dpid, [segmen]); segmen: (keterangan, subnet, [(host, ip)])
+GEDUNG_PLAN = [
+    # CORE & DISTRIBUTION
+    ('s1', None, '0000000000000001', []),
+    ('s2', 's1', '0000000000000002', []),
+    ('s3', 's1', '0000000000000003', []),
+
+    # ================= GEDUNG G9 =================
+
+    # --- G9 Lantai 1 (Access Point Mahasiswa) ---
+    ('s4', 's2', None, [
+        ('IP Nirkabel Gedung G9 Lantai 1', '192.168.1.0/22', [('mhs1', '192.168.1.1'), ('mhs2', '192.168.1.2')]),
+        ('IP Kabel Gedung G9 Lantai 1', '192.168.10.0/27', [('mhsc1', '192.168.10.1'), ('mhsc2', '192.168.10.2')]),
+    ]),
+
+    # --- G9 Lantai 2 (Area Campuran) ---
+    ('s5', 's2', None, [
+        ('IP Nirkabel Gedung G9 Lantai 2', '192.168.5.0/24', [('mhs2a', '192.168.5.1'), ('mhs2b', '192.168.5.2')]),
+    ]),
+    # IP Kabel Gedung G9 Lantai 2: 192.168.10.32/26
+    ('s6', 's5', None, [
+        ('Keuangan', '192.168.10.32/26', [('keu1', '192.168.10.33'), ('keu2', '192.168.10.34')]),
+    ]),
+    ('s7', 's5', None, [
+        ('Pimpinan', '192.168.10.32/26', [('dekan', '192.168.10.35'), ('sekre', '192.168.10.36')]),
+    ]),
+    ('s8', 's5', None, [
+        ('Dosen Gedung G9', '192.168.10.32/26', [('dsn9a', '192.168.10.37'), ('dsn9b', '192.168.10.38')]),
+    ]),
+    ('s9', 's5', None, [
+        ('R.Ujian', '192.168.10.32/26', [('ujian1', '192.168.10.39'), ('ujian2', '192.168.10.40')]),
+    ]),
+
+    # --- G9 Lantai 3 (Lab & AP Mahasiswa) ---
+    ('s10', 's2', None, [
+        ('IP Nirkabel Gedung G9 Lantai 3', '192.168.6.0/22', [('mhs3a', '192.168.6.1'), ('mhs3b', '192.168.6.2')]),
+    ]),
+    # IP Kabel Gedung G9 Lantai 3: 192.168.10.96/25
+    ('s11', 's10', None, [
+        ('Lab 1', '192.168.10.96/25', [('lab1a', '192.168.10.97'), ('lab1b', '192.168.10.98')]),
+    ]),
+    ('s12', 's10', None, [
+        ('Lab 2', '192.168.10.96/25', [('lab2a', '192.168.10.99'), ('lab2b', '192.168.10.100')]),
+    ]),
+    ('s13', 's10', None, [
+        ('Lab 3', '192.168.10.96/25', [('lab3a', '192.168.10.101'), ('lab3b', '192.168.10.102')]),
+    ]),
+
+    # ================= GEDUNG G10 =================
+
+    # --- G10 Lantai 1 ---
+    ('s14', 's3', None, [
+        ('IP Nirkabel Gedung G10 Lantai 1', '192.168.20.0/26', [('mhsg10_1', '192.168.20.1'), ('mhsg10_2', '192.168.20.2')]),
+        ('IP Kabel Gedung G10 Lantai 1', '192.168.21.0/28', [('adm10a', '192.168.21.1'), ('adm10b', '192.168.21.2')]),
+    ]),
+
+    # --- G10 Lantai 2 ---
+    ('s15', 's3', None, [
+        ('IP Nirkabel Gedung G10 Lantai 2', '192.168.20.64/25', [('mhsg10_2a', '192.168.20.65'), ('mhsg10_2b', '192.168.20.66')]),
+        ('IP Kabel Gedung G10 Lantai 2', '192.168.21.16/29', [('dsn10a1', '192.168.21.17'), ('dsn10a2', '192.168.21.18'),
+                                                              ('aula1', '192.168.21.19'), ('aula2', '192.168.21.20')]),
+    ]),
+
+    # --- G10 Lantai 3 ---
+    ('s16', 's3', None, [
+        ('IP Nirkabel Gedung G10 Lantai 3', '192.168.20.192/26', [('mhsg10_3a', '192.168.20.193'), ('mhsg10_3b', '192.168.20.194')]),
+        ('IP Kabel Gedung G10 Lantai 3', '192.168.21.32/26', [('dsn10b1', '192.168.21.33'), ('dsn10b2', '192.168.21.34')]),
+    ]),
+]
+
+HOST_PREFIX_LEN = 16
+
+
+def switch_dpid(name, dpid=None):
+    # Mininet: dpid default diambil dari angka di nama switch
+    return int(dpid, 16) if dpid else int(name[1:])
+
+
+def port_map(plan=GEDUNG_PLAN):
+    # Nomor port per switch mengikuti urutan addLink (sama seperti Mininet):
+    # return (links, hosts) dengan links = [(dpid_a, port_a, dpid_b, port_b)] dan
+    # hosts = [(host, ip, dpid, port)]
+    next_port = {}
+    dpids = {}
+    links, hosts = [], []
+
+    def alloc(name):
+        next_port[name] = next_port.get(name, 0) + 1
+        return next_port[name]
+
+    for name, parent, dpid, segments in plan:
+        dpids[name] = switch_dpid(name, dpid)
+        if parent is not None:
+            links.append((dpids[parent], alloc(parent), dpids[name], alloc(name)))
+        for _, _, seg_hosts in segments:
+            for host, ip in seg_hosts:
+                hosts.append((host, ip, dpids[name], alloc(name)))
+    return links, hosts
+
+
+# --- Generator topologi skala besar ---
+# Gedung genap memakai alamat G9 (oktet 1-19), gedung ganjil alamat G10 (oktet 20+), supaya
+# kelas gedung di controller sama dengan gedung asli. Setiap lantai: satu switch akses berisi
+# segmen nirkabel (MAHASISWA) + segmen kabel yang zonanya bergiliran per lantai.
+TEMPLATE_GEDUNG = ['G9', 'G10']
+ZONA_KABEL = {
+    'G9': ['DOSEN', 'SECURE', 'LAB', 'UJIAN'],
+    'G10': ['DOSEN', 'SECURE'],
+}
+
+
+def template_of(ip_int):
+    return 'G9' if (ip_int >> 8) & 0xFF < 20 else 'G10'
+
+
+def subnet_of(ip):
+    return ip.rsplit('.', 1)[0] + '.0/24'
+
+
+def address_pools(policy):
+    # (template gedung, zona) -> list IP (int) yang benar-benar diklasifikasi ke zona itu oleh controller.
+    # Range yang tumpang tindih ikut aturan prioritas zona; IP Dekan tidak dipakai untuk host generik.
+    pools = {}
+    seen = set()
+    for zone_name in policy.zones:
+        if zone_name == 'DEKAN':
+            continue
+        label = 'MAHASISWA' if zone_name == 'LAB' else zone_name
+        for start, end in zone_ranges(policy.zones, zone_name):
+            for ip_int in range(start, end + 1):
+                if ip_int & 0xFF in (0, 255):
+                    continue
+                if ip_int in seen or policy.zone_index.lookup(ip_int) != label or policy.dekan_index.lookup(ip_int):
+                    continue
+                seen.add(ip_int)
+                pools.setdefault((template_of(ip_int), zone_name), []).append(ip_int)
+    return pools
+
+
+def generate_plan(policy, buildings=2, floors=3, hosts_per_segment=2):
+    # Plan dengan format sama seperti GEDUNG_PLAN: core s1, satu switch distribusi per gedung,
+    # satu switch akses per lantai. Alamat diambil dari range zona controller, jadi setiap host
+    # diklasifikasi sama seperti host asli. Zona kabel yang alamatnya habis dilewati;
+    # kalau alamat nirkabel habis -> ValueError (kapasitas zona controller terlampaui).
+    pools = {key: list(reversed(ips)) for key, ips in address_pools(policy).items()}
+    plan = [('s1', None, '0000000000000001', [])]
+    next_switch = 2
+
+    def take(template, zone_name, count):
+        pool = pools.get((template, zone_name), [])
+        taken = [pool.pop() for _ in range(min(count, len(pool)))]
+        return [int_to_ip(ip_int) for ip_int in taken]
+
+    for b in range(buildings):
+        template = TEMPLATE_GEDUNG[b % len(TEMPLATE_GEDUNG)]
+        dist = f's{next_switch}'
+        next_switch += 1
+        plan.append((dist, 's1', None, []))
+        for f in range(floors):
+            segments = []
+            wifi = take(template, 'MAHASISWA', hosts_per_segment)
+            if len(wifi) < hosts_per_segment:
+                raise ValueError(f'Alamat MAHASISWA untuk template {template} habis '
+                                 f'(gedung {b + 1}, lantai {f + 1})')
+            segments.append((f'Nirkabel Gedung {b + 1} Lantai {f + 1}', subnet_of(wifi[0]),
+                             [(f'b{b}f{f}w{i}', ip) for i, ip in enumerate(wifi)]))
+            wired_zones = ZONA_KABEL[template]
+            for offset in range(len(wired_zones)):
+                zone_name = wired_zones[(f + offset) % len(wired_zones)]
+                wired = take(template, zone_name, hosts_per_segment)
+                if wired:
+                    segments.append((f'{zone_name} Gedung {b + 1} Lantai {f + 1}', subnet_of(wired[0]),
+                                     [(f'b{b}f{f}k{i}', ip) for i, ip in enumerate(wired)]))
+                    break
+            plan.append((f's{next_switch}', dist, None, segments))
+            next_switch += 1
+    return plan
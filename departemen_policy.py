@@ -0,0 +1,415 @@
+import bisect
+import json
+import os
+
+try:
+    import numpy as np
+except ImportError:  # numpy opsional, hanya untuk evaluasi batch
+    np = None
+
+try:
+    import yaml
+except ImportError:  # PyYAML opsional, hanya untuk file policy .yaml/.yml
+    yaml = None
+
+
+def ip_to_int(ip):
+    # Convert IP dotted string ke integer (IP tidak valid -> 0, sama seperti helper lama).
+    # IP yang sudah integer (dari fast-path parser) langsung dipakai.
+    if isinstance(ip, int):
+        return ip
+    try:
+        parts = ip.split('.')
+        return (int(parts[0]) << 24) + (int(parts[1]) << 16) + (int(parts[2]) << 8) + int(parts[3])
+    except Exception:
+        return 0
+
+
+def int_to_ip(ip_int):
+    return '%d.%d.%d.%d' % ((ip_int >> 24) & 0xFF, (ip_int >> 16) & 0xFF, (ip_int >> 8) & 0xFF, ip_int & 0xFF)
+
+
+class IntervalIndex:
+    # Index interval integer yang sudah dikompilasi: list start terurut + bisect.
+    # `ranges` adalah list (start, end, label) sesuai urutan prioritas; kalau ada
+    # range yang tumpang tindih, range yang didefinisikan lebih dulu yang menang.
+    def __init__(self, ranges, default=None):
+        self.default = default
+        ranges = [(start, end, label) for start, end, label in ranges if start <= end]
+
+        points = set()
+        for start, end, _ in ranges:
+            points.add(start)
+            points.add(end + 1)
+        points = sorted(points)
+
+        starts, ends, labels = [], [], []
+        # Setiap segmen [lo, hi) di antara dua titik batas dicakup oleh himpunan range yang sama
+        for lo, hi in zip(points, points[1:]):
+            label = default
+            for start, end, range_label in ranges:
+                if start <= lo <= end:
+                    label = range_label
+                    break
+            if label == default:
+                continue
+            if starts and ends[-1] == lo - 1 and labels[-1] == label:
+                ends[-1] = hi - 1
+            else:
+                starts.append(lo)
+                ends.append(hi - 1)
+                labels.append(label)
+
+        self._starts = starts
+        self._ends = ends
+        self._labels = labels
+
+    def lookup(self, ip_int):
+        i = bisect.bisect_right(self._starts, ip_int) - 1
+        if i >= 0 and ip_int <= self._ends[i]:
+            return self._labels[i]
+        return self.default
+
+    def lookup_array(self, ips):
+        # Versi vektor dari lookup (numpy): ips array integer -> array label
+        ips = np.asarray(ips, dtype=np.int64)
+        if not self._starts:
+            return np.full(ips.shape, self.default, dtype=object)
+        starts = np.asarray(self._starts, dtype=np.int64)
+        ends = np.asarray(self._ends, dtype=np.int64)
+        labels = np.asarray(self._labels + [self.default])
+        i = np.searchsorted(starts, ips, side='right') - 1
+        hit = (i >= 0) & (ips <= ends[np.maximum(i, 0)])
+        return labels[np.where(hit, i, len(self._labels))]
+
+    def segments(self):
+        return list(zip(self._starts, self._ends, self._labels))
+
+    def __len__(self):
+        return len(self._starts)
+
+
+def prefix_mask(prefix_len):
+    return (0xFFFFFFFF << (32 - prefix_len)) & 0xFFFFFFFF
+
+
+def range_to_prefixes(start, end):
+    # Pecah range [start, end] jadi list prefix CIDR (network_int, prefix_len) seminimal mungkin
+    prefixes = []
+    while start <= end:
+        size = start & -start if start else 1 << 32
+        while size > end - start + 1:
+            size >>= 1
+        prefixes.append((start, 33 - size.bit_length()))
+        start += size
+    return prefixes
+
+
+def zone_ranges(zones, zone_name):
+    ranges = []
+    for range_info in zones.get(zone_name, []):
+        if 'start' in range_info and 'end' in range_info:
+            ranges.append((ip_to_int(range_info['start']), ip_to_int(range_info['end'])))
+    return ranges
+
+
+def compile_zone_index(zones):
+    # Urutan prioritas sama dengan loop get_zone_category lama:
+    # urutan definisi di dict, LAB dilebur ke MAHASISWA, DEKAN dilewati
+    ranges = []
+    for zone_name in zones:
+        if zone_name in ['DEKAN']:
+            continue
+        label = 'MAHASISWA' if zone_name == 'LAB' else zone_name
+        for start, end in zone_ranges(zones, zone_name):
+            ranges.append((start, end, label))
+    return IntervalIndex(ranges, 'UNKNOWN')
+
+
+ICMP_ECHO_REPLY = 0
+
+REPLY_REASON = "ALLOW: Ping Reply (Return Traffic)"
+
+# Gedung ditentukan dari oktet ketiga 192.168.x.0/24.
+# Catatan: di get_building lama cabang G10 (oktet 20/21) ada di elif yang tidak pernah
+# tercapai, jadi IP G10 selalu dianggap UNKNOWN. Perilaku itu dipertahankan supaya
+# tabel keputusan identik dengan rule chain lama.
+BUILDING_OCTETS = {
+    'G9': [1, 5, 6, 10],
+}
+
+# Rule chain check_security dalam bentuk data, dievaluasi berurutan (rule pertama yang cocok menang).
+# Kondisi: src_zone/dst_zone (list zona), src_dekan/dst_dekan (IP ada di range DEKAN),
+# building ('same' = gedung sama & diketahui, 'different' = beda gedung & keduanya diketahui).
+# Rule BLOCK dengan allow_reply tetap meloloskan ICMP echo reply (tanpa install flow).
+RULES = [
+    # RULE 1: Keuangan (bagian dari SECURE) ke Dekan -> BLOCK (Keuangan tidak bisa akses Dekan)
+    {'id': 'R1', 'src_zone': ['SECURE'], 'dst_dekan': True,
+     'action': 'BLOCK', 'allow_reply': True, 'reason': "BLOCK: Mencoba akses Dekan"},
+    # RULE 1a: Dekan bisa mengakses semua zona (Mahasiswa, Lab, Dosen, Keuangan) -> ALLOW
+    {'id': 'R1a', 'src_dekan': True,
+     'action': 'ALLOW', 'install': True, 'reason': "ALLOW: Dekan mengakses jaringan"},
+    # RULE 2: Mahasiswa/Lab -> Ujian (BLOCK)
+    {'id': 'R2', 'src_zone': ['MAHASISWA'], 'dst_zone': ['UJIAN'],
+     'action': 'BLOCK', 'allow_reply': True, 'reason': "BLOCK: Mahasiswa/Lab mencoba akses Ujian"},
+    # RULE 3: Mahasiswa/Lab -> Secure (BLOCK)
+    {'id': 'R3', 'src_zone': ['MAHASISWA'], 'dst_zone': ['SECURE'],
+     'action': 'BLOCK', 'allow_reply': True, 'reason': "BLOCK: Mahasiswa/Lab mencoba akses Zona Aman"},
+    # RULE 4: Mahasiswa/Lab -> Dosen (BLOCK)
+    {'id': 'R4', 'src_zone': ['MAHASISWA'], 'dst_zone': ['DOSEN'],
+     'action': 'BLOCK', 'allow_reply': True, 'reason': "BLOCK: Mahasiswa/Lab mencoba akses Dosen"},
+    # RULE 6: Dosen -> Secure (BLOCK)
+    {'id': 'R6', 'src_zone': ['DOSEN'], 'dst_zone': ['SECURE'],
+     'action': 'BLOCK', 'allow_reply': True, 'reason': "BLOCK: Dosen mencoba akses Zona Aman"},
+    # RULE 8a: Antar lantai di gedung yang sama - ALLOW kecuali mahasiswa ke secure/dosen/ujian
+    {'id': 'R8a-block', 'building': 'same', 'src_zone': ['MAHASISWA'], 'dst_zone': ['SECURE', 'DOSEN', 'UJIAN'],
+     'action': 'BLOCK', 'allow_reply': True, 'reason': "BLOCK: Mahasiswa lantai lain akses {dst_zone} di {building}"},
+    {'id': 'R8a', 'building': 'same',
+     'action': 'ALLOW', 'install': True, 'reason': "ALLOW: Komunikasi antar lantai di {building}"},
+    # RULE 9: Antar gedung (G9 <-> G10) - ALLOW untuk Dosen, Secure, dan Ujian, BLOCK untuk Mahasiswa
+    {'id': 'R9', 'building': 'different', 'src_zone': ['DOSEN', 'SECURE', 'UJIAN'],
+     'action': 'ALLOW', 'install': True, 'reason': "ALLOW: {src_zone} akses antar gedung"},
+    {'id': 'R9-block', 'building': 'different', 'src_zone': ['MAHASISWA'],
+     'action': 'BLOCK', 'allow_reply': True, 'reason': "BLOCK: Mahasiswa akses antar gedung"},
+    # Default
+    {'id': 'DEFAULT',
+     'action': 'ALLOW', 'install': True, 'reason': "ALLOW: Akses Diizinkan"},
+]
+
+
+def rule_matches(rule, src, dst):
+    src_zone, src_dekan, src_building = src
+    dst_zone, dst_dekan, dst_building = dst
+    if 'src_zone' in rule and src_zone not in rule['src_zone']:
+        return False
+    if 'dst_zone' in rule and dst_zone not in rule['dst_zone']:
+        return False
+    if 'src_dekan' in rule and src_dekan != rule['src_dekan']:
+        return False
+    if 'dst_dekan' in rule and dst_dekan != rule['dst_dekan']:
+        return False
+    if rule.get('building') == 'same':
+        if src_building != dst_building or src_building == 'UNKNOWN':
+            return False
+    elif rule.get('building') == 'different':
+        if src_building == dst_building or 'UNKNOWN' in (src_building, dst_building):
+            return False
+    return True
+
+
+def evaluate_rules(rules, src, dst, is_reply):
+    # src/dst: tuple (zona, is_dekan, gedung). Return (allowed, reason, install, rule_id)
+    for rule in rules:
+        if not rule_matches(rule, src, dst):
+            continue
+        if rule['action'] == 'BLOCK':
+            if is_reply and rule.get('allow_reply'):
+                return True, REPLY_REASON, False, rule['id']
+            allowed, install = False, False
+        else:
+            allowed, install = True, rule.get('install', True)
+        reason = rule['reason'].format(src_zone=src[0], dst_zone=dst[0], building=src[2])
+        return allowed, reason, install, rule['id']
+    return True, "ALLOW: Akses Diizinkan", True, None
+
+
+RULE_KEYS = {'id', 'src_zone', 'dst_zone', 'src_dekan', 'dst_dekan', 'building', 'action',
+             'allow_reply', 'install', 'reason'}
+
+
+def validate_policy(zones, rules, building_octets):
+    # ValueError kalau struktur file policy tidak valid (policy lama tetap dipakai)
+    if not isinstance(zones, dict) or not isinstance(rules, list) or not isinstance(building_octets, dict):
+        raise ValueError("policy harus punya 'zones' (dict), 'rules' (list), 'buildings' (dict)")
+    for zone_name, ranges in zones.items():
+        for range_info in ranges:
+            for key in ('start', 'end'):
+                if not ip_to_int(range_info.get(key, '')):
+                    raise ValueError(f"zona {zone_name}: '{key}' bukan IP valid: {range_info.get(key)!r}")
+    ids = set()
+    for rule in rules:
+        unknown = set(rule) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"rule {rule.get('id')}: key tidak dikenal {sorted(unknown)}")
+        if rule.get('action') not in ('ALLOW', 'BLOCK'):
+            raise ValueError(f"rule {rule.get('id')}: action harus ALLOW/BLOCK")
+        if rule.get('building') not in (None, 'same', 'different'):
+            raise ValueError(f"rule {rule.get('id')}: building harus 'same'/'different'")
+        if 'id' not in rule or rule['id'] in ids:
+            raise ValueError(f"rule tanpa id atau id dobel: {rule.get('id')}")
+        ids.add(rule['id'])
+        rule.setdefault('reason', f"{rule['action']}: {rule['id']}")
+
+
+# File policy bawaan (di samping modul ini); dipakai controller, topologi, benchmark, dan tes
+POLICY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'departemen_policy.json')
+
+
+def load_policy(path):
+    # File policy JSON atau YAML: {'zones': {...}, 'rules': [...], 'buildings': {'G9': [1, 5, ...]}}
+    # Format zones sama dengan departemen_policy.json, rules sama dengan RULES. Return (zones, rules, buildings)
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ValueError("file policy YAML butuh PyYAML (pip install pyyaml)")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    zones = data.get('zones')
+    rules = data.get('rules', RULES)
+    building_octets = data.get('buildings', BUILDING_OCTETS)
+    validate_policy(zones, rules, building_octets)
+    return zones, rules, building_octets
+
+
+class CompiledPolicy:
+    # Tabel keputusan yang sudah dikompilasi dari zona + rule chain.
+    # Setiap IP dipetakan (lewat satu IntervalIndex) ke "kelas" = (zona, is_dekan, gedung);
+    # keputusan per paket cukup 2 bisect + 1 index list.
+    # `known_classes` = list kelas dari kompilasi sebelumnya: id kelas yang sama dipertahankan
+    # saat reload supaya cookie/metadata flow yang sudah terpasang tetap bermakna.
+    def __init__(self, zones, rules=RULES, building_octets=BUILDING_OCTETS, known_classes=None):
+        self.zones = zones
+        self.rules = rules
+        self.building_octets = building_octets
+        self.zone_index = compile_zone_index(zones)
+        self.dekan_index = IntervalIndex([(start, end, True) for start, end in zone_ranges(zones, 'DEKAN')], False)
+        building_ranges = []
+        for building, octets in building_octets.items():
+            for octet in octets:
+                base = (192 << 24) + (168 << 16) + (octet << 8)
+                building_ranges.append((base, base + 255, building))
+        self.building_index = IntervalIndex(building_ranges, 'UNKNOWN')
+
+        # Kelas 0 = IP di luar semua range
+        self.classes = list(known_classes) if known_classes else [self.classify(0)]
+        class_ids = {ip_class: class_id for class_id, ip_class in enumerate(self.classes)}
+        points = set()
+        for index in (self.zone_index, self.dekan_index, self.building_index):
+            for start, end, _ in index.segments():
+                points.add(start)
+                points.add(end + 1)
+        points = sorted(points)
+        class_ranges = []
+        for lo, hi in zip(points, points[1:]):
+            ip_class = self.classify(lo)
+            if ip_class not in class_ids:
+                class_ids[ip_class] = len(self.classes)
+                self.classes.append(ip_class)
+            class_ranges.append((lo, hi - 1, class_ids[ip_class]))
+        self.class_index = IntervalIndex(class_ranges, 0)
+
+        n = len(self.classes)
+        self._reachable = {}
+        self._batch_tables = None
+        self.decisions = [None] * (n * n * 2)
+        self.rule_ids = [None] * (n * n * 2)
+        for s, src in enumerate(self.classes):
+            for d, dst in enumerate(self.classes):
+                for is_reply in (False, True):
+                    allowed, reason, install, rule_id = evaluate_rules(rules, src, dst, is_reply)
+                    slot = (s * n + d) * 2 + is_reply
+                    self.decisions[slot] = (allowed, reason, install)
+                    self.rule_ids[slot] = rule_id
+
+    def classify(self, ip_int):
+        return (self.zone_index.lookup(ip_int), self.dekan_index.lookup(ip_int), self.building_index.lookup(ip_int))
+
+    def slot(self, src_int, dst_int, is_reply):
+        lookup = self.class_index.lookup
+        return (lookup(src_int) * len(self.classes) + lookup(dst_int)) * 2 + is_reply
+
+    def decide(self, src_int, dst_int, is_reply):
+        return self.decisions[self.slot(src_int, dst_int, is_reply)]
+
+    def rule_id(self, src_int, dst_int, is_reply):
+        return self.rule_ids[self.slot(src_int, dst_int, is_reply)]
+
+    def decide_batch(self, src_ips, dst_ips, is_reply=False):
+        # Evaluasi batch (numpy): array IP uint32 src/dst (+ is_reply skalar/array) ->
+        # (allowed, install, rule_id) sebagai array. Sama persis dengan decide() per pasangan:
+        # kelas dicari dengan searchsorted, verdict diambil dari tabel keputusan yang sama.
+        if np is None:
+            raise RuntimeError("decide_batch butuh numpy (pip install numpy)")
+        if self._batch_tables is None:
+            self._batch_tables = (np.array([d[0] for d in self.decisions], dtype=bool),
+                                  np.array([d[2] for d in self.decisions], dtype=bool),
+                                  np.array(self.rule_ids, dtype=object))
+        allowed, install, rule_ids = self._batch_tables
+        n = len(self.classes)
+        src_class = self.class_index.lookup_array(src_ips).astype(np.int64)
+        dst_class = self.class_index.lookup_array(dst_ips).astype(np.int64)
+        slots = (src_class * n + dst_class) * 2 + np.asarray(is_reply, dtype=np.int64)
+        return allowed[slots], install[slots], rule_ids[slots]
+
+    def allowed(self, src_class, dst_class, is_reply):
+        return self.decisions[(src_class * len(self.classes) + dst_class) * 2 + is_reply][0]
+
+    def reachable_classes(self, src_class):
+        # Kelas yang boleh berkomunikasi dengan src_class (salah satu arah diizinkan), di-cache
+        reachable = self._reachable.get(src_class)
+        if reachable is None:
+            reachable = frozenset(d for d in range(len(self.classes))
+                                  if self.allowed(src_class, d, False) or self.allowed(d, src_class, False))
+            self._reachable[src_class] = reachable
+        return reachable
+
+    def class_prefixes(self):
+        # Prefix CIDR per kelas IP (kelas 0 tidak punya prefix, jadi entri default di pipeline)
+        prefixes = {}
+        for start, end, class_id in self.class_index.segments():
+            prefixes.setdefault(class_id, []).extend(range_to_prefixes(start, end))
+        return prefixes
+
+    def matrix_entries(self):
+        # Matriks allow/deny untuk pipeline proaktif: list (src_class, dst_class, reply_only, allowed).
+        # dst_class None = entri default per kelas src (keputusan kelas dst 0); entri per kelas dst
+        # hanya dibuat kalau keputusannya beda dari default. reply_only = khusus ICMP echo reply.
+        entries = []
+        for s in range(len(self.classes)):
+            default = (self.allowed(s, 0, False), self.allowed(s, 0, True))
+            entries.append((s, None, False, default[0]))
+            if not default[0] and default[1]:
+                entries.append((s, None, True, True))
+            for d in range(1, len(self.classes)):
+                verdict = (self.allowed(s, d, False), self.allowed(s, d, True))
+                if verdict == default:
+                    continue
+                entries.append((s, d, False, verdict[0]))
+                if not verdict[0] and verdict[1]:
+                    entries.append((s, d, True, True))
+        return entries
+
+    def affected_pairs(self, new):
+        # Pasangan kelas (id di policy ini) yang flow-nya harus dihapus kalau policy diganti `new`:
+        # verdict (allowed/install) berubah, atau IP di dalamnya pindah kelas. Dihitung per "atom"
+        # (segmen IP yang kelas lama dan kelas barunya sama-sama konstan). Simetris, karena flow
+        # arah balik (conntrack) di-tag dengan pasangan kebalikannya.
+        points = {0}
+        for index in (self.class_index, new.class_index):
+            for start, end, _ in index.segments():
+                points.add(start)
+                points.add(end + 1)
+        atoms = {(self.class_index.lookup(point), new.class_index.lookup(point)) for point in points}
+        affected = set()
+        for old_src, new_src in atoms:
+            for old_dst, new_dst in atoms:
+                if (old_src, old_dst) in affected:
+                    continue
+                moved = old_src != new_src or old_dst != new_dst
+                for is_reply in (False, True):
+                    old = self.decisions[(old_src * len(self.classes) + old_dst) * 2 + is_reply]
+                    now = new.decisions[(new_src * len(new.classes) + new_dst) * 2 + is_reply]
+                    if moved or (old[0], old[2]) != (now[0], now[2]):
+                        affected.add((old_src, old_dst))
+                        affected.add((old_dst, old_src))
+                        break
+        return affected
+
+    def representatives(self):
+        # Satu IP contoh per kelas (untuk uji ekuivalensi / enumerasi).
+        # Kelas sisa reload yang sudah tidak punya IP diwakili IP 0
+        reps = {0: 0}
+        for start, _, class_id in self.class_index.segments():
+            reps.setdefault(class_id, start)
+        return [reps.get(class_id, 0) for class_id in range(len(self.classes))]
@@ -0,0 +1,37 @@
+import time
+from collections import OrderedDict
+
+
+class TokenBuckets:
+    # Token bucket per key (MAC sumber, dpid): isi ulang `rate` token/detik, maksimal `burst`.
+    # Bucket disimpan LRU dengan batas `capacity` supaya flood MAC acak tidak membuat tabel
+    # tumbuh tanpa batas (bucket yang dibuang = bucket penuh lagi, sama seperti sumber baru).
+    def __init__(self, rate, burst, capacity=65536, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.capacity = capacity
+        self.clock = clock
+        self._buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def allow(self, key, cost=1):
+        # True kalau token cukup (token dipotong), False kalau key sedang melebihi kuota
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            while len(self._buckets) > self.capacity:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] < cost:
+            return False
+        bucket[0] -= cost
+        return True
+
+    def remove(self, key):
+        self._buckets.pop(key, None)
@@ -0,0 +1,156 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from departemen_plan import GEDUNG_PLAN, generate_plan, port_map
+from departemen_policy import POLICY_FILE, CompiledPolicy, ip_to_int, load_policy
+
+# Matriks reachability policy: zona ke zona (per kelas IP) dan host ke host (host GedungTopo).
+# Dipakai sebagai regression test (--save lalu --check setelah policy diubah) dan benchmark (--bench).
+
+
+def class_label(ip_class):
+    zone, is_dekan, building = ip_class
+    return f"{zone}{'+DEKAN' if is_dekan else ''}@{building}"
+
+
+def zone_matrix(policy):
+    # Matriks antar kelas IP: (allowed, rule_id) untuk paket request (bukan reply)
+    reps = np.array(policy.representatives(), dtype=np.uint32)
+    n = len(reps)
+    src = np.repeat(reps, n)
+    dst = np.tile(reps, n)
+    allowed, _, rule_ids = policy.decide_batch(src, dst)
+    labels = [class_label(ip_class) for ip_class in policy.classes]
+    return labels, allowed.reshape(n, n), rule_ids.reshape(n, n)
+
+
+def host_matrix(policy, hosts):
+    ips = np.array([ip_to_int(ip) for _, ip, _, _ in hosts], dtype=np.uint32)
+    n = len(ips)
+    allowed, _, rule_ids = policy.decide_batch(np.repeat(ips, n), np.tile(ips, n))
+    return [name for name, _, _, _ in hosts], allowed.reshape(n, n), rule_ids.reshape(n, n)
+
+
+def print_matrix(title, labels, allowed, rule_ids=None):
+    # Baris = sumber, kolom = tujuan; '.' = ALLOW, 'X' = BLOCK (atau rule id kalau diminta)
+    print(title)
+    width = max(len(label) for label in labels)
+    cell = max((len(str(rule)) for rule in rule_ids.flat), default=1) + 1 if rule_ids is not None else 2
+    for i, label in enumerate(labels):
+        if rule_ids is not None:
+            cells = ''.join(f'{rule:>{cell}}' for rule in rule_ids[i])
+        else:
+            cells = ''.join(f"{'.' if ok else 'X':>{cell}}" for ok in allowed[i])
+        print(f'{label:<{width}} {cells}')
+    print(f'  {int(allowed.sum())}/{allowed.size} pasangan ALLOW\n')
+
+
+def to_json(labels, allowed, rule_ids):
+    return {'labels': labels,
+            'allowed': allowed.astype(int).tolist(),
+            'rules': rule_ids.tolist()}
+
+
+def diff_matrix(name, expected, actual):
+    # Return list baris perbedaan (src, dst, lama -> baru)
+    if expected['labels'] != actual['labels']:
+        return [f'{name}: label berbeda ({len(expected["labels"])} -> {len(actual["labels"])})']
+    diffs = []
+    labels = actual['labels']
+    for i, src in enumerate(labels):
+        for j, dst in enumerate(labels):
+            old = (expected['allowed'][i][j], expected['rules'][i][j])
+            new = (actual['allowed'][i][j], actual['rules'][i][j])
+            if old != new:
+                diffs.append(f"{name}: {src} -> {dst}: "
+                             f"{'ALLOW' if old[0] else 'BLOCK'} ({old[1]}) -> {'ALLOW' if new[0] else 'BLOCK'} ({new[1]})")
+    return diffs
+
+
+def verify(policy, hosts):
+    # Batch harus identik dengan decide per pasangan (request dan ICMP echo reply)
+    ips = np.array([ip_to_int(ip) for _, ip, _, _ in hosts] + policy.representatives(), dtype=np.uint32)
+    n = len(ips)
+    src, dst = np.repeat(ips, n), np.tile(ips, n)
+    for icmp_type in (8, 0):
+        allowed, install, _ = policy.decide_batch(src, dst, icmp_type == 0)
+        for k in range(len(src)):
+            verdict = policy.decide(int(src[k]), int(dst[k]), icmp_type == 0)
+            if (verdict[0], verdict[2]) != (allowed[k], install[k]):
+                raise AssertionError(f'batch != decide untuk {src[k]} -> {dst[k]} icmp {icmp_type}')
+    print(f'verifikasi: {2 * n * n:,} pasangan identik dengan decide')
+
+
+def bench(policy, count, seed=0):
+    rng = np.random.default_rng(seed)
+    base = ip_to_int('192.168.0.0')
+    src = (base + rng.integers(0, 23 * 256, count)).astype(np.uint32)
+    dst = (base + rng.integers(0, 23 * 256, count)).astype(np.uint32)
+
+    pairs = list(zip(src.tolist(), dst.tolist()))
+    start = time.perf_counter()
+    for s, d in pairs:
+        policy.decide(s, d, False)
+    loop = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    policy.decide_batch(src, dst)
+    batch = count / (time.perf_counter() - start)
+    print(f'decide loop          {loop:>14,.0f} pasangan/s')
+    print(f'decide_batch         {batch:>14,.0f} pasangan/s   speedup: {batch / loop:.1f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Matriks reachability policy GedungController')
+    parser.add_argument('--rules', action='store_true', help='tampilkan rule id, bukan ALLOW/BLOCK')
+    parser.add_argument('--no-hosts', action='store_true', help='hanya matriks zona')
+    parser.add_argument('--buildings', type=int, help='pakai topologi hasil generate_plan dengan N gedung')
+    parser.add_argument('--floors', type=int, default=3)
+    parser.add_argument('--segment-hosts', type=int, default=2)
+    parser.add_argument('--save', help='simpan matriks ke file JSON')
+    parser.add_argument('--check', help='bandingkan dengan matriks JSON tersimpan (exit 1 kalau beda)')
+    parser.add_argument('--verify', action='store_true', help='cek batch == decide per pasangan')
+    parser.add_argument('--bench', type=int, metavar='N', help='benchmark batch vs loop dengan N pasangan acak')
+    args = parser.parse_args()
+
+    policy = CompiledPolicy(*load_policy(POLICY_FILE))
+    plan = GEDUNG_PLAN
+    if args.buildings:
+        plan = generate_plan(policy, args.buildings, args.floors, args.segment_hosts)
+    _, hosts = port_map(plan)
+
+    labels, allowed, rule_ids = zone_matrix(policy)
+    result = {'zones': to_json(labels, allowed, rule_ids)}
+    print_matrix('Zona -> zona (baris = sumber)', labels, allowed, rule_ids if args.rules else None)
+    if not args.no_hosts:
+        labels, allowed, rule_ids = host_matrix(policy, hosts)
+        result['hosts'] = to_json(labels, allowed, rule_ids)
+        print_matrix(f'Host -> host ({len(labels)} host)', labels, allowed, rule_ids if args.rules else None)
+
+    if args.verify:
+        verify(policy, hosts)
+    if args.bench:
+        bench(policy, args.bench)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f)
+    if args.check:
+        with open(args.check) as f:
+            expected = json.load(f)
+        diffs = []
+        for name in result:
+            if name in expected:
+                diffs.extend(diff_matrix(name, expected[name], result[name]))
+        for line in diffs:
+            print(line)
+        print(f'{len(diffs)} perbedaan terhadap {args.check}')
+        if diffs:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
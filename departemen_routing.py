@@ -0,0 +1,78 @@
+from collections import deque
+
+
+class Topology:
+    # Graf switch (dari topology discovery Ryu) + lokasi host (dpid, port akses).
+    # links[dpid][dpid_tetangga] = port keluar di dpid menuju tetangga
+    def __init__(self):
+        self.links = {}
+        self.hosts = {}
+        self._paths = {}
+
+    def add_switch(self, dpid):
+        self.links.setdefault(dpid, {})
+
+    def remove_switch(self, dpid):
+        self.links.pop(dpid, None)
+        for neighbors in self.links.values():
+            neighbors.pop(dpid, None)
+        self.hosts = {mac: loc for mac, loc in self.hosts.items() if loc[0] != dpid}
+        self._paths.clear()
+
+    def add_link(self, src_dpid, src_port, dst_dpid):
+        self.links.setdefault(src_dpid, {})[dst_dpid] = src_port
+        self.links.setdefault(dst_dpid, {})
+        # Port antar-switch bukan port host
+        self.hosts = {mac: loc for mac, loc in self.hosts.items() if loc != (src_dpid, src_port)}
+        self._paths.clear()
+
+    def remove_link(self, src_dpid, dst_dpid):
+        if self.links.get(src_dpid, {}).pop(dst_dpid, None) is not None:
+            self._paths.clear()
+
+    def is_switch_port(self, dpid, port):
+        return port in self.links.get(dpid, {}).values()
+
+    def learn_host(self, mac, dpid, port):
+        # Lokasi host hanya dipelajari dari port akses (bukan port antar-switch)
+        if self.is_switch_port(dpid, port):
+            return False
+        self.hosts[mac] = (dpid, port)
+        return True
+
+    def locate(self, mac):
+        return self.hosts.get(mac)
+
+    def path(self, src_dpid, dst_dpid):
+        # Shortest path (BFS, jumlah hop) sebagai list (dpid, port keluar) sampai sebelum dst_dpid
+        key = (src_dpid, dst_dpid)
+        if key in self._paths:
+            return self._paths[key]
+        prev = {src_dpid: None}
+        queue = deque([src_dpid])
+        while queue and dst_dpid not in prev:
+            node = queue.popleft()
+            for neighbor in self.links.get(node, {}):
+                if neighbor not in prev:
+                    prev[neighbor] = node
+                    queue.append(neighbor)
+        if dst_dpid not in prev:
+            return None
+        hops = []
+        node = dst_dpid
+        while prev[node] is not None:
+            hops.append((prev[node], self.links[prev[node]][node]))
+            node = prev[node]
+        hops.reverse()
+        self._paths[key] = hops
+        return hops
+
+    def route(self, src_dpid, dst_mac):
+        # Rute lengkap ke host tujuan: list (dpid, port keluar), hop terakhir ke port host
+        location = self.hosts.get(dst_mac)
+        if location is None:
+            return None
+        hops = self.path(src_dpid, location[0])
+        if hops is None:
+            return None
+        return hops + [location]
@@ -0,0 +1,366 @@
+import argparse
+import json
+import os
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+from ryu.lib import hub
+
+# Mode scale-out: beberapa proses worker GedungController (ryu-manager), koneksi OpenFlow dibagi
+# per dpid. Setiap switch terhubung ke semua worker; pemilik dpid menjadi MASTER (role OpenFlow),
+# worker lain SLAVE sehingga packet-in switch itu hanya diproses satu worker. Koordinator (proses
+# ini) menjalankan worker, menyimpan state bersama (lokasi host, tabel MAC, ARP, link) di store
+# Unix socket, dan mengumumkan daftar worker hidup; dpid worker yang mati pindah ke worker lain.
+# Aksi untuk switch milik worker lain (broadcast, hapus jalur host pindah) diteruskan lewat
+# koordinator ke worker pemiliknya: switch menolak packet-out/flow-mod dari koneksi SLAVE.
+#
+#   python departemen_shard.py --workers 4 [--port 6653] [-- argumen ryu-manager, mis. --observe-links]
+#
+# Worker i mendengarkan OpenFlow di port+i (Mininet: departemen_topology.py --controllers N).
+
+SOCKET_PATH = '/tmp/gedung_shard.sock'
+HEARTBEAT_INTERVAL = 1.0
+LOAD_INTERVAL = 10.0            # worker melaporkan jumlah packet-in per dpid setiap interval ini
+REBALANCE_MARGIN = 0.25         # dpid dibagi ulang kalau worker terberat > 125% pembagian terbaik
+HEARTBEAT_TIMEOUT = 5.0
+RESTART_DELAY = 2.0
+STORE_MAX = 200000
+OUTBOX_MAX = 100000
+# Pesan yang bukan state (tidak disimpan di store), hanya diteruskan ke worker lain: aksi di switch
+# worker lain, koneksi conntrack baru, dan strike backoff drop flow per IP sumber
+RELAY_OPS = ('broadcast', 'unroute', 'conn', 'offender')
+
+
+def shard_owner(dpid, workers, owners=None):
+    # Pemilik dari tabel `owners` koordinator (dibagi menurut beban packet-in) kalau ada; dpid yang
+    # belum punya data beban dibagi round-robin atas worker hidup (urut id), jadi dpid switch
+    # berurutan (s1..sN) terbagi rata. Hashing (rendezvous) untuk belasan switch timpang: ada
+    # worker tanpa switch. Tanpa worker -> None.
+    if not workers:
+        return None
+    if owners:
+        owner = owners.get(dpid)
+        if owner in workers:
+            return owner
+    workers = sorted(workers)
+    return workers[dpid % len(workers)]
+
+
+def balanced_owners(loads, workers):
+    # Greedy (longest processing time): dpid terberat dulu, masing-masing ke worker yang bebannya
+    # paling kecil saat itu (seri -> jumlah dpid paling sedikit). loads: dpid -> packet-in/detik
+    totals = {worker: [0.0, 0] for worker in sorted(workers)}
+    owners = {}
+    for dpid in sorted(loads, key=lambda dpid: (-loads[dpid], dpid)):
+        worker = min(totals, key=lambda worker: (totals[worker][0], totals[worker][1], worker))
+        owners[dpid] = worker
+        totals[worker][0] += loads[dpid]
+        totals[worker][1] += 1
+    return owners
+
+
+def max_worker_load(loads, workers, owners):
+    totals = dict.fromkeys(workers, 0.0)
+    for dpid, load in loads.items():
+        totals[shard_owner(dpid, workers, owners)] += load
+    return max(totals.values(), default=0.0)
+
+
+def state_key(msg):
+    # Key store untuk update state (update terbaru per key yang disimpan); None = bukan state
+    op = msg.get('op')
+    if op == 'mac':
+        return ('mac', msg['dpid'], msg['mac'])
+    if op == 'host':
+        return ('host', msg['mac'])
+    if op == 'arp':
+        return ('arp', msg['ip'])
+    if op in ('link', 'unlink'):
+        return ('link', msg['src'], msg['dst'])
+    return None
+
+
+def encode(messages):
+    return b''.join(json.dumps(msg, separators=(',', ':')).encode() + b'\n' for msg in messages)
+
+
+class ShardClient:
+    # Sisi worker (di dalam GedungController, green thread Ryu). publish() hanya menaruh update di
+    # outbox (hot path packet-in), thread pengirim mengirim per batch. Pesan dari store (daftar worker,
+    # update worker lain) diteruskan ke callback `apply`. Koneksi putus -> sambung ulang, outbox tetap.
+    def __init__(self, path, worker, apply, flush_interval=0.05):
+        self.path = path
+        self.worker = worker
+        self.apply = apply
+        self.flush_interval = flush_interval
+        self.outbox = []
+        self.sent = 0
+        self.connected = False
+
+    def publish(self, msg):
+        if len(self.outbox) >= OUTBOX_MAX:
+            del self.outbox[:len(self.outbox) // 2]
+        self.outbox.append(msg)
+
+    def start(self):
+        return hub.spawn(self._run)
+
+    def _run(self):
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                hub.sleep(1)
+                continue
+            self.connected = True
+            sender = hub.spawn(self._send_loop, sock)
+            try:
+                for line in sock.makefile('rb'):
+                    self.apply(json.loads(line))
+            except (OSError, ValueError):
+                pass
+            finally:
+                self.connected = False
+                hub.kill(sender)
+                sock.close()
+            hub.sleep(1)
+
+    def _send_loop(self, sock):
+        last = 0
+        sock.sendall(encode([{'op': 'hello', 'worker': self.worker}]))
+        while True:
+            hub.sleep(self.flush_interval)
+            now = time.monotonic()
+            batch = self.outbox
+            if not batch and now - last < HEARTBEAT_INTERVAL:
+                continue
+            self.outbox = []
+            try:
+                sock.sendall(encode(batch or [{'op': 'ping'}]))
+            except OSError:
+                self.outbox = batch + self.outbox
+                return
+            self.sent += len(batch)
+            last = now
+
+
+class Coordinator:
+    # Proses induk: jalankan worker, store state bersama, dan daftar anggota (worker yang sudah
+    # hello dan masih mengirim heartbeat). Generation role OpenFlow = waktu (ms) saat anggota
+    # berubah, jadi tetap naik walaupun koordinator di-restart.
+    def __init__(self, workers, port, ryu_args, socket_path=SOCKET_PATH, restart=True):
+        self.workers = workers
+        self.port = port
+        self.ryu_args = ryu_args
+        self.socket_path = socket_path
+        self.restart = restart
+        self.selector = selectors.DefaultSelector()
+        self.state = OrderedDict()
+        self.conns = {}         # socket -> [worker id atau None, buffer, waktu pesan terakhir]
+        self.procs = {}         # worker id -> Popen
+        self.dead_since = {}    # worker id -> waktu proses keluar
+        self.generation = 0
+        self.loads = {}         # dpid -> packet-in/detik (rata-rata bergerak dari laporan worker)
+        self.owners = {}        # dpid -> worker, diumumkan bersama daftar anggota
+        self.last_balance = time.monotonic()
+
+    def worker_cmd(self, worker):
+        return [sys.executable, os.path.abspath(__file__), 'worker', '--id', str(worker),
+                '--socket', self.socket_path, '--port', str(self.port)] + self.ryu_args
+
+    def spawn(self, worker):
+        self.procs[worker] = subprocess.Popen(self.worker_cmd(worker))
+        self.dead_since.pop(worker, None)
+        print(f'worker {worker} dijalankan (pid {self.procs[worker].pid}, port {self.port + worker})', flush=True)
+
+    def members(self):
+        return sorted(state[0] for state in self.conns.values() if state[0] is not None)
+
+    def announce(self):
+        self.generation = max(self.generation + 1, int(time.time() * 1000))
+        members = self.members()
+        self.owners = balanced_owners(self.loads, members) if members else {}
+        msg = encode([{'op': 'members', 'workers': members, 'generation': self.generation,
+                       'owners': {str(dpid): worker for dpid, worker in self.owners.items()}}])
+        for sock in list(self.conns):
+            self.send(sock, msg)
+        print(f'anggota: {members} (generation {self.generation})', flush=True)
+
+    def send(self, sock, data):
+        try:
+            sock.sendall(data)
+        except OSError:
+            self.drop(sock)
+
+    def drop(self, sock):
+        state = self.conns.pop(sock, None)
+        if state is None:
+            return
+        self.selector.unregister(sock)
+        sock.close()
+        if state[0] is not None:
+            print(f'worker {state[0]} terputus', flush=True)
+            self.announce()
+
+    def handle(self, sock, msg):
+        state = self.conns[sock]
+        op = msg.get('op')
+        if op == 'hello':
+            # Worker baru: kirim seluruh state dulu, baru umumkan anggota
+            state[0] = msg['worker']
+            self.send(sock, encode(self.state.values()))
+            self.announce()
+            return
+        if op == 'load':
+            for dpid, count in msg['dpids'].items():
+                rate = count / msg['interval']
+                self.loads[int(dpid)] = (self.loads.get(int(dpid), rate) + rate) / 2
+            return
+        key = state_key(msg)
+        if key is None:
+            if op not in RELAY_OPS:
+                return
+        elif op == 'unlink':
+            self.state.pop(key, None)
+        else:
+            self.state[key] = msg
+            self.state.move_to_end(key)
+            while len(self.state) > STORE_MAX:
+                self.state.popitem(last=False)
+        data = encode([msg])
+        for other in list(self.conns):
+            if other is not sock and self.conns.get(other, [None])[0] is not None:
+                self.send(other, data)
+
+    def read(self, sock):
+        try:
+            data = sock.recv(65536)
+        except OSError:
+            data = b''
+        if not data:
+            self.drop(sock)
+            return
+        state = self.conns[sock]
+        state[2] = time.monotonic()
+        lines = (state[1] + data).split(b'\n')
+        state[1] = lines.pop()
+        for line in lines:
+            if sock not in self.conns:
+                return
+            try:
+                self.handle(sock, json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                pass
+
+    def rebalance(self):
+        # Pembagian dpid diganti (generation baru -> role MASTER pindah) hanya kalau jauh lebih
+        # seimbang, supaya rekonsiliasi switch tidak terjadi terus-menerus karena fluktuasi kecil
+        members = self.members()
+        if not members or not self.loads:
+            return
+        current = max_worker_load(self.loads, members, self.owners)
+        best = max_worker_load(self.loads, members, balanced_owners(self.loads, members))
+        if current > best * (1 + REBALANCE_MARGIN):
+            print(f'beban packet-in timpang ({current:.0f}/s vs {best:.0f}/s), dpid dibagi ulang', flush=True)
+            self.announce()
+
+    def check_workers(self):
+        now = time.monotonic()
+        for sock, state in list(self.conns.items()):
+            if state[0] is not None and now - state[2] > HEARTBEAT_TIMEOUT:
+                # Worker hidup tapi macet: koneksi diputus dan proses dihentikan (akan di-restart)
+                print(f'worker {state[0]} tidak mengirim heartbeat, dihentikan', flush=True)
+                proc = self.procs.get(state[0])
+                if proc is not None:
+                    proc.kill()
+                self.drop(sock)
+        for worker, proc in self.procs.items():
+            if proc.poll() is None:
+                continue
+            if worker not in self.dead_since:
+                print(f'worker {worker} keluar (kode {proc.returncode})', flush=True)
+                self.dead_since[worker] = now
+            elif self.restart and now - self.dead_since[worker] >= RESTART_DELAY:
+                self.spawn(worker)
+
+    def run(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(64)
+        server.setblocking(False)
+        self.selector.register(server, selectors.EVENT_READ)
+        for worker in range(self.workers):
+            self.spawn(worker)
+        # SIGTERM diperlakukan seperti Ctrl-C supaya worker ikut dihentikan
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            while True:
+                for key, _ in self.selector.select(timeout=1.0):
+                    if key.fileobj is server:
+                        sock, _ = server.accept()
+                        # Worker yang tidak membaca selama HEARTBEAT_TIMEOUT -> sendall gagal -> diputus
+                        sock.settimeout(HEARTBEAT_TIMEOUT)
+                        self.conns[sock] = [None, b'', time.monotonic()]
+                        self.selector.register(sock, selectors.EVENT_READ)
+                    else:
+                        self.read(key.fileobj)
+                self.check_workers()
+                if time.monotonic() - self.last_balance >= LOAD_INTERVAL:
+                    self.last_balance = time.monotonic()
+                    self.rebalance()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for proc in self.procs.values():
+                proc.terminate()
+            for proc in self.procs.values():
+                proc.wait()
+            server.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+def run_worker(args, ryu_args):
+    # ryu.cmd.manager harus diimpor dulu (monkey patch eventlet) sebelum modul controller
+    from ryu.cmd import manager
+    import departemen_controller
+
+    cls = departemen_controller.GedungController
+    cls.SHARD_SOCKET = args.socket
+    cls.SHARD_WORKER = args.id
+    # File/port yang tidak boleh dipakai bersama antar proses
+    cls.SNAPSHOT_FILE = f'gedung_state.{args.id}.json'
+    cls.AUDIT_LOG_PATH = f'audit_keamanan.{args.id}.log'
+    if cls.METRICS_LISTEN:
+        cls.METRICS_LISTEN = (cls.METRICS_LISTEN[0], cls.METRICS_LISTEN[1] + args.id)
+    manager.main(['--ofp-tcp-listen-port', str(args.port + args.id), '--wsapi-port', str(8080 + args.id)]
+                 + ryu_args + ['departemen_controller'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GedungController multi-proses (sharding per dpid)')
+    parser.add_argument('role', nargs='?', choices=['coordinator', 'worker'], default='coordinator')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='jumlah proses worker')
+    parser.add_argument('--port', type=int, default=6653, help='port OpenFlow worker 0 (worker i: port+i)')
+    parser.add_argument('--socket', default=SOCKET_PATH, help='Unix socket store state bersama')
+    parser.add_argument('--no-restart', action='store_true', help='worker yang mati tidak dijalankan ulang')
+    parser.add_argument('--id', type=int, default=0, help=argparse.SUPPRESS)
+    args, ryu_args = parser.parse_known_args()
+    ryu_args = [arg for arg in ryu_args if arg != '--']
+    if args.role == 'worker':
+        run_worker(args, ryu_args)
+    else:
+        Coordinator(args.workers, args.port, ryu_args, args.socket, not args.no_restart).run()
+
+
+if __name__ == '__main__':
+    main()
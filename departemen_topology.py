@@ -1,177 +1,185 @@
+import argparse
+import json
+import random
+import re
+import time
+
 from mininet.topo import Topo
 from mininet.net import Mininet
 from mininet.node import RemoteController
 from mininet.cli import CLI
-from mininet.log import setLogLevel
+from mininet.log import setLogLevel, info
+
+from departemen_plan import GEDUNG_PLAN, HOST_PREFIX_LEN, generate_plan
+from departemen_policy import POLICY_FILE, CompiledPolicy, ip_to_int, load_policy
+
+RTT_RE = re.compile(r'time=([\d.]+) ms')
 
 class GedungTopo(Topo):
-    def build(self):
-        # CORE & DISTRIBUTION
-        s_core = self.addSwitch('s1', dpid='0000000000000001')
-        s_dist_g9 = self.addSwitch('s2', dpid='0000000000000002')
-        s_dist_g10 = self.addSwitch('s3', dpid='0000000000000003')
-        
-        self.addLink(s_core, s_dist_g9)
-        self.addLink(s_core, s_dist_g10)
-
-        # ================= GEDUNG G9 =================
-        
-        # --- G9 Lantai 1 (Access Point Mahasiswa) ---
-        s_g9_lt1 = self.addSwitch('s4')
-        self.addLink(s_dist_g9, s_g9_lt1)
-
-        # IP Nirkabel Gedung G9 Lantai 1: 192.168.1.0/22
-        h_mhs_wifi_1 = self.addHost('mhs1', ip='192.168.1.1/16')
-        h_mhs_wifi_2 = self.addHost('mhs2', ip='192.168.1.2/16')
-        self.addLink(s_g9_lt1, h_mhs_wifi_1)
-        self.addLink(s_g9_lt1, h_mhs_wifi_2)
-
-        # IP Kabel Gedung G9 Lantai 1: 192.168.10.0/27
-        h_mhs_kabel_1 = self.addHost('mhsc1', ip='192.168.10.1/16')
-        h_mhs_kabel_2 = self.addHost('mhsc2', ip='192.168.10.2/16')
-        self.addLink(s_g9_lt1, h_mhs_kabel_1)
-        self.addLink(s_g9_lt1, h_mhs_kabel_2)
-
-        # --- G9 Lantai 2 (Area Campuran) ---
-        s_g9_lt2_agg = self.addSwitch('s5')
-        self.addLink(s_dist_g9, s_g9_lt2_agg)
-
-        # IP Nirkabel Gedung G9 Lantai 2: 192.168.5.0/24
-        h_mhs_wifi_lt2_1 = self.addHost('mhs2a', ip='192.168.5.1/16')
-        h_mhs_wifi_lt2_2 = self.addHost('mhs2b', ip='192.168.5.2/16')
-        self.addLink(s_g9_lt2_agg, h_mhs_wifi_lt2_1)
-        self.addLink(s_g9_lt2_agg, h_mhs_wifi_lt2_2)
-
-        # IP Kabel Gedung G9 Lantai 2: 192.168.10.32/26
-        # Keuangan
-        s_adm_keu = self.addSwitch('s6')
-        self.addLink(s_g9_lt2_agg, s_adm_keu)
-        h_keu_1 = self.addHost('keu1', ip='192.168.10.33/16')
-        h_keu_2 = self.addHost('keu2', ip='192.168.10.34/16')
-        self.addLink(s_adm_keu, h_keu_1)
-        self.addLink(s_adm_keu, h_keu_2)
-
-        # Pimpinan
-        s_pimpinan = self.addSwitch('s7')
-        self.addLink(s_g9_lt2_agg, s_pimpinan)
-        h_dekan = self.addHost('dekan', ip='192.168.10.35/16')
-        h_sekre = self.addHost('sekre', ip='192.168.10.36/16')
-        self.addLink(s_pimpinan, h_dekan)
-        self.addLink(s_pimpinan, h_sekre)
-
-        # Dosen Gedung G9
-        s_dosen_g9 = self.addSwitch('s8')
-        self.addLink(s_g9_lt2_agg, s_dosen_g9)
-        h_dsn_g9_1 = self.addHost('dsn9a', ip='192.168.10.37/16')
-        h_dsn_g9_2 = self.addHost('dsn9b', ip='192.168.10.38/16')
-        self.addLink(s_dosen_g9, h_dsn_g9_1)
-        self.addLink(s_dosen_g9, h_dsn_g9_2)
-
-        # R.Ujian
-        s_ujian = self.addSwitch('s9')
-        self.addLink(s_g9_lt2_agg, s_ujian)
-        h_ujian_1 = self.addHost('ujian1', ip='192.168.10.39/16')
-        h_ujian_2 = self.addHost('ujian2', ip='192.168.10.40/16')
-        self.addLink(s_ujian, h_ujian_1)
-        self.addLink(s_ujian, h_ujian_2)
-
-        # --- G9 Lantai 3 (Lab & AP Mahasiswa) ---
-        # Switch Utama Lantai 3
-        s_g9_lt3_main = self.addSwitch('s10')
-        self.addLink(s_dist_g9, s_g9_lt3_main)
-
-        # IP Nirkabel Gedung G9 Lantai 3: 192.168.6.0/22
-        # Access Point Mahasiswa Lt3
-        h_mhs_3a = self.addHost('mhs3a', ip='192.168.6.1/16')
-        h_mhs_3b = self.addHost('mhs3b', ip='192.168.6.2/16')
-        self.addLink(s_g9_lt3_main, h_mhs_3a)
-        self.addLink(s_g9_lt3_main, h_mhs_3b)
-
-        # IP Kabel Gedung G9 Lantai 3: 192.168.10.96/25
-        # Lab 1
-        s_lab1 = self.addSwitch('s11')
-        self.addLink(s_g9_lt3_main, s_lab1)
-        h_lab1_a = self.addHost('lab1a', ip='192.168.10.97/16')
-        h_lab1_b = self.addHost('lab1b', ip='192.168.10.98/16')
-        self.addLink(s_lab1, h_lab1_a)
-        self.addLink(s_lab1, h_lab1_b)
-
-        # Lab 2
-        s_lab2 = self.addSwitch('s12')
-        self.addLink(s_g9_lt3_main, s_lab2)
-        h_lab2_a = self.addHost('lab2a', ip='192.168.10.99/16')
-        h_lab2_b = self.addHost('lab2b', ip='192.168.10.100/16')
-        self.addLink(s_lab2, h_lab2_a)
-        self.addLink(s_lab2, h_lab2_b)
-
-        # Lab 3
-        s_lab3 = self.addSwitch('s13')
-        self.addLink(s_g9_lt3_main, s_lab3)
-        h_lab3_a = self.addHost('lab3a', ip='192.168.10.101/16')
-        h_lab3_b = self.addHost('lab3b', ip='192.168.10.102/16')
-        self.addLink(s_lab3, h_lab3_a)
-        self.addLink(s_lab3, h_lab3_b)
-
-
-        # ================= GEDUNG G10 =================
-
-        # --- G10 Lantai 1 ---
-        s_g10_lt1 = self.addSwitch('s14')
-        self.addLink(s_dist_g10, s_g10_lt1)
-
-        # IP Nirkabel Gedung G10 Lantai 1: 192.168.20.0/26
-        h_mhs_g10_1 = self.addHost('mhsg10_1', ip='192.168.20.1/16')
-        h_mhs_g10_2 = self.addHost('mhsg10_2', ip='192.168.20.2/16')
-        self.addLink(s_g10_lt1, h_mhs_g10_1)
-        self.addLink(s_g10_lt1, h_mhs_g10_2)
-
-        # IP Kabel Gedung G10 Lantai 1: 192.168.21.0/28
-        h_adm_g10_1 = self.addHost('adm10a', ip='192.168.21.1/16')
-        h_adm_g10_2 = self.addHost('adm10b', ip='192.168.21.2/16')
-        self.addLink(s_g10_lt1, h_adm_g10_1)
-        self.addLink(s_g10_lt1, h_adm_g10_2)
-
-        # --- G10 Lantai 2 ---
-        s_g10_lt2 = self.addSwitch('s15')
-        self.addLink(s_dist_g10, s_g10_lt2)
-
-        # IP Nirkabel Gedung G10 Lantai 2: 192.168.20.64/25
-        h_mhs_g10_lt2_1 = self.addHost('mhsg10_2a', ip='192.168.20.65/16')
-        h_mhs_g10_lt2_2 = self.addHost('mhsg10_2b', ip='192.168.20.66/16')
-        self.addLink(s_g10_lt2, h_mhs_g10_lt2_1)
-        self.addLink(s_g10_lt2, h_mhs_g10_lt2_2)
-
-        # IP Kabel Gedung G10 Lantai 2: 192.168.21.16/29
-        h_dsn_10a_1 = self.addHost('dsn10a1', ip='192.168.21.17/16')
-        h_dsn_10a_2 = self.addHost('dsn10a2', ip='192.168.21.18/16')
-        h_aula_1 = self.addHost('aula1', ip='192.168.21.19/16')
-        h_aula_2 = self.addHost('aula2', ip='192.168.21.20/16')
-        self.addLink(s_g10_lt2, h_dsn_10a_1)
-        self.addLink(s_g10_lt2, h_dsn_10a_2)
-        self.addLink(s_g10_lt2, h_aula_1)
-        self.addLink(s_g10_lt2, h_aula_2)
-
-        # --- G10 Lantai 3 ---
-        s_g10_lt3 = self.addSwitch('s16')
-        self.addLink(s_dist_g10, s_g10_lt3)
-
-        # IP Nirkabel Gedung G10 Lantai 3: 192.168.20.192/26
-        h_mhs_g10_lt3_1 = self.addHost('mhsg10_3a', ip='192.168.20.193/16')
-        h_mhs_g10_lt3_2 = self.addHost('mhsg10_3b', ip='192.168.20.194/16')
-        self.addLink(s_g10_lt3, h_mhs_g10_lt3_1)
-        self.addLink(s_g10_lt3, h_mhs_g10_lt3_2)
-
-        # IP Kabel Gedung G10 Lantai 3: 192.168.21.32/26
-        h_dsn_10b_1 = self.addHost('dsn10b1', ip='192.168.21.33/16')
-        h_dsn_10b_2 = self.addHost('dsn10b2', ip='192.168.21.34/16')
-        self.addLink(s_g10_lt3, h_dsn_10b_1)
-        self.addLink(s_g10_lt3, h_dsn_10b_2)
+    # Switch, link, dan host dibangun dari GEDUNG_PLAN (departemen_plan.py):
+    # core s1, distribusi s2 (G9) / s3 (G10), switch akses per lantai/ruangan.
+    # Plan hasil generate_plan (skala besar) juga bisa dipakai: GedungTopo(plan=...)
+    def build(self, plan=GEDUNG_PLAN):
+        switches = {}
+        for name, parent, dpid, segments in plan:
+            if dpid:
+                switches[name] = self.addSwitch(name, dpid=dpid)
+            else:
+                switches[name] = self.addSwitch(name)
+            if parent is not None:
+                self.addLink(switches[parent], switches[name])
+
+            for _, _, hosts in segments:
+                for host_name, ip in hosts:
+                    host = self.addHost(host_name, ip=f'{ip}/{HOST_PREFIX_LEN}')
+                    self.addLink(switches[name], host)
+
+# --- Skenario beban otomatis ---
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def summarize(values):
+    return {'count': len(values), 'p50': percentile(values, 50), 'p90': percentile(values, 90),
+            'p99': percentile(values, 99), 'max': max(values) if values else None}
+
+
+def host_pairs(net, max_pairs, rng, policy=None):
+    # Semua pasangan host (atau sampel max_pairs); kalau policy diberikan, hanya pasangan yang diizinkan
+    pairs = [(src, dst) for src in net.hosts for dst in net.hosts if src is not dst]
+    if policy is not None:
+        pairs = [(src, dst) for src, dst in pairs
+                 if policy.decide(ip_to_int(src.IP()), ip_to_int(dst.IP()), False)[0]]
+    if max_pairs and len(pairs) > max_pairs:
+        pairs = rng.sample(pairs, max_pairs)
+    return pairs
+
+
+def scenario_ping(net, policy, args, rng):
+    # Ping semua pasangan: RTT paket pertama (termasuk setup flow di controller) vs paket kedua
+    first, second, results = [], [], []
+    mismatches = 0
+    for src, dst in host_pairs(net, args.max_pairs, rng):
+        expected = policy.decide(ip_to_int(src.IP()), ip_to_int(dst.IP()), False)[0]
+        rtts = [float(rtt) for rtt in RTT_RE.findall(src.cmd(f'ping -c 2 -i 0.2 -W 1 {dst.IP()}'))]
+        reached = len(rtts) > 0
+        mismatches += reached != expected
+        if len(rtts) >= 1:
+            first.append(rtts[0])
+        if len(rtts) >= 2:
+            second.append(rtts[1])
+        results.append({'src': src.name, 'dst': dst.name, 'expected': expected, 'reached': reached, 'rtt_ms': rtts})
+    info(f'*** ping: {len(results)} pasangan, {mismatches} tidak sesuai policy\n')
+    return {'pairs': len(results), 'policy_mismatches': mismatches,
+            'first_rtt_ms': summarize(first), 'second_rtt_ms': summarize(second), 'results': results}
+
+
+def scenario_iperf(net, policy, args, rng):
+    # iperf TCP serentak antar pasangan yang diizinkan policy (satu server per host tujuan)
+    pairs, servers = [], set()
+    for src, dst in host_pairs(net, 0, rng, policy):
+        if dst not in servers and src not in servers and len(pairs) < args.iperf_pairs:
+            pairs.append((src, dst))
+            servers.add(dst)
+    for dst in servers:
+        dst.cmd('iperf -s -p 5001 &')
+    time.sleep(1)
+    procs = [(src, dst, src.popen(f'iperf -c {dst.IP()} -p 5001 -t {args.iperf_time} -y C'))
+             for src, dst in pairs]
+    results = []
+    for src, dst, proc in procs:
+        out, _ = proc.communicate()
+        lines = out.decode().strip().splitlines()
+        bps = int(lines[-1].split(',')[-1]) if lines else 0
+        results.append({'src': src.name, 'dst': dst.name, 'bits_per_sec': bps})
+    for dst in servers:
+        dst.cmd('kill %iperf')
+    total = sum(r['bits_per_sec'] for r in results)
+    info(f'*** iperf: {len(results)} pasangan serentak, total {total / 1e6:.1f} Mbit/s\n')
+    return {'pairs': len(results), 'total_bits_per_sec': total,
+            'bits_per_sec': summarize([r['bits_per_sec'] for r in results]), 'results': results}
+
+
+def scenario_burst(net, policy, args, rng):
+    # Burst setup flow: N ping serentak ke pasangan baru, ukur laju setup flow (pasangan/detik)
+    pairs = host_pairs(net, 0, rng, policy)
+    rng.shuffle(pairs)
+    rounds = []
+    for size in args.burst:
+        batch, pairs = pairs[:size], pairs[size:]
+        if not batch:
+            break
+        start = time.time()
+        procs = [src.popen(f'ping -c 1 -W 2 {dst.IP()}') for src, dst in batch]
+        rtts = []
+        for proc in procs:
+            out, _ = proc.communicate()
+            rtts.extend(float(rtt) for rtt in RTT_RE.findall(out.decode()))
+        elapsed = time.time() - start
+        rounds.append({'size': len(batch), 'completed': len(rtts), 'elapsed_s': elapsed,
+                       'setups_per_sec': len(rtts) / elapsed, 'rtt_ms': summarize(rtts)})
+        info(f'*** burst {len(batch)}: {len(rtts)} selesai, {len(rtts) / elapsed:.1f} setup/s\n')
+    return {'rounds': rounds}
+
+
+SCENARIOS = {
+    'ping': scenario_ping,
+    'iperf': scenario_iperf,
+    'burst': scenario_burst,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Topologi gedung (Mininet) + skenario beban otomatis')
+    parser.add_argument('--buildings', type=int, help='generate topologi: jumlah gedung (default: topologi asli)')
+    parser.add_argument('--floors', type=int, default=3, help='jumlah lantai per gedung')
+    parser.add_argument('--hosts', type=int, default=2, help='jumlah host per segmen')
+    parser.add_argument('--controllers', type=int, default=1,
+                        help='jumlah controller (worker departemen_shard.py di port 6653+i)')
+    parser.add_argument('--scenario', nargs='*', help='skenario (ping/iperf/burst); tanpa opsi ini -> CLI')
+    parser.add_argument('--max-pairs', type=int, default=2000, help='ping: batas sampel pasangan host (0 = semua)')
+    parser.add_argument('--iperf-pairs', type=int, default=10, help='iperf: jumlah pasangan serentak')
+    parser.add_argument('--iperf-time', type=int, default=5, help='iperf: durasi (detik)')
+    parser.add_argument('--burst', type=int, nargs='+', default=[10, 50, 100], help='burst: ukuran tiap putaran')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='hasil_skenario.json', help='file hasil (JSON)')
+    return parser.parse_args()
+
 
 def run():
-    topo = GedungTopo()
-    net = Mininet(topo=topo, controller=RemoteController, autoSetMacs=True)
+    args = parse_args()
+    unknown = [name for name in args.scenario or [] if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f'skenario tidak dikenal: {", ".join(unknown)}')
+    policy = CompiledPolicy(*load_policy(POLICY_FILE))
+    if args.buildings:
+        plan = generate_plan(policy, args.buildings, args.floors, args.hosts)
+    else:
+        plan = GEDUNG_PLAN
+    topo = GedungTopo(plan=plan)
+    net = Mininet(topo=topo, controller=None if args.controllers > 1 else RemoteController, autoSetMacs=True)
+    if args.controllers > 1:
+        # Setiap switch terhubung ke semua worker; role MASTER/SLAVE per dpid diatur controller
+        for i in range(args.controllers):
+            net.addController(f'c{i}', controller=RemoteController, ip='127.0.0.1', port=6653 + i)
     net.start()
-    CLI(net)
+
+    if args.scenario is None:
+        CLI(net)
+    else:
+        rng = random.Random(args.seed)
+        report = {'buildings': args.buildings, 'floors': args.floors, 'hosts_per_segment': args.hosts,
+                  'switches': len(net.switches), 'hosts': len(net.hosts), 'timestamp': time.time(),
+                  'scenarios': {}}
+        for name in args.scenario or list(SCENARIOS):
+            report['scenarios'][name] = SCENARIOS[name](net, policy, args, rng)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        info(f'*** Hasil disimpan ke {args.output}\n')
     net.stop()
 
 if __name__ == '__main__':
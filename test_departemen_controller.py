@@ -0,0 +1,207 @@
+import unittest
+
+from ryu.controller import ofp_event
+from ryu.lib.packet import packet, arp, ethernet, icmp, ipv4, tcp
+from ryu.ofproto import ofproto_v1_3, ofproto_v1_3_parser
+
+from departemen_controller import GedungController
+from departemen_policy import CompiledPolicy, ip_to_int
+
+MAHASISWA_IP, MAHASISWA_MAC = '192.168.21.19', '00:00:00:00:00:01'
+DOSEN_IP, DOSEN_MAC = '192.168.21.33', '00:00:00:00:00:02'
+
+
+class Controller(GedungController):
+    # Tanpa file audit/snapshot dan thread background
+    AUDIT_ENABLED = False
+    SNAPSHOT_FILE = None
+    RECONCILE_ENABLED = False
+
+
+class Datapath:
+    # Datapath palsu: pesan OpenFlow hanya disimpan
+    ofproto = ofproto_v1_3
+    ofproto_parser = ofproto_v1_3_parser
+
+    def __init__(self, dpid):
+        self.id = dpid
+        self.ports = {}
+        self.sent = []
+
+    def send_msg(self, msg):
+        self.sent.append(msg)
+
+    def flows(self, priority):
+        return [msg for msg in self.sent
+                if isinstance(msg, ofproto_v1_3_parser.OFPFlowMod) and msg.priority == priority]
+
+
+def tcp_frame(src_mac, dst_mac, src_ip, dst_ip, src_port, dst_port, bits=tcp.TCP_SYN):
+    pkt = packet.Packet()
+    pkt.add_protocol(ethernet.ethernet(dst=dst_mac, src=src_mac))
+    pkt.add_protocol(ipv4.ipv4(src=src_ip, dst=dst_ip, proto=6))
+    pkt.add_protocol(tcp.tcp(src_port=src_port, dst_port=dst_port, bits=bits))
+    pkt.serialize()
+    return bytes(pkt.data)
+
+
+def echo_reply_frame(src_mac, dst_mac, src_ip, dst_ip):
+    pkt = packet.Packet()
+    pkt.add_protocol(ethernet.ethernet(dst=dst_mac, src=src_mac))
+    pkt.add_protocol(ipv4.ipv4(src=src_ip, dst=dst_ip, proto=1))
+    pkt.add_protocol(icmp.icmp(type_=icmp.ICMP_ECHO_REPLY, data=icmp.echo(id_=1, seq=1)))
+    pkt.serialize()
+    return bytes(pkt.data)
+
+
+def arp_request_frame(src_mac, src_ip, dst_ip):
+    pkt = packet.Packet()
+    pkt.add_protocol(ethernet.ethernet(dst='ff:ff:ff:ff:ff:ff', src=src_mac, ethertype=0x0806))
+    pkt.add_protocol(arp.arp(opcode=arp.ARP_REQUEST, src_mac=src_mac, src_ip=src_ip,
+                             dst_mac='00:00:00:00:00:00', dst_ip=dst_ip))
+    pkt.serialize()
+    return bytes(pkt.data)
+
+
+def packet_in(ctrl, datapath, in_port, data):
+    msg = ofproto_v1_3_parser.OFPPacketIn(
+        datapath, buffer_id=ofproto_v1_3.OFP_NO_BUFFER, total_len=len(data),
+        reason=ofproto_v1_3.OFPR_NO_MATCH, table_id=0, cookie=0,
+        match=ofproto_v1_3_parser.OFPMatch(in_port=in_port), data=data)
+    ctrl._packet_in_handler(ofp_event.EventOFPPacketIn(msg))
+
+
+def output_ports(flow_mod):
+    return [action.port for inst in flow_mod.instructions for action in inst.actions]
+
+
+class ReturnFlowAfterDropTest(unittest.TestCase):
+    # Mahasiswa -> dosen diblok (drop flow dipasang), lalu dosen membuka koneksi yang sah ke
+    # mahasiswa: flow arah balik prioritas conntrack harus langsung terpasang di atas drop flow
+
+    def setUp(self):
+        self.ctrl = Controller()
+        policy = self.ctrl.policy
+        self.assertFalse(policy.decide(ip_to_int(MAHASISWA_IP), ip_to_int(DOSEN_IP), False)[0])
+        self.assertTrue(policy.decide(ip_to_int(DOSEN_IP), ip_to_int(MAHASISWA_IP), False)[0])
+
+    def assert_return_flow(self, datapath, out_port):
+        flows = [flow for flow in datapath.flows(self.ctrl.CONNTRACK_PRIORITY)
+                 if dict(flow.match.items()).get('ipv4_src') == MAHASISWA_IP]
+        self.assertEqual(len(flows), 1)
+        match = dict(flows[0].match.items())
+        self.assertEqual((match['ipv4_dst'], match['tcp_src'], match['tcp_dst']), (DOSEN_IP, 80, 50000))
+        self.assertEqual(output_ports(flows[0]), [out_port])
+
+    def test_reactive(self):
+        datapath = Datapath(1)
+        packet_in(self.ctrl, datapath, 1, tcp_frame(MAHASISWA_MAC, DOSEN_MAC, MAHASISWA_IP, DOSEN_IP, 40000, 22))
+        self.assertEqual(len(datapath.flows(self.ctrl.DROP_PRIORITY)), 1)
+
+        packet_in(self.ctrl, datapath, 2, tcp_frame(DOSEN_MAC, MAHASISWA_MAC, DOSEN_IP, MAHASISWA_IP, 50000, 80))
+        self.assert_return_flow(datapath, 2)
+
+    def test_path_mode(self):
+        self.ctrl.PATH_MODE = True
+        edge, core = Datapath(1), Datapath(2)
+        self.ctrl.datapaths.update({1: edge, 2: core})
+        self.ctrl.topology.add_link(1, 3, 2)
+        self.ctrl.topology.add_link(2, 3, 1)
+        packet_in(self.ctrl, edge, 1, tcp_frame(MAHASISWA_MAC, DOSEN_MAC, MAHASISWA_IP, DOSEN_IP, 40000, 22))
+        self.assertEqual(len(edge.flows(self.ctrl.DROP_PRIORITY)), 1)
+
+        packet_in(self.ctrl, core, 1, tcp_frame(DOSEN_MAC, MAHASISWA_MAC, DOSEN_IP, MAHASISWA_IP, 50000, 80))
+        self.assert_return_flow(core, 1)
+        self.assert_return_flow(edge, 3)
+
+
+class PathModeTransitTest(unittest.TestCase):
+    # Mode path: edge (dpid 1, mahasiswa di port 1) -- port 3 / port 3 -- core (dpid 2, dosen di port 1)
+
+    def setUp(self):
+        self.ctrl = Controller()
+        self.ctrl.PATH_MODE = True
+        self.edge, self.core = Datapath(1), Datapath(2)
+        self.ctrl.datapaths.update({1: self.edge, 2: self.core})
+        self.ctrl.topology.add_link(1, 3, 2)
+        self.ctrl.topology.add_link(2, 3, 1)
+        self.ctrl.topology.learn_host(DOSEN_MAC, 2, 1)
+
+    def pair_flows(self, datapath):
+        return datapath.flows(1)
+
+    def test_reply_only_sent_from_egress(self):
+        # Echo reply mahasiswa -> dosen hanya diizinkan sebagai balasan (tanpa flow): paket keluar
+        # langsung dari switch terakhir, switch lain tidak menerima packet-out/flow pasangan
+        packet_in(self.ctrl, self.edge, 1, echo_reply_frame(MAHASISWA_MAC, DOSEN_MAC, MAHASISWA_IP, DOSEN_IP))
+        outs = [msg for msg in self.core.sent if isinstance(msg, ofproto_v1_3_parser.OFPPacketOut)]
+        self.assertEqual([action.port for action in outs[0].actions], [1])
+        self.assertFalse([msg for msg in self.edge.sent if isinstance(msg, ofproto_v1_3_parser.OFPPacketOut)])
+        self.assertFalse(self.pair_flows(self.edge) + self.pair_flows(self.core))
+
+    def test_transit_reply_only_installs_nothing(self):
+        packet_in(self.ctrl, self.core, 3, echo_reply_frame(MAHASISWA_MAC, DOSEN_MAC, MAHASISWA_IP, DOSEN_IP))
+        self.assertFalse(self.pair_flows(self.core))
+
+    def test_transit_flow_tagged_with_pair_cookie(self):
+        dosen2_ip = '192.168.21.34'
+        packet_in(self.ctrl, self.core, 3, tcp_frame('00:00:00:00:00:03', DOSEN_MAC, dosen2_ip, DOSEN_IP, 40000, 22))
+        flows = self.pair_flows(self.core)
+        self.assertEqual(len(flows), 1)
+        cookie = self.ctrl.pair_cookie(ip_to_int(dosen2_ip), ip_to_int(DOSEN_IP)) | self.ctrl.COOKIE_APP
+        self.assertEqual(flows[0].cookie, cookie)
+
+
+class SuppressedPacketsTest(unittest.TestCase):
+    # Statistik drop flow per sumber dibatasi DROP_TRACK_MAX (LRU), total tetap di metrik
+
+    def drop_removed(self, ctrl, src_ip, packet_count):
+        msg = ofproto_v1_3_parser.OFPFlowRemoved(
+            Datapath(1), cookie=ctrl.COOKIE_DROP << 56, priority=ctrl.DROP_PRIORITY,
+            reason=ofproto_v1_3.OFPRR_IDLE_TIMEOUT, table_id=0, duration_sec=0, duration_nsec=0,
+            idle_timeout=0, hard_timeout=0, packet_count=packet_count, byte_count=0,
+            match=ofproto_v1_3_parser.OFPMatch(eth_type=0x0800, ipv4_src=src_ip, ipv4_dst=DOSEN_IP))
+        ctrl._flow_removed_handler(ofp_event.EventOFPFlowRemoved(msg))
+
+    def test_bounded_lru(self):
+        ctrl = Controller()
+        ctrl.DROP_TRACK_MAX = 2
+        for src_ip in ('192.168.1.1', '192.168.1.2', '192.168.1.1', '192.168.1.3'):
+            self.drop_removed(ctrl, src_ip, 5)
+        self.assertEqual(dict(ctrl.suppressed_packets), {'192.168.1.1': 10, '192.168.1.3': 5})
+        self.assertEqual(ctrl.metrics.counters[('drop_flow_packets_total', ())], 20)
+
+
+class ReactiveBroadcastScopingTest(unittest.TestCase):
+    # Mode reaktif, satu switch: mahasiswa (port 1), dosen (port 2), mahasiswa lain (port 3),
+    # port 4 belum ada host. Policy uji: mahasiswa <-> dosen diblok dua arah
+
+    def setUp(self):
+        self.ctrl = Controller()
+        rules = [{'id': 'M-D', 'src_zone': ['MAHASISWA'], 'dst_zone': ['DOSEN'], 'action': 'BLOCK',
+                  'reason': 'BLOCK'},
+                 {'id': 'D-M', 'src_zone': ['DOSEN'], 'dst_zone': ['MAHASISWA'], 'action': 'BLOCK',
+                  'reason': 'BLOCK'}]
+        self.ctrl.policy = CompiledPolicy(self.ctrl.zones, rules, {})
+        self.datapath = Datapath(1)
+        self.datapath.ports = {1: None, 2: None, 3: None, 4: None}
+        for port_no, mac, ip_addr in ((2, DOSEN_MAC, DOSEN_IP), (3, '00:00:00:00:00:03', '192.168.1.5')):
+            self.ctrl.mac_to_port.learn(1, mac, port_no)
+            self.ctrl.arp_table.learn(ip_to_int(ip_addr), mac)
+
+    def broadcast_ports(self):
+        packet_in(self.ctrl, self.datapath, 1, arp_request_frame(MAHASISWA_MAC, MAHASISWA_IP, '192.168.1.6'))
+        outs = [msg for msg in self.datapath.sent if isinstance(msg, ofproto_v1_3_parser.OFPPacketOut)]
+        self.assertEqual(len(outs), 1)
+        return sorted(action.port for action in outs[0].actions)
+
+    def test_skips_unreachable_access_port(self):
+        self.assertEqual(self.broadcast_ports(), [3, 4])
+
+    def test_keeps_switch_port(self):
+        self.ctrl.topology.add_link(1, 2, 2)
+        self.assertEqual(self.broadcast_ports(), [ofproto_v1_3.OFPP_FLOOD])
+
+
+if __name__ == '__main__':
+    unittest.main()
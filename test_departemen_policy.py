@@ -0,0 +1,52 @@
+import unittest
+
+from departemen_legacy import legacy_check_security
+from departemen_policy import POLICY_FILE, CompiledPolicy, ip_to_int, int_to_ip, load_policy, zone_ranges
+
+# Semua IP 192.168.0.0 - 192.168.22.255 (semua zona, gedung, dan IP di luar zona)
+GRID = ['192.168.%d.%d' % (c, d) for c in range(23) for d in range(256)]
+
+
+def boundary_ips(zones):
+    # IP di sekitar batas setiap range zona, diambil langsung dari definisi zona (bukan dari kelas hasil kompilasi)
+    ips = set()
+    for zone_name in zones:
+        for start, end in zone_ranges(zones, zone_name):
+            ips.update((start - 1, start, end, end + 1))
+    return sorted(int_to_ip(ip_int) for ip_int in ips)
+
+
+class PolicyEquivalenceTest(unittest.TestCase):
+    # Tabel keputusan CompiledPolicy harus identik dengan rule chain check_security lama
+
+    @classmethod
+    def setUpClass(cls):
+        cls.zones, rules, building_octets = load_policy(POLICY_FILE)
+        cls.policy = CompiledPolicy(cls.zones, rules, building_octets)
+
+    def assert_equivalent(self, src_ips, dst_ips):
+        for icmp_type in (8, 0):
+            for src_ip in src_ips:
+                src_int = ip_to_int(src_ip)
+                for dst_ip in dst_ips:
+                    expected = legacy_check_security(self.zones, src_ip, dst_ip, icmp_type)
+                    actual = self.policy.decide(src_int, ip_to_int(dst_ip), icmp_type == 0)
+                    if actual != expected:
+                        self.fail(f'{src_ip} -> {dst_ip} icmp {icmp_type}: {actual} != {expected}')
+
+    def test_grid_to_representatives(self):
+        # Setiap IP grid sebagai sumber: kelas yang salah digabung terlihat dari sisi src
+        reps = [int_to_ip(ip_int) for ip_int in self.policy.representatives()]
+        self.assert_equivalent(GRID, reps)
+
+    def test_representatives_to_grid(self):
+        reps = [int_to_ip(ip_int) for ip_int in self.policy.representatives()]
+        self.assert_equivalent(reps, GRID)
+
+    def test_zone_boundaries(self):
+        ips = boundary_ips(self.zones)
+        self.assert_equivalent(ips, ips)
+
+
+if __name__ == '__main__':
+    unittest.main()